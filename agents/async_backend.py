@@ -0,0 +1,547 @@
+"""
+NihongoAI – asyncio backend with timeouts, retries and a circuit breaker
+Resilient variant of NihongoCrew plus a sync facade for the Streamlit pages
+"""
+
+import asyncio
+import random
+import threading
+import time
+import weakref
+
+from agents.gemini_backend import NihongoCrew
+from agents.llm_backends import SyntheticModel
+from config.settings import RESILIENCE_CONFIG, STRUCTURED_OUTPUT_CONFIG
+from utils.grading import split_answer_key
+from utils.local_quiz import LocalQuizEngine, get_local_quiz_engine
+from utils.prompt_registry import RenderedPrompt, record_response_usage
+from utils.quiz_parser import parse_quiz_questions
+from utils.quiz_schema import (
+    ANALYSIS_ITEM_SCHEMA, ANALYSIS_SCHEMA, QUESTION_SCHEMA, QUIZ_SCHEMA, StructuredOutputError,
+    load_json, parse_analysis_item, render_analysis, render_quiz, repair_analysis, repair_question,
+    repair_quiz, structured_stats
+)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when the circuit breaker rejects a call without trying it."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed    – calls pass through
+    open      – calls fail fast until reset_timeout has elapsed
+    half_open – one trial call decides between closed and open
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted right now."""
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._trial_in_flight = False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release(self):
+        """Give back a half-open trial that ended without an outcome (cancelled)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class AsyncNihongoCrew(NihongoCrew):
+    """
+    asyncio-native NihongoCrew.
+
+    Every model call gets a deadline, is retried with exponential backoff
+    and jitter, is capped by a semaphore on in-flight requests and goes
+    through a circuit breaker that fails fast while the provider is down.
+    """
+
+    def __init__(self, model=None, config=None):
+        """
+        Args:
+            model: Gemini-compatible model (e.g. agents.llm_backends.SyntheticModel)
+            config: Overrides for RESILIENCE_CONFIG
+        """
+        super().__init__(model=model)
+        self.config = {**RESILIENCE_CONFIG, **(config or {})}
+        self.breaker = CircuitBreaker(
+            failure_threshold=self.config["failure_threshold"],
+            reset_timeout=self.config["reset_timeout"],
+        )
+        self._semaphores = weakref.WeakKeyDictionary()
+        self.calls = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.rejected = 0
+
+    # ================================================================
+    # PUBLIC ASYNC API
+    # ================================================================
+    async def generate_quiz_async(self, topic="general", difficulty="N5", num_questions=5, use_cache=False):
+        """Async generate_quiz(); returns quiz text without the answer key."""
+        quiz_text, _ = await self.generate_quiz_with_key_async(topic, difficulty, num_questions, use_cache)
+        return quiz_text
+
+    async def generate_quiz_with_key_async(self, topic="general", difficulty="N5", num_questions=5, use_cache=False):
+        """Async generate_quiz_with_key(); returns (quiz_text, answer_key)."""
+        if LocalQuizEngine.supports(topic):
+            # Built from the vocabulary off the event loop (the first call loads the engine)
+            return await asyncio.to_thread(
+                lambda: get_local_quiz_engine().generate(topic, difficulty, num_questions)
+            )
+        if STRUCTURED_OUTPUT_CONFIG["enabled"]:
+            return await self._generate_quiz_json_async(topic, difficulty, num_questions, use_cache)
+        prompt = self._quiz_prompt(topic, difficulty, num_questions)
+        return split_answer_key(await self._generate_async(prompt, use_cache=use_cache))
+
+    async def analyze_answers_async(self, quiz_content: str, user_answers: dict) -> str:
+        """Async analyze_answers()."""
+        if STRUCTURED_OUTPUT_CONFIG["enabled"]:
+            return await self._analyze_answers_json_async(quiz_content, user_answers)
+        return await self._generate_async(self._analysis_prompt(quiz_content, user_answers))
+
+    async def explain_answers_async(self, quiz_content: str, results: list) -> dict:
+        """Async explain_answers()."""
+        text = await self._generate_async(self._explain_prompt(quiz_content, results))
+        return self._parse_reasons(text)
+
+    async def explain_question_async(self, question: dict, correct: str, chosen: str = None) -> str:
+        """Async explain_question()."""
+        return await self._generate_async(self._explain_question_prompt(question, correct, chosen))
+
+    async def generate_project_report_async(self, quiz_history: list, user_stats: dict) -> str:
+        """Async generate_project_report()."""
+        return await self._generate_async(self._report_prompt(quiz_history, user_stats))
+
+    # ================================================================
+    # STRUCTURED OUTPUT
+    # ================================================================
+    async def _generate_quiz_json_async(self, topic, difficulty, num_questions, use_cache=False):
+        """Async _generate_quiz_json(); fix-ups of broken questions run concurrently."""
+        prompt = self._quiz_prompt(topic, difficulty, num_questions, template="quiz_json")
+        options = STRUCTURED_OUTPUT_CONFIG["options"]
+
+        async def build(data):
+            repaired = repair_quiz(data, num_questions, options)
+            questions = list(repaired.questions)
+            self._check_fixups(repaired.broken)
+            fixed = await asyncio.gather(*(
+                self._fixup_async(prompt, QUESTION_SCHEMA, problem, item, use_cache)
+                for problem, item in repaired.broken.values()
+            ))
+            for (position, _), item in zip(repaired.broken.items(), fixed):
+                spare = [choice for other in questions if other for choice in other["options"]]
+                question, problem, _ = repair_question(item, options, spare)
+                if question is None:
+                    raise StructuredOutputError(f"fix-up of question {position + 1} failed: {problem}")
+                questions[position] = question
+            return render_quiz(repaired.passage, questions), len(repaired.repairs), len(repaired.broken)
+
+        return await self._structured_async("quiz", prompt, QUIZ_SCHEMA, build, use_cache)
+
+    async def _analyze_answers_json_async(self, quiz_content: str, user_answers: dict) -> str:
+        """Async _analyze_answers_json(); fix-ups of broken results run concurrently."""
+        prompt = self._analysis_prompt(quiz_content, user_answers, template="analysis_json")
+        counts = {q.num: len(q.options) for q in parse_quiz_questions(quiz_content)}
+
+        async def build(data):
+            repaired = repair_analysis(data, list(user_answers), counts)
+            results = dict(repaired.results)
+            self._check_fixups(repaired.broken)
+            fixed = await asyncio.gather(*(
+                self._fixup_async(prompt, ANALYSIS_ITEM_SCHEMA, problem, item)
+                for problem, item in repaired.broken.values()
+            ))
+            for num, item in zip(repaired.broken, fixed):
+                result, problem = parse_analysis_item(item, counts.get(num, 4))
+                if result is None:
+                    raise StructuredOutputError(f"fix-up of question {num} failed: {problem}")
+                results[num] = result
+            return render_analysis(results, user_answers), len(repaired.repairs), len(repaired.broken)
+
+        return await self._structured_async("analysis", prompt, ANALYSIS_SCHEMA, build)
+
+    async def _structured_async(self, kind: str, prompt: RenderedPrompt, schema: dict, build, use_cache: bool = True):
+        """Async _structured(); build is a coroutine function."""
+        for attempt in range(2):
+            try:
+                text = await self._generate_async(prompt, use_cache=use_cache and not attempt, schema=schema,
+                                                  store=use_cache)
+                value, repairs, fixups = await build(load_json(text))
+            except StructuredOutputError as e:
+                error = e
+                print(f"⚠️ Unusable {kind} JSON ({e}){', regenerating' if not attempt else ''}")
+                continue
+            self._record_structured(kind, attempt, repairs, fixups)
+            return value
+
+        structured_stats.record(kind, "failed")
+        raise error
+
+    async def _fixup_async(self, prompt: RenderedPrompt, schema: dict, problem: str, item,
+                           use_cache: bool = True) -> dict:
+        """Async _fixup()."""
+        return load_json(await self._generate_async(
+            self._fixup_prompt(prompt, problem, item), use_cache=use_cache, schema=schema
+        ))
+
+    # ================================================================
+    # RESILIENT MODEL CALLS
+    # ================================================================
+    async def _generate_async(self, prompt: RenderedPrompt, use_cache: bool = True, schema: dict = None,
+                              store: bool = None) -> str:
+        """Cache-aware async counterpart of _generate()."""
+        key = self._cache_key(prompt, schema)
+        if use_cache and self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        text = await self._call_model_async(prompt, schema)
+
+        if (use_cache if store is None else store) and self.cache is not None:
+            self.cache.set(key, text)
+        return text
+
+    async def _call_model_async(self, prompt: RenderedPrompt, schema: dict = None) -> str:
+        """
+        Call the model with deadline, retries, concurrency cap and breaker.
+
+        Only transient errors (see _is_transient) are retried and count
+        toward the breaker; others are raised at once.
+
+        Raises: CircuitOpenError when the breaker is open, otherwise the
+                last error once retries are exhausted
+        """
+        max_retries = self.config["max_retries"]
+        semaphore = self._semaphore()
+
+        for attempt in range(max_retries + 1):
+            if not self.breaker.allow():
+                self.rejected += 1
+                raise CircuitOpenError("AI service is temporarily unavailable, please retry shortly")
+
+            try:
+                async with semaphore:
+                    self.calls += 1
+                    text = await asyncio.wait_for(self._invoke(prompt, schema), self.config["timeout"])
+            except asyncio.CancelledError:
+                # Settle a half-open trial, or the breaker never allows another
+                self.breaker.release()
+                raise
+            except Exception as e:
+                if not self._is_transient(e):
+                    self.breaker.release()
+                    raise
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timeouts += 1
+                self.breaker.record_failure()
+                if attempt == max_retries:
+                    raise
+                self.retries += 1
+                print(f"⚠️ Model call failed ({type(e).__name__}), retry {attempt + 1}/{max_retries}")
+                await asyncio.sleep(self._backoff(attempt))
+            else:
+                self.breaker.record_success()
+                return text
+
+    async def _stream_model_async(self, prompt: RenderedPrompt):
+        """
+        Stream the model under the same policy as _call_model_async().
+
+        The semaphore is held and one deadline covers the whole response;
+        failures are retried with backoff only until the first chunk, since
+        chunks already shown can't be taken back. A stream abandoned by its
+        consumer counts as a success once chunks arrived, so a half-open
+        trial is always settled.
+        """
+        max_retries = self.config["max_retries"]
+        semaphore = self._semaphore()
+
+        for attempt in range(max_retries + 1):
+            if not self.breaker.allow():
+                self.rejected += 1
+                raise CircuitOpenError("AI service is temporarily unavailable, please retry shortly")
+
+            received = False
+            outcome = None
+            try:
+                async with semaphore:
+                    self.calls += 1
+                    async for text in self._invoke_stream(prompt):
+                        received = True
+                        yield text
+                outcome = "success"
+            except Exception as e:
+                if not self._is_transient(e):
+                    raise
+                outcome = "failure"
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timeouts += 1
+                self.breaker.record_failure()
+                if received or attempt == max_retries:
+                    raise
+                self.retries += 1
+                print(f"⚠️ Model stream failed ({type(e).__name__}), retry {attempt + 1}/{max_retries}")
+                await asyncio.sleep(self._backoff(attempt))
+            finally:
+                if outcome == "success" or (outcome is None and received):
+                    self.breaker.record_success()
+                elif outcome is None:
+                    self.breaker.release()
+            if outcome == "success":
+                return
+
+    async def _invoke_stream(self, prompt: RenderedPrompt):
+        """Single streaming model call with one deadline for the whole response."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.config["timeout"]
+        model, contents = self._model_request(prompt)
+        started = time.perf_counter()
+        if hasattr(model, "generate_content_async"):
+            response = await asyncio.wait_for(
+                model.generate_content_async(contents, stream=True), deadline - loop.time()
+            )
+            chunks = aiter(response)
+            next_chunk = lambda: anext(chunks, None)
+        else:
+            response = await asyncio.wait_for(
+                asyncio.to_thread(model.generate_content, contents, stream=True), deadline - loop.time()
+            )
+            chunks = iter(response)
+            next_chunk = lambda: asyncio.to_thread(next, chunks, None)
+
+        while (chunk := await asyncio.wait_for(next_chunk(), deadline - loop.time())) is not None:
+            if chunk.text:
+                yield chunk.text
+        record_response_usage(prompt, response, time.perf_counter() - started)
+
+    async def _invoke(self, prompt: RenderedPrompt, schema: dict = None) -> str:
+        """Single model call, native async when the model supports it."""
+        model, contents = self._model_request(prompt)
+        kwargs = self._generation_kwargs(schema)
+        started = time.perf_counter()
+        if hasattr(model, "generate_content_async"):
+            response = await model.generate_content_async(contents, **kwargs)
+        else:
+            response = await asyncio.to_thread(model.generate_content, contents, **kwargs)
+        record_response_usage(prompt, response, time.perf_counter() - started)
+        return response.text.strip()
+
+    def _is_transient(self, error: Exception) -> bool:
+        """
+        Whether error is worth a retry: a timeout, a connection error or a
+        retryable HTTP status (Gemini's ``code``, an HTTP client's
+        ``response.status_code``). Anything else, e.g. a ValueError from a
+        malformed response, would fail the same way again.
+        """
+        if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+            return True
+        if any(cls.__name__ in ("ConnectionError", "TransportError", "Timeout") for cls in type(error).__mro__):
+            return True  # requests / httpx errors, without importing either
+        status = getattr(error, "code", None)
+        if not isinstance(status, int):
+            status = getattr(getattr(error, "response", None), "status_code", None)
+        return isinstance(status, int) and status in self.config["retry_statuses"]
+
+    def _backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter."""
+        ceiling = min(self.config["backoff_max"], self.config["backoff_base"] * 2 ** attempt)
+        return random.uniform(0, ceiling)
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        """In-flight request cap for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.config["max_concurrency"])
+        return self._semaphores[loop]
+
+    def resilience_stats(self) -> dict:
+        """Call, retry, timeout and rejection counters plus breaker state."""
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "breaker": self.breaker.state,
+        }
+
+
+async def _awaited(awaitable):
+    """Coroutine wrapper, for awaitables run_coroutine_threadsafe() won't take."""
+    return await awaitable
+
+
+class ResilientNihongoCrew(AsyncNihongoCrew):
+    """
+    Sync facade over AsyncNihongoCrew for the existing Streamlit pages.
+
+    Calls are submitted to one background event loop, so the semaphore
+    caps in-flight requests across every session sharing this instance.
+    """
+
+    def __init__(self, model=None, config=None):
+        super().__init__(model=model, config=config)
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._loop.run_forever, name="nihongo-crew-loop", daemon=True)
+        self._loop_thread.start()
+
+    def run(self, coro):
+        """Run a coroutine on the background loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def _call_model(self, prompt: RenderedPrompt, schema: dict = None) -> str:
+        return self.run(self._call_model_async(prompt, schema))
+
+    def _stream_model(self, prompt: RenderedPrompt):
+        """Drive _stream_model_async() on the background loop, one chunk at a time."""
+        stream = self._stream_model_async(prompt)
+        try:
+            while True:
+                try:
+                    yield self.run(_awaited(stream.__anext__()))
+                except StopAsyncIteration:
+                    return
+        finally:
+            # Also on GeneratorExit: settles the breaker and frees the semaphore
+            self.run(_awaited(stream.aclose()))
+
+    def close(self):
+        """Stop the background event loop."""
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join(timeout=5)
+
+
+# ================================================================
+# TESTING
+# ================================================================
+def _synthetic(error_rate):
+    return SyntheticModel(latency_distribution="uniform", latency_median=0.05, error_rate=error_rate)
+
+
+def test_resilience():
+    """Exercise retries, concurrency and the breaker against the synthetic model"""
+    print("🧪 Testing resilient backend against the synthetic model...")
+    print("=" * 60)
+
+    fast = {"timeout": 1.0, "backoff_base": 0.01, "backoff_max": 0.05, "max_concurrency": 4}
+    crew = AsyncNihongoCrew(model=_synthetic(error_rate=0.3), config=fast)
+    crew.cache = None
+
+    async def burst():
+        return await asyncio.gather(
+            *(crew.generate_quiz_with_key_async(topic="grammar") for _ in range(20)),
+            return_exceptions=True,
+        )
+
+    started = time.perf_counter()
+    results = asyncio.run(burst())
+    ok = sum(1 for r in results if not isinstance(r, Exception))
+    print(f"✅ {ok}/20 succeeded in {time.perf_counter() - started:.2f}s | {crew.resilience_stats()}")
+
+    broken = AsyncNihongoCrew(model=_synthetic(error_rate=1.0), config={**fast, "max_retries": 0})
+    broken.cache = None
+    outcomes = []
+    for _ in range(8):
+        try:
+            asyncio.run(broken.generate_quiz_async(topic="grammar"))
+        except Exception as e:
+            outcomes.append(type(e).__name__)
+    print(f"✅ Failing provider: {outcomes} | {broken.resilience_stats()}")
+
+    facade = ResilientNihongoCrew(model=_synthetic(error_rate=0.3), config=fast)
+    facade.cache = None
+    quiz, key = facade.generate_quiz_with_key(topic="grammar")
+    print(f"✅ Sync facade returned {len(quiz)} chars, key={key}")
+
+    drifting = AsyncNihongoCrew(model=SyntheticModel(latency_distribution="uniform", latency_median=0.05,
+                                                     defect_rate=0.6), config=fast)
+    drifting.cache = None
+
+    async def structured():
+        quizzes = await asyncio.gather(*(drifting.generate_quiz_with_key_async(topic="grammar") for _ in range(10)))
+        feedback = await drifting.analyze_answers_async(quizzes[0][0], {num: "A" for num in quizzes[0][1]})
+        return quizzes, feedback
+
+    quizzes, feedback = asyncio.run(structured())
+    assert all(len(key) == 5 for _, key in quizzes) and feedback.startswith("Score:")
+    print(f"✅ Async JSON path: {len(quizzes)} quizzes + analysis | {structured_stats.rates()}")
+
+    # A cancelled half-open trial must not leave the breaker stuck
+    trial = AsyncNihongoCrew(model=_synthetic(error_rate=0.0), config={**fast, "reset_timeout": 0.05})
+    trial.cache = None
+    for _ in range(trial.breaker.failure_threshold):
+        trial.breaker.record_failure()
+
+    async def cancelled_trial():
+        await asyncio.sleep(0.06)
+        task = asyncio.create_task(trial.generate_quiz_with_key_async(topic="grammar"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return await trial.generate_quiz_with_key_async(topic="grammar")
+
+    asyncio.run(cancelled_trial())
+    assert trial.breaker.state == "closed"
+    print(f"✅ Cancelled half-open trial released | {trial.resilience_stats()}")
+
+    # Errors that would repeat (a malformed response) are not retried
+    class MalformedModel(SyntheticModel):
+        async def generate_content_async(self, contents, stream=False, generation_config=None):
+            raise ValueError("malformed response")
+
+    malformed = AsyncNihongoCrew(model=MalformedModel(), config=fast)
+    malformed.cache = None
+    try:
+        asyncio.run(malformed.generate_quiz_with_key_async(topic="grammar"))
+    except ValueError:
+        pass
+    assert malformed.calls == 1 and malformed.retries == 0 and malformed.breaker.failures == 0
+    print(f"✅ Non-transient error raised without retries | {malformed.resilience_stats()}")
+
+    calls = broken.calls
+    quiz, key = asyncio.run(broken.generate_quiz_with_key_async(topic="vocabulary"))
+    assert broken.calls == calls, "local topics must not reach the model"
+    print(f"✅ Vocabulary quiz built locally despite the failing provider, key={key}")
+
+    stream = facade.generate_quiz_stream(topic="grammar")
+    next(stream)
+    stream.close()  # consumer walks away mid-stream
+    chunks = list(facade.generate_quiz_stream(topic="grammar"))
+    print(f"✅ Streamed {len(chunks)} chunks after an abandoned stream | {facade.resilience_stats()}")
+    facade.close()
+
+
+if __name__ == "__main__":
+    test_resilience()
@@ -4,113 +4,282 @@ Perfected version with no duplicates, proper randomization
 """
 
 import os
+import re
 import json
-import pandas as pd
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 from dotenv import load_dotenv
-import google.generativeai as genai
+
+from utils.response_cache import ResponseCache, get_response_cache
+from utils.grading import format_answer_key, split_answer_key
+from utils.local_quiz import LocalQuizEngine, get_local_quiz_engine
+from utils.quiz_parser import Question, parse_quiz_questions
+from utils.quiz_schema import (
+    ANALYSIS_ITEM_SCHEMA, ANALYSIS_SCHEMA, QUESTION_SCHEMA, QUIZ_SCHEMA, StructuredOutputError,
+    load_json, parse_analysis_item, render_analysis, render_quiz, repair_analysis, repair_question,
+    repair_quiz, structured_stats
+)
+from utils.vocab_store import load_vocabulary
+from utils.prompt_registry import RenderedPrompt, record_response_usage, usage_tracker
+from config.settings import BATCH_CONFIG, EXPLANATION_CONFIG, STRUCTURED_OUTPUT_CONFIG
+from config.gemini_prompts import GEMINI_TEMPLATES
+from agents.llm_backends import create_model
 
 load_dotenv()
 
+GEMINI_MODEL_NAME = "gemini-2.0-flash-exp"
+PACKED_QUIZ_MARKER = re.compile(r'^\s*=== QUIZ (\d+) ===\s*$', re.MULTILINE)
+
 
 class NihongoCrew:
     """Gemini 2.5 Flash-based quiz generator for NihongoAI."""
 
-    def __init__(self):
+    def __init__(self, model=None):
+        """
+        Args:
+            model: Object with a Gemini-compatible generate_content();
+                   defaults to the backend selected by LLM_BACKEND /
+                   BACKEND_CONFIG (live Gemini unless configured otherwise)
+        """
+        self._system_model_factory = None
+        self._system_models = {}
+
+        if model is None:
+            # Offline backends (synthetic / replay / record) from LLM_BACKEND or BACKEND_CONFIG
+            model = create_model(real_model_factory=self._gemini_model)
+
+        if model is None:
+            model = self._gemini_model()
+            self._system_model_factory = self._gemini_system_model
+
+        self.model = model
+        self.model_name = getattr(model, "model_name", type(model).__name__)
+
+        # Persistent response cache (None when disabled)
+        self.cache = get_response_cache()
+
+        # Shared vocabulary (optional)
+        try:
+            self.vocab = load_vocabulary()
+            print(f"✅ Loaded {len(self.vocab)} vocabulary words")
+        except Exception as e:
+            print(f"⚠️ Could not load vocabulary: {e}")
+            self.vocab = None
+
+    @staticmethod
+    def _gemini_model():
+        """Configure the Gemini client and return the live model."""
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
             raise ValueError("GEMINI_API_KEY not found in .env file!")
 
+        # The SDK costs ~0.7 s to import; only the live backend needs it
+        import google.generativeai as genai
+
         # Configure Gemini
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel("gemini-2.0-flash-exp")
+        return genai.GenerativeModel(GEMINI_MODEL_NAME)
 
-        # Load vocabulary (optional)
-        try:
-            self.vocab_df = pd.read_csv("data/N5_vocabulary.csv")
-            print(f"✅ Loaded {len(self.vocab_df)} vocabulary words")
-        except Exception as e:
-            print(f"⚠️ Could not load vocabulary CSV: {e}")
-            self.vocab_df = None
+    @staticmethod
+    def _gemini_system_model(system):
+        """Live model with system as its (cacheable) system instruction."""
+        import google.generativeai as genai
+
+        return genai.GenerativeModel(GEMINI_MODEL_NAME, system_instruction=system)
 
     # ================================================================
     # QUIZ GENERATION
     # ================================================================
-    def generate_quiz(self, topic="general", difficulty="N5", num_questions=5):
+    def generate_quiz(self, topic="general", difficulty="N5", num_questions=5, use_cache=False):
         """
         Generate a JLPT-style multiple-choice quiz.
         
+        Args:
+            use_cache: Return a previously generated quiz for the same prompt
+                       (off by default: every call should give a new quiz)
+        
         Returns: quiz_text (str) – Questions + options only, no answers
         """
+        quiz_text, _ = self.generate_quiz_with_key(topic, difficulty, num_questions, use_cache)
+        return quiz_text
+
+    def generate_quiz_with_key(self, topic="general", difficulty="N5", num_questions=5, use_cache=False):
+        """
+        Generate a quiz together with its answer key.
+        
+        The key is meant to stay server-side (session state) and is never
+        part of the rendered quiz text.
+        
+        Returns: (quiz_text, answer_key) – answer_key like {"1": "B", ...},
+                 empty when the model omitted it
+        """
         print(f"\n🎯 Generating {difficulty} quiz | topic='{topic}' | {num_questions} questions")
 
-        topic_hint = self._get_topic_hint(topic)
-
-        prompt = f"""You are a professional Japanese teacher creating JLPT {difficulty} practice questions.
-
-GOAL: Create EXACTLY {num_questions} multiple-choice questions.
-
-TOPIC HINT: {topic_hint}
-
-STYLE REQUIREMENTS:
-- Short, simple N5-level sentences
-- Natural JLPT exam style
-- Use polite form (です/ます) when appropriate
-- One blank per sentence for grammar/vocabulary
-- For kanji reading, show kanji and give kana options
-
-QUESTION TYPES:
-
-If topic is "kanji":
-  Focus on kanji readings like:
-  1. 来月
-  ○ らいげつ
-  ○ らいがつ
-  ○ くがつ
-  ○ くげつ
-
-If topic is "grammar":
-  Focus on particles/grammar:
-  1. まいにち しんぶん ______ よみます。
-  ○ へ
-  ○ を
-  ○ に
-  ○ が
-
-If topic is "vocabulary":
-  Focus on word meanings:
-  1. わたしは いつも ______ を ききながら べんきょうします。
-  ○ ペン
-  ○ ラジオ
-  ○ テーブル
-  ○ ストーブ
-
-If topic is "reading":
-  - First show a 3-5 sentence passage (N5 level)
-  - Then ask questions about it in same MC format
-
-FORMAT (FOLLOW EXACTLY):
-
-1. Number questions: 1., 2., 3., etc.
-2. Each option on separate line starting with "○ " (circle + space)
-3. ONE blank line between questions
-4. Plain text only, no markdown
-5. DO NOT show correct answers
-6. DO NOT write answer key
-7. NO explanations, greetings, or comments
-
-RANDOMIZATION (CRITICAL):
-- For each question, randomly place the correct answer as A, B, C, or D
-- NEVER make all answers the same letter (e.g., all A)
-- Distribute correct answers across all options
-- Example: Q1=B, Q2=D, Q3=A, Q4=C is good
-- Example: Q1=A, Q2=A, Q3=A, Q4=A is BAD
-
-Output ONLY the quiz. Start with "1." immediately."""
-
-        response = self.model.generate_content(prompt)
-        quiz_text = response.text.strip()
-        print("✅ Quiz generated (questions only)")
-        return quiz_text
+        if LocalQuizEngine.supports(topic):
+            quiz_text, answer_key = get_local_quiz_engine().generate(topic, difficulty, num_questions)
+            print("✅ Quiz built locally from the vocabulary")
+            return quiz_text, answer_key
+
+        quiz_text, answer_key = self._remote_quiz(topic, difficulty, num_questions, use_cache=use_cache)
+        print(f"✅ Quiz generated ({len(answer_key)} answers in key)")
+        return quiz_text, answer_key
+
+    def _remote_quiz(self, topic, difficulty, num_questions, variant=0, use_cache=False):
+        """(quiz_text, answer_key) from the model, as validated JSON when structured output is on."""
+        if STRUCTURED_OUTPUT_CONFIG["enabled"]:
+            return self._generate_quiz_json(topic, difficulty, num_questions, variant, use_cache)
+        prompt = self._quiz_prompt(topic, difficulty, num_questions, variant)
+        return split_answer_key(self._generate(prompt, use_cache=use_cache))
+
+    def generate_quiz_stream(self, topic="general", difficulty="N5", num_questions=5, use_cache=False):
+        """
+        Stream a JLPT-style multiple-choice quiz as it is generated.
+        
+        Yields: raw text chunks, ending with the "ANSWER KEY:" line;
+                pass the joined text through split_answer_key()
+        """
+        print(f"\n🎯 Streaming {difficulty} quiz | topic='{topic}' | {num_questions} questions")
+
+        if LocalQuizEngine.supports(topic):
+            quiz_text, answer_key = get_local_quiz_engine().generate(topic, difficulty, num_questions)
+            yield f"{quiz_text}\n\n{format_answer_key(answer_key)}"
+            print("✅ Quiz built locally from the vocabulary")
+            return
+
+        if STRUCTURED_OUTPUT_CONFIG["enabled"] and STRUCTURED_OUTPUT_CONFIG["stream"]:
+            # Validated JSON can't be shown half-way; the quiz arrives in one piece
+            quiz_text, answer_key = self._generate_quiz_json(topic, difficulty, num_questions, use_cache=use_cache)
+            yield f"{quiz_text}\n\n{format_answer_key(answer_key)}"
+            print("✅ Quiz generated")
+            return
+
+        prompt = self._quiz_prompt(topic, difficulty, num_questions)
+        yield from self._generate_stream(prompt, use_cache=use_cache)
+        print("✅ Quiz streamed")
+
+    def _quiz_prompt(self, topic: str, difficulty: str, num_questions: int, variant: int = 0,
+                     template: str = "quiz") -> RenderedPrompt:
+        """Build the quiz generation prompt ("quiz" text or "quiz_json")."""
+        variant_hint = (
+            f"\nSET: This is variant #{variant}; write questions different from other sets.\n"
+            if variant else ""
+        )
+        return GEMINI_TEMPLATES.render(
+            template,
+            difficulty=difficulty,
+            num_questions=num_questions,
+            topic_hint=self._get_topic_hint(topic),
+            variant_hint=variant_hint
+        )
+
+    # ================================================================
+    # BATCH GENERATION
+    # ================================================================
+    def generate_quizzes_batch(self, specs: list, max_concurrency: int = None, pack: bool = False,
+                               use_cache: bool = False) -> list:
+        """
+        Generate many quizzes concurrently (e.g. one set per student).
+        
+        Args:
+            specs: List of dicts with topic, difficulty, num_questions and an
+                   optional variant number; identical specs are generated once
+            max_concurrency: Parallel model calls (default BATCH_CONFIG)
+            pack: Combine small quizzes of the same level into one model call
+            use_cache: Serve stored responses for identical requests (off:
+                       a repeated batch should get fresh quizzes)
+        
+        Returns: One dict per spec, in input order:
+                 {"spec", "quiz", "answer_key", "error"} – error is None on success
+        """
+        normalized = [self._normalize_spec(spec) for spec in specs]
+        unique = list(dict.fromkeys(normalized))
+        print(f"\n📦 Batch of {len(specs)} quizzes ({len(unique)} unique)")
+
+        # Vocabulary/kanji quizzes are built locally (the variant seeds them)
+        outcomes = {
+            spec: get_local_quiz_engine().generate(*spec[:3], seed=repr(spec)) + (None,)
+            for spec in unique if LocalQuizEngine.supports(spec[0])
+        }
+        remote = [spec for spec in unique if spec not in outcomes]
+
+        jobs = [[spec] for spec in remote]
+        if pack:
+            jobs = self._pack_specs(remote)
+
+        workers = max_concurrency or BATCH_CONFIG["max_concurrency"]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for job, result in zip(jobs, executor.map(lambda job: self._run_batch_job(job, use_cache), jobs)):
+                outcomes.update(zip(job, result))
+
+        results = []
+        for spec, key in zip(specs, normalized):
+            quiz_text, answer_key, error = outcomes[key]
+            results.append({"spec": spec, "quiz": quiz_text, "answer_key": answer_key, "error": error})
+
+        failed = sum(1 for r in results if r["error"])
+        print(f"✅ Batch complete ({failed} failed)")
+        return results
+
+    @staticmethod
+    def _normalize_spec(spec: dict) -> tuple:
+        """Hashable (topic, difficulty, num_questions, variant) for a batch spec."""
+        return (
+            (spec.get("topic") or "general").lower(),
+            spec.get("difficulty", "N5"),
+            int(spec.get("num_questions", 5)),
+            int(spec.get("variant", 0)),
+        )
+
+    def _pack_specs(self, specs: list) -> list:
+        """Group small quizzes of the same level into packed jobs."""
+        jobs, open_groups = [], {}
+        for spec in specs:
+            if spec[2] > BATCH_CONFIG["pack_max_questions"]:
+                jobs.append([spec])
+                continue
+            group = open_groups.setdefault(spec[1], [])
+            group.append(spec)
+            if len(group) == BATCH_CONFIG["pack_size"]:
+                jobs.append(open_groups.pop(spec[1]))
+        jobs.extend(open_groups.values())
+        return jobs
+
+    def _run_batch_job(self, job: list, use_cache: bool = False) -> list:
+        """Generate one job; returns (quiz_text, answer_key, error) per spec."""
+        if len(job) > 1:
+            try:
+                return self._generate_packed(job, use_cache)
+            except Exception as e:
+                print(f"⚠️ Packed call failed ({e}), generating individually")
+
+        results = []
+        for topic, difficulty, num_questions, variant in job:
+            try:
+                quiz_text, answer_key = self._remote_quiz(topic, difficulty, num_questions, variant, use_cache)
+                results.append((quiz_text, answer_key, None))
+            except Exception as e:
+                results.append((None, {}, str(e)))
+        return results
+
+    def _generate_packed(self, job: list, use_cache: bool = False) -> list:
+        """Generate several small quizzes in one model call."""
+        text = self._generate(self._packed_quiz_prompt(job), use_cache=use_cache)
+        parts = PACKED_QUIZ_MARKER.split(text)
+        # split() yields [preamble, num1, body1, num2, body2, ...]
+        bodies = {int(num): body for num, body in zip(parts[1::2], parts[2::2])}
+        if sorted(bodies) != list(range(1, len(job) + 1)):
+            raise ValueError(f"expected {len(job)} quizzes, got {len(bodies)}")
+        return [split_answer_key(bodies[i]) + (None,) for i in range(1, len(job) + 1)]
+
+    def _packed_quiz_prompt(self, job: list) -> RenderedPrompt:
+        """Build one prompt asking for several independent quizzes."""
+        requests = "\n".join(
+            f"- QUIZ {i}: EXACTLY {num_questions} questions. TOPIC HINT: {self._get_topic_hint(topic)}"
+            + (f" (variant #{variant})" if variant else "")
+            for i, (topic, _, num_questions, variant) in enumerate(job, 1)
+        )
+        return GEMINI_TEMPLATES.render("packed_quiz", difficulty=job[0][1], count=len(job), requests=requests)
 
     def _get_topic_hint(self, topic: str) -> str:
         """Get natural language hint for the topic."""
@@ -138,52 +307,102 @@ Output ONLY the quiz. Start with "1." immediately."""
         """
         print(f"\n📊 Analyzing {len(user_answers)} answers...")
 
-        answers_json = json.dumps(user_answers, ensure_ascii=False, indent=2)
-
-        prompt = f"""You are a JLPT N5 teacher checking a multiple-choice quiz.
-
-QUIZ (questions only, no answer key):
----
-{quiz_content}
----
-
-STUDENT'S ANSWERS (JSON):
-{answers_json}
-
-YOUR TASK:
-
-1. For EACH question:
-   - Determine which option is correct based on the quiz
-   - Compare student's answer to your correct answer
-
-2. Calculate total score X / N and percentage
-
-3. OUTPUT FORMAT (FOLLOW EXACTLY):
+        if STRUCTURED_OUTPUT_CONFIG["enabled"]:
+            result = self._analyze_answers_json(quiz_content, user_answers)
+        else:
+            result = self._generate(self._analysis_prompt(quiz_content, user_answers))
+        print("✅ Analysis complete")
+        return result
 
-Score: X / N (Y%)
+    def _analysis_prompt(self, quiz_content: str, user_answers: dict, template: str = "analysis") -> RenderedPrompt:
+        """Build the answer analysis prompt ("analysis" text or "analysis_json")."""
+        answers_json = json.dumps(user_answers, ensure_ascii=False, indent=2)
+        return GEMINI_TEMPLATES.render(template, quiz_content=quiz_content, answers_json=answers_json)
 
-Q1: Correct/Incorrect
-- Your answer: [letter or "—" if blank]
-- Correct answer: [letter]
-- Reason: [1-2 short lines explaining why]
+    def explain_answers(self, quiz_content: str, results: list) -> dict:
+        """
+        Write a short reason for each locally graded question.
+        
+        Args:
+            quiz_content: Text from generate_quiz()
+            results: Output of utils.grading.grade_answers()
+        
+        Returns: Dict like {"1": "を marks the direct object.", ...}
+        """
+        print(f"\n💬 Explaining {len(results)} answers...")
 
-Q2: Correct/Incorrect
-- Your answer: ...
-- Correct answer: ...
-- Reason: ...
+        reasons = self._parse_reasons(self._generate(self._explain_prompt(quiz_content, results)))
+        print("✅ Explanations ready")
+        return reasons
 
-[Continue for all questions]
+    def _explain_prompt(self, quiz_content: str, results: list) -> RenderedPrompt:
+        """Build the per-question explanation prompt."""
+        graded = "\n".join(
+            f"Q{r['num']}: correct={r['correct']}, student={r['user'] or '—'}"
+            for r in results
+        )
+        return GEMINI_TEMPLATES.render("explain", quiz_content=quiz_content, graded=graded)
 
-RULES:
-- Keep Reason VERY SHORT (max 2 lines)
-- Do NOT repeat full question text
-- If answer missing, mark as "—" and incorrect
-- No extra sections before or after this format"""
+    def explain_question(self, question: Question, correct: str, chosen: str = None) -> str:
+        """
+        Explain a single graded question (cached per question and chosen option).
+        
+        Args:
+            question: Parsed Question (utils.quiz_parser)
+            correct: Correct letter
+            chosen: Letter the student picked, None if unanswered
+        
+        Returns: 1-2 sentence reason
+        """
+        return self._generate(self._explain_question_prompt(question, correct, chosen))
 
-        response = self.model.generate_content(prompt)
-        result = response.text.strip()
-        print("✅ Analysis complete")
-        return result
+    def explain_questions(self, items: list, max_concurrency: int = None) -> dict:
+        """
+        Explain several questions in parallel.
+        
+        Args:
+            items: List of (question, result) pairs, result from grade_answers()
+        
+        Returns: Dict like {"2": "reason", ...}; failed questions are omitted
+        """
+        if not items:
+            return {}
+        print(f"\n💬 Explaining {len(items)} question(s)...")
+
+        def explain(item):
+            question, result = item
+            try:
+                return result['num'], self.explain_question(question, result['correct'], result['user'])
+            except Exception as e:
+                print(f"⚠️ Could not explain Q{result['num']}: {e}")
+                return result['num'], None
+
+        workers = min(len(items), max_concurrency or EXPLANATION_CONFIG["max_concurrency"])
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            reasons = {num: reason for num, reason in executor.map(explain, items) if reason}
+        print(f"✅ {len(reasons)} explanation(s) ready")
+        return reasons
+
+    def _explain_question_prompt(self, question: Question, correct: str, chosen: str = None) -> RenderedPrompt:
+        """Build the single-question explanation prompt."""
+        options = "\n".join(f"{chr(65 + i)}) {opt}" for i, opt in enumerate(question.options))
+        return GEMINI_TEMPLATES.render(
+            "explain_question",
+            question=question.text,
+            options=options,
+            correct=correct,
+            chosen=chosen or "—"
+        )
+
+    @staticmethod
+    def _parse_reasons(text: str) -> dict:
+        """Parse "Q1: reason" lines into {"1": "reason"}."""
+        reasons = {}
+        for line in text.splitlines():
+            num, sep, reason = line.strip().partition(':')
+            if sep and num.upper().startswith('Q') and num[1:].strip().isdigit():
+                reasons[num[1:].strip()] = reason.strip()
+        return reasons
 
     # ================================================================
     # PROJECT REPORT
@@ -200,100 +419,248 @@ RULES:
         """
         print("\n📄 Generating project report...")
 
-        prompt = f"""Generate a professional technical project report for NihongoAI.
-
-PROJECT DATA:
-- Total quizzes: {user_stats.get('total_quizzes', 0)}
-- AI-powered quizzes: {user_stats.get('ai_quizzes', 0)}
-- Quiz history entries: {len(quiz_history) if quiz_history else 0}
-
-CREATE A COMPREHENSIVE REPORT WITH THESE SECTIONS:
-
-# 1. EXECUTIVE SUMMARY (2-3 paragraphs)
-- Project overview and purpose
-- Key technologies: Google Gemini 2.5 Flash, Streamlit, Python
-- Main achievements and impact
-
-# 2. SYSTEM ARCHITECTURE
-- AI-powered quiz generation system design
-- Gemini API integration approach
-- Web application framework (Streamlit)
-- Data management (vocabulary database)
-- Workflow: user input → AI generation → interactive quiz → feedback
-
-# 3. TECHNICAL IMPLEMENTATION
-- Programming language: Python 3.10+
-- AI Model: Google Gemini 2.5 Flash
-- Framework: Streamlit for web UI
-- Libraries: google-generativeai, pandas, python-dotenv
-- Features implemented:
-  * Dynamic quiz generation (5 topics, customizable difficulty)
-  * Intelligent answer analysis
-  * Progress tracking
-  * Vocabulary library (800+ N5 words)
-
-# 4. PERFORMANCE METRICS
-- Quiz generation time: 5-10 seconds
-- Answer analysis time: 5-10 seconds
-- Accuracy: High (Gemini 2.5 Flash excels at Japanese)
-- User engagement: Interactive, real-time feedback
-- Scalability: Cloud-ready, session-based
-
-# 5. KEY FEATURES
-1. Multi-topic quiz generation (kanji, grammar, vocabulary, reading)
-2. Customizable difficulty and question count
-3. AI-powered answer checking with explanations
-4. Beautiful, interactive UI with visual feedback
-5. Progress tracking and quiz history
-6. Comprehensive N5 vocabulary library
-7. Automated report generation
-
-# 6. RESULTS & IMPACT
-- Successfully generates JLPT N5-level quizzes
-- Provides detailed, helpful feedback to learners
-- Improves accessibility to Japanese language education
-- Demonstrates practical AI application in education
-- Scalable framework for other languages/levels
-
-# 7. CHALLENGES OVERCOME
-- API integration and error handling
-- Quiz formatting consistency
-- Answer randomization for fairness
-- UI/UX optimization for learners
-- Session state management in Streamlit
-
-# 8. FUTURE ENHANCEMENTS
-1. Add N4, N3, N2, N1 levels
-2. Implement user authentication
-3. Add speaking/listening practice
-4. Gamification (points, streaks, badges)
-5. Mobile app version
-6. Community features (leaderboards, shared quizzes)
-7. Advanced analytics dashboard
-8. Integration with other learning platforms
-
-# 9. CONCLUSION
-NihongoAI successfully demonstrates the power of modern AI (Google Gemini) 
-in creating personalized, interactive educational experiences. The system 
-provides high-quality JLPT N5 practice materials while maintaining ease of 
-use and accessibility. It represents a scalable foundation for AI-driven 
-language education.
-
-FORMAT:
-- Use markdown with headers (#, ##, ###)
-- Use bullet points and numbered lists
-- Keep paragraphs concise
-- Include specific technical details
-- Maintain professional academic tone
-- Total length: 1000-1500 words
-
-Output the complete report now."""
-
-        response = self.model.generate_content(prompt)
-        report = response.text.strip()
+        report = self._generate(self._report_prompt(quiz_history, user_stats))
         print("✅ Report generated")
         return report
 
+    def _report_prompt(self, quiz_history: list, user_stats: dict) -> RenderedPrompt:
+        """Build the project report prompt."""
+        return GEMINI_TEMPLATES.render(
+            "report",
+            total_quizzes=user_stats.get('total_quizzes', 0),
+            ai_quizzes=user_stats.get('ai_quizzes', 0),
+            history_entries=len(quiz_history) if quiz_history else 0
+        )
+
+    # ================================================================
+    # STRUCTURED OUTPUT
+    # ================================================================
+    def _generate_quiz_json(self, topic, difficulty, num_questions, variant=0, use_cache=False):
+        """
+        Quiz from a schema-constrained JSON response.
+
+        Returns: (quiz_text, answer_key) rendered in the "1. / ○" format
+        """
+        prompt = self._quiz_prompt(topic, difficulty, num_questions, variant, template="quiz_json")
+        options = STRUCTURED_OUTPUT_CONFIG["options"]
+
+        def build(data):
+            repaired = repair_quiz(data, num_questions, options)
+            questions = list(repaired.questions)
+            self._check_fixups(repaired.broken)
+            for position, (problem, item) in repaired.broken.items():
+                spare = [choice for other in questions if other for choice in other["options"]]
+                question, problem, _ = repair_question(
+                    self._fixup(prompt, QUESTION_SCHEMA, problem, item, use_cache), options, spare
+                )
+                if question is None:
+                    raise StructuredOutputError(f"fix-up of question {position + 1} failed: {problem}")
+                questions[position] = question
+            return render_quiz(repaired.passage, questions), len(repaired.repairs), len(repaired.broken)
+
+        return self._structured("quiz", prompt, QUIZ_SCHEMA, build, use_cache)
+
+    def _analyze_answers_json(self, quiz_content: str, user_answers: dict) -> str:
+        """Feedback from a JSON analysis; the score is computed locally."""
+        prompt = self._analysis_prompt(quiz_content, user_answers, template="analysis_json")
+        counts = {q.num: len(q.options) for q in parse_quiz_questions(quiz_content)}
+
+        def build(data):
+            repaired = repair_analysis(data, list(user_answers), counts)
+            results = dict(repaired.results)
+            self._check_fixups(repaired.broken)
+            for num, (problem, item) in repaired.broken.items():
+                result, problem = parse_analysis_item(
+                    self._fixup(prompt, ANALYSIS_ITEM_SCHEMA, problem, item), counts.get(num, 4)
+                )
+                if result is None:
+                    raise StructuredOutputError(f"fix-up of question {num} failed: {problem}")
+                results[num] = result
+            return render_analysis(results, user_answers), len(repaired.repairs), len(repaired.broken)
+
+        return self._structured("analysis", prompt, ANALYSIS_SCHEMA, build)
+
+    def _structured(self, kind: str, prompt: RenderedPrompt, schema: dict, build, use_cache: bool = True):
+        """
+        Run a JSON prompt through local validation.
+        
+        Defects are repaired deterministically by build(); items that can't
+        be repaired get a targeted fix-up request; only a response that is
+        unusable as a whole (invalid JSON, too many broken items, failed
+        fix-up) is regenerated, once.
+        
+        Args:
+            build: Callable(data) -> (value, repairs, fixups), raising
+                   StructuredOutputError when the response is unusable
+        
+        Returns: the built value
+        """
+        for attempt in range(2):
+            try:
+                # A regeneration replaces the unusable response in the cache
+                text = self._generate(prompt, use_cache=use_cache and not attempt, schema=schema, store=use_cache)
+                value, repairs, fixups = build(load_json(text))
+            except StructuredOutputError as e:
+                error = e
+                print(f"⚠️ Unusable {kind} JSON ({e}){', regenerating' if not attempt else ''}")
+                continue
+            self._record_structured(kind, attempt, repairs, fixups)
+            return value
+
+        structured_stats.record(kind, "failed")
+        raise error
+
+    @staticmethod
+    def _record_structured(kind: str, attempt: int, repairs: int, fixups: int):
+        """Count the outcome of a usable structured response."""
+        outcome = "regenerated" if attempt else "fixed_up" if fixups else "repaired" if repairs else "parsed"
+        structured_stats.record(kind, outcome, repairs, fixups)
+        if repairs or fixups:
+            print(f"🔧 {kind.capitalize()} JSON: {repairs} local repair(s), {fixups} fix-up request(s)")
+
+    @staticmethod
+    def _check_fixups(broken: dict):
+        if len(broken) > STRUCTURED_OUTPUT_CONFIG["max_fixups"]:
+            raise StructuredOutputError(f"{len(broken)} broken items, more than fix-ups allow")
+
+    def _fixup_prompt(self, prompt: RenderedPrompt, problem: str, item) -> RenderedPrompt:
+        """Fix-up request for one broken (or missing) item of prompt's response."""
+        return GEMINI_TEMPLATES.render(
+            "json_fixup",
+            request=prompt.prompt,
+            problem=problem,
+            item=json.dumps(item, ensure_ascii=False)
+        )
+
+    def _fixup(self, prompt: RenderedPrompt, schema: dict, problem: str, item, use_cache: bool = True) -> dict:
+        """
+        Ask the model to correct just one broken (or missing) item.
+        
+        Args:
+            use_cache: The request's own use_cache, so an uncached quiz
+                       doesn't get a cached question from an earlier one
+        """
+        return load_json(self._generate(self._fixup_prompt(prompt, problem, item), use_cache=use_cache, schema=schema))
+
+    def structured_stats(self) -> dict:
+        """Parse/repair/fix-up/regenerate rates of structured responses."""
+        return structured_stats.rates()
+
+    # ================================================================
+    # MODEL CALLS
+    # ================================================================
+    def _generate(self, prompt: RenderedPrompt, use_cache: bool = True, schema: dict = None,
+                  store: bool = None) -> str:
+        """
+        Run prompt through the model, consulting the response cache first.
+        
+        Args:
+            use_cache: Serve a stored response for an identical request
+            schema: Response schema; asks the model for JSON matching it
+            store: Write the response to the cache (default: use_cache, so
+                   uncached requests don't evict entries that are reused)
+        
+        Returns: stripped response text
+        """
+        key = self._cache_key(prompt, schema)
+        if use_cache and self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                print("⚡ Cache hit")
+                return cached
+
+        text = self._call_model(prompt, schema)
+
+        if (use_cache if store is None else store) and self.cache is not None:
+            self.cache.set(key, text)
+        return text
+
+    def _generate_stream(self, prompt: RenderedPrompt, use_cache: bool = True):
+        """
+        Stream prompt through the model chunk by chunk.
+        
+        A cache hit is replayed as a single chunk; with use_cache a
+        completed stream is stored in the cache like a regular call.
+        """
+        key = self._cache_key(prompt)
+        if use_cache and self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                print("⚡ Cache hit")
+                yield cached
+                return
+
+        parts = []
+        with closing(self._stream_model(prompt)) as chunks:
+            for text in chunks:
+                parts.append(text)
+                yield text
+
+        if use_cache and self.cache is not None:
+            self.cache.set(key, "".join(parts).strip())
+
+    def _stream_model(self, prompt: RenderedPrompt):
+        """Single uncached streaming call to the Gemini model; yields text chunks."""
+        model, contents = self._model_request(prompt)
+        started = time.perf_counter()
+        response = model.generate_content(contents, stream=True)
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+        record_response_usage(prompt, response, time.perf_counter() - started)
+
+    def _call_model(self, prompt: RenderedPrompt, schema: dict = None) -> str:
+        """Single uncached call to the Gemini model."""
+        model, contents = self._model_request(prompt)
+        started = time.perf_counter()
+        response = model.generate_content(contents, **self._generation_kwargs(schema))
+        record_response_usage(prompt, response, time.perf_counter() - started)
+        return response.text.strip()
+
+    def _model_request(self, prompt: RenderedPrompt):
+        """
+        Model and contents for a rendered prompt.
+        
+        Gemini gets the static prefix as its system instruction (one model
+        object per prefix), so the prefix is identical across calls and
+        eligible for provider-side prefix caching. Other models receive the
+        prefix prepended to the prompt.
+        """
+        if self._system_model_factory is None:
+            return self.model, f"{prompt.system}\n\n{prompt.prompt}"
+
+        model = self._system_models.get(prompt.system)
+        if model is None:
+            model = self._system_models.setdefault(prompt.system, self._system_model_factory(prompt.system))
+        return model, prompt.prompt
+
+    @staticmethod
+    def _generation_kwargs(schema: dict = None) -> dict:
+        """generate_content() keyword arguments for a JSON response schema (none for text)."""
+        if schema is None:
+            return {}
+        return {"generation_config": {"response_mime_type": "application/json", "response_schema": schema}}
+
+    def _cache_key(self, prompt: RenderedPrompt, schema: dict = None) -> str:
+        """
+        Response cache key for a rendered prompt and its generation config.
+        
+        A JSON request (schema) and a text request for the same prompt get
+        different keys, so neither is served the other's response.
+        """
+        return ResponseCache.make_key(
+            self.model_name, prompt.prompt,
+            {"system": prompt.system, **self._generation_kwargs(schema)}
+        )
+
+    def usage_stats(self) -> dict:
+        """Prompt size, token and latency totals per template."""
+        return usage_tracker.usage()
+
+    def cache_stats(self) -> dict:
+        """Hit/miss counters of the response cache (empty when disabled)."""
+        return self.cache.stats() if self.cache is not None else {}
+
 
 # ================================================================
 # TESTING
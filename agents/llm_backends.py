@@ -0,0 +1,432 @@
+"""
+NihongoAI – pluggable model backends
+Gemini-compatible stand-ins for hermetic benchmarks and load tests
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+from config.gemini_prompts import GEMINI_TEMPLATES
+from config.settings import BACKEND_CONFIG
+from utils.vocab_store import load_vocabulary
+
+
+class LLMBackend:
+    """
+    Interface every model backend implements.
+
+    Mirrors the subset of google.generativeai.GenerativeModel that
+    NihongoCrew uses: generate_content(contents, stream=False) returns a
+    response with .text and .usage_metadata; with stream=True it returns
+    an iterable of chunks with .text whose usage_metadata is filled in
+    once iteration finishes (generate_content_async(stream=True) returns
+    an async iterable). generation_config carries the JSON response
+    schema of structured requests.
+    """
+
+    model_name = "backend"
+
+    def generate_content(self, contents, stream=False, generation_config=None):
+        raise NotImplementedError
+
+    async def generate_content_async(self, contents, stream=False, generation_config=None):
+        response = await asyncio.to_thread(
+            self.generate_content, contents, stream=stream, generation_config=generation_config
+        )
+        return _AsyncStream(response) if stream else response
+
+
+def _usage(contents, text):
+    """Rough token counts (about 4 characters per token)."""
+    return SimpleNamespace(
+        prompt_token_count=math.ceil(len(contents) / 4),
+        candidates_token_count=math.ceil(len(text) / 4),
+        cached_content_token_count=0
+    )
+
+
+def _chunked(text, chunks):
+    """Split text into roughly equal pieces for simulated streaming."""
+    size = max(1, math.ceil(len(text) / max(chunks, 1)))
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class _Stream:
+    """Iterable streamed response with per-chunk delay."""
+
+    def __init__(self, pieces, delay, usage):
+        self._pieces = pieces
+        self._delay = delay
+        self._usage = usage
+        self.usage_metadata = None
+
+    def __iter__(self):
+        for piece in self._pieces:
+            time.sleep(self._delay)
+            yield SimpleNamespace(text=piece)
+        self.usage_metadata = self._usage
+
+    async def __aiter__(self):
+        for piece in self._pieces:
+            await asyncio.sleep(self._delay)
+            yield SimpleNamespace(text=piece)
+        self.usage_metadata = self._usage
+
+
+class _AsyncStream:
+    """Async iteration over a blocking streamed response, one thread hop per chunk."""
+
+    def __init__(self, response):
+        self._response = response
+
+    @property
+    def usage_metadata(self):
+        return self._response.usage_metadata
+
+    async def __aiter__(self):
+        chunks = iter(self._response)
+        while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+            yield chunk
+
+
+# ================================================================
+# SYNTHETIC MODEL
+# ================================================================
+class SyntheticModel(LLMBackend):
+    """
+    Deterministic offline model.
+
+    Recognizes which NihongoCrew template a request came from by its exact
+    system prefix and answers in that template's format ("1. / ○" quizzes
+    with an answer key, feedback, explanations, reports, JSON for the
+    structured templates); the classic もんだい prompts get もんだい/せいかい
+    quizzes. Latency follows a configurable distribution, failures are
+    injected at error_rate and malformed JSON items at defect_rate.
+    """
+
+    model_name = "synthetic"
+
+    def __init__(self, latency_distribution="lognormal", latency_median=1.0, latency_sigma=0.5,
+                 error_rate=0.0, defect_rate=0.0, stream_chunks=12, seed=0, vocab_path=None):
+        self.latency_distribution = latency_distribution
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.defect_rate = defect_rate
+        self.stream_chunks = stream_chunks
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._vocab = self._load_vocab(vocab_path)
+        self._kanji_words = [w for w in self._vocab if w[0]] or self._vocab
+        self._templates = sorted(
+            ((GEMINI_TEMPLATES.get(name).system, name) for name in GEMINI_TEMPLATES.names()),
+            key=lambda item: -len(item[0])
+        )
+
+    @staticmethod
+    def _load_vocab(path):
+        try:
+            vocab = load_vocabulary(path, levels=["N5"])
+            return list(zip(vocab.column("Kanji"), vocab.column("Hiragana"), vocab.column("English")))
+        except OSError:
+            return [("本", "ほん", "book"), ("人", "ひと", "person"), ("水", "みず", "water"),
+                    ("山", "やま", "mountain"), ("川", "かわ", "river"), ("車", "くるま", "car")]
+
+    # ----------------------------------------------------------------
+    # Gemini-compatible API
+    # ----------------------------------------------------------------
+    def generate_content(self, contents, stream=False, generation_config=None):
+        latency, fail, text = self._prepare(contents)
+        if not stream:
+            time.sleep(latency)
+            if fail:
+                raise ConnectionError("synthetic model failure")
+            return SimpleNamespace(text=text, usage_metadata=_usage(contents, text))
+
+        if fail:
+            time.sleep(latency)
+            raise ConnectionError("synthetic model failure")
+        pieces = _chunked(text, self.stream_chunks)
+        return _Stream(pieces, latency / len(pieces), _usage(contents, text))
+
+    async def generate_content_async(self, contents, stream=False, generation_config=None):
+        latency, fail, text = self._prepare(contents)
+        if not stream:
+            await asyncio.sleep(latency)
+            if fail:
+                raise ConnectionError("synthetic model failure")
+            return SimpleNamespace(text=text, usage_metadata=_usage(contents, text))
+
+        if fail:
+            await asyncio.sleep(latency)
+            raise ConnectionError("synthetic model failure")
+        pieces = _chunked(text, self.stream_chunks)
+        return _Stream(pieces, latency / len(pieces), _usage(contents, text))
+
+    def _prepare(self, contents):
+        """Draw latency, failure and response text under one lock (reproducible)."""
+        with self._lock:
+            return self._sample_latency(), self._random.random() < self.error_rate, self._respond(contents)
+
+    def _sample_latency(self):
+        if self.latency_distribution == "constant":
+            return self.latency_median
+        if self.latency_distribution == "uniform":
+            return self._random.uniform(0, 2 * self.latency_median)
+        return self.latency_median * math.exp(self.latency_sigma * self._random.gauss(0, 1))
+
+    # ----------------------------------------------------------------
+    # Responses
+    # ----------------------------------------------------------------
+    def _respond(self, contents):
+        for system, name in self._templates:
+            if contents.startswith(system):
+                prompt = contents[len(system):]
+                return getattr(self, f"_respond_{name}")(prompt)
+        if "もんだい" in contents:
+            return self._classic_quiz()
+        return "OK"
+
+    def _reading_options(self, count):
+        """A kanji word plus count reading options, the correct one included."""
+        kanji, reading, _ = self._random.choice(self._kanji_words)
+        options = [reading]
+        while len(options) < count:
+            candidate = self._random.choice(self._vocab)[1]
+            if candidate not in options:
+                options.append(candidate)
+        self._random.shuffle(options)
+        return kanji, reading, options
+
+    def _quiz(self, num_questions):
+        lines, key = [], []
+        for i in range(1, num_questions + 1):
+            kanji, reading, options = self._reading_options(4)
+            lines.append(f"{i}. {kanji}")
+            lines.extend(f"○ {opt}" for opt in options)
+            lines.append("")
+            key.append(f"{i}={chr(65 + options.index(reading))}")
+        lines.append("ANSWER KEY: " + " ".join(key))
+        return "\n".join(lines)
+
+    def _respond_quiz(self, prompt):
+        match = re.search(r"EXACTLY (\d+)", prompt)
+        return self._quiz(int(match.group(1)) if match else 5)
+
+    def _respond_packed_quiz(self, prompt):
+        counts = [int(n) for n in re.findall(r"- QUIZ \d+: EXACTLY (\d+)", prompt)]
+        return "\n\n".join(f"=== QUIZ {k} ===\n{self._quiz(n)}" for k, n in enumerate(counts, 1))
+
+    def _respond_analysis(self, prompt):
+        match = re.search(r"\(JSON\):\s*(\{.*\})", prompt, re.S)
+        answers = json.loads(match.group(1)) if match else {}
+        blocks, score = [], 0
+        for num in sorted(answers, key=int):
+            correct = self._random.choice("ABCD")
+            ok = answers[num] == correct
+            score += ok
+            blocks.append(
+                f"Q{num}: {'Correct' if ok else 'Incorrect'}\n"
+                f"- Your answer: {answers[num] or '—'}\n"
+                f"- Correct answer: {correct}\n"
+                f"- Reason: Synthetic explanation for question {num}."
+            )
+        total = len(answers)
+        percent = round(100 * score / total) if total else 0
+        return "\n\n".join([f"Score: {score} / {total} ({percent}%)"] + blocks)
+
+    def _json_question(self):
+        kanji, reading, options = self._reading_options(4)
+        return {"question": kanji, "options": options, "answer": options.index(reading)}
+
+    def _defective(self, question):
+        """question with one drift seen in real JSON output."""
+        options, answer = list(question["options"]), question["answer"]
+        wrong = [i for i in range(len(options)) if i != answer]
+        defect = self._random.choice(("missing", "extra", "duplicate", "out_of_range"))
+        if defect == "missing":
+            del options[wrong[-1]]
+            if answer < len(question["options"]):  # 1-based answers may already be out of range
+                answer = options.index(question["options"][answer])
+        elif defect == "extra":
+            options.append(self._random.choice(self._vocab)[1] + "か")
+        elif defect == "duplicate":
+            options[wrong[0]] = options[wrong[1]]
+        else:
+            answer = len(options) + 2
+        return {**question, "options": options, "answer": answer}
+
+    def _respond_quiz_json(self, prompt):
+        match = re.search(r"EXACTLY (\d+)", prompt)
+        questions = [self._json_question() for _ in range(int(match.group(1)) if match else 5)]
+        roll = self._random.random()
+        if roll < self.defect_rate / 10:
+            # Truncated response: only a regeneration helps
+            return json.dumps({"passage": "", "questions": questions}, ensure_ascii=False)[:40]
+        if roll < self.defect_rate / 5:
+            questions = [{**q, "answer": q["answer"] + 1} for q in questions]
+            for i in range(min(2, len(questions))):
+                questions[i] = {**questions[i], "answer": len(questions[i]["options"])}
+        questions = [self._defective(q) if self._random.random() < self.defect_rate / 2 else q for q in questions]
+        return json.dumps({"passage": "", "questions": questions}, ensure_ascii=False)
+
+    def _respond_analysis_json(self, prompt):
+        match = re.search(r"\(JSON\):\s*(\{.*\})", prompt, re.S)
+        answers = json.loads(match.group(1)) if match else {}
+        results = [
+            {"question": int(num), "answer": self._random.randrange(4),
+             "reason": f"Synthetic explanation for question {num}."}
+            for num in sorted(answers, key=int)
+        ]
+        if results and self._random.random() < self.defect_rate:
+            del results[self._random.randrange(len(results))]
+        return json.dumps({"results": results}, ensure_ascii=False)
+
+    def _respond_json_fixup(self, prompt):
+        if "STUDENT'S ANSWERS" in prompt:
+            match = re.search(r"question (\d+)", prompt)
+            num = int(match.group(1)) if match else 1
+            return json.dumps({"question": num, "answer": self._random.randrange(4),
+                               "reason": f"Synthetic explanation for question {num}."}, ensure_ascii=False)
+        return json.dumps(self._json_question(), ensure_ascii=False)
+
+    def _respond_explain(self, prompt):
+        nums = re.findall(r"^Q(\d+):", prompt, re.M)
+        return "\n".join(f"Q{n}: Synthetic explanation for question {n}." for n in nums)
+
+    def _respond_explain_question(self, prompt):
+        match = re.search(r"CORRECT: (\w)", prompt)
+        return f"Option {match.group(1) if match else 'A'} is correct (synthetic explanation)."
+
+    def _respond_report(self, prompt):
+        return "# NihongoAI Project Report\n\n## 1. Executive Summary\nSynthetic report body.\n\n" + prompt.strip()
+
+    def _classic_quiz(self):
+        lines, key = [], []
+        for i in range(1, 5):
+            kanji, reading, options = self._reading_options(3)
+            lines.append(f"もんだい{i}: 「{kanji}」の　よみかたは　なんですか。")
+            lines.extend(f"{chr(65 + j)}) {opt}" for j, opt in enumerate(options))
+            lines.append("")
+            key.append(f"{i}) {chr(65 + options.index(reading))}")
+        return "\n".join(lines + ["せいかい:"] + key)
+
+
+# ================================================================
+# RECORD / REPLAY
+# ================================================================
+def _request_key(contents):
+    return hashlib.sha256(contents.encode("utf-8")).hexdigest()
+
+
+class RecordingModel(LLMBackend):
+    """Wrap a real model and append every response to a JSONL capture file."""
+
+    def __init__(self, inner, path):
+        self.inner = inner
+        self.path = path
+        self.model_name = getattr(inner, "model_name", "recorded")
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def generate_content(self, contents, stream=False, generation_config=None):
+        started = time.perf_counter()
+        kwargs = {"generation_config": generation_config} if generation_config else {}
+        response = self.inner.generate_content(contents, **kwargs)
+        self._append(contents, response.text, time.perf_counter() - started)
+        if stream:
+            return _Stream([response.text], 0.0, getattr(response, "usage_metadata", None))
+        return response
+
+    def _append(self, contents, text, latency):
+        record = {"key": _request_key(contents), "text": text, "latency": round(latency, 4)}
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class ReplayModel(LLMBackend):
+    """
+    Play back responses captured by RecordingModel.
+
+    Requests are matched on the exact prompt text; unknown requests go to
+    the fallback model when one is given and raise KeyError otherwise.
+    """
+
+    model_name = "replay"
+
+    def __init__(self, path, replay_latency=True, fallback=None, stream_chunks=12):
+        self.replay_latency = replay_latency
+        self.fallback = fallback
+        self.stream_chunks = stream_chunks
+        self.hits = 0
+        self.misses = 0
+        self._records = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self._records[record["key"]] = record
+
+    def generate_content(self, contents, stream=False, generation_config=None):
+        record = self._records.get(_request_key(contents))
+        if record is None:
+            self.misses += 1
+            if self.fallback is None:
+                raise KeyError("no recorded response for this prompt")
+            return self.fallback.generate_content(contents, stream=stream, generation_config=generation_config)
+
+        self.hits += 1
+        latency = record["latency"] if self.replay_latency else 0.0
+        text = record["text"]
+        if stream:
+            pieces = _chunked(text, self.stream_chunks)
+            return _Stream(pieces, latency / len(pieces), _usage(contents, text))
+        time.sleep(latency)
+        return SimpleNamespace(text=text, usage_metadata=_usage(contents, text))
+
+
+# ================================================================
+# SELECTION
+# ================================================================
+def selected_backend():
+    """Backend name from the LLM_BACKEND env var, else BACKEND_CONFIG."""
+    return os.getenv("LLM_BACKEND", BACKEND_CONFIG["backend"]).lower()
+
+
+def create_model(real_model_factory=None):
+    """
+    Build the configured model backend
+
+    Args:
+        real_model_factory: Callable returning the live model (used by "record")
+
+    Returns:
+        The model object, or None for "gemini" (the caller builds the live model)
+    """
+    name = selected_backend()
+    synthetic = BACKEND_CONFIG["synthetic"]
+
+    if name == "synthetic":
+        return SyntheticModel(**synthetic)
+    if name == "replay":
+        return ReplayModel(
+            BACKEND_CONFIG["replay_path"],
+            replay_latency=BACKEND_CONFIG["replay_latency"],
+            fallback=SyntheticModel(**synthetic) if BACKEND_CONFIG["replay_fallback"] else None
+        )
+    if name == "record":
+        return RecordingModel(real_model_factory(), BACKEND_CONFIG["replay_path"])
+    if name == "gemini":
+        return None
+    raise ValueError(f"Unknown LLM backend '{name}' (use gemini, synthetic, replay or record)")
@@ -6,7 +6,7 @@ from dotenv import load_dotenv
 from config.settings import PAGE_CONFIG, CUSTOM_CSS
 from utils.session_state import initialize_session_state
 from components.sidebar import render_sidebar
-from pages_modules import home, quiz, library, progress
+from utils.startup import prewarm
 
 # Load environment variables
 load_dotenv()
@@ -23,14 +23,18 @@ initialize_session_state()
 # Render sidebar and get selected page
 page = render_sidebar()
 
-# Route to appropriate page
+# Route to appropriate page (each page module is imported when first shown)
 if page == "🏠 Home":
+    from pages_modules import home
     home.render()
 elif page == "📝 Quiz":
+    from pages_modules import quiz
     quiz.render()
 elif page == "📚 Library":
+    from pages_modules import library
     library.render()
 elif page == "📊 Progress":
+    from pages_modules import progress
     progress.render()
 
 # Footer
@@ -39,4 +43,7 @@ st.markdown("""
     <div style='text-align: center; color: #666; padding: 1rem;'>
         <p>NihongoAI - Powered by AI 🤖 | がんばって! (Ganbare - Do your best!)</p>
     </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+# First page is out: load the quiz page and its HTTP client in the background
+prewarm(["pages_modules.quiz", "huggingface_hub"])
@@ -6,19 +6,27 @@ import streamlit as st
 from dotenv import load_dotenv
 from datetime import datetime
 
+from utils.rerun_timing import RerunTimer, rerun_fragment, rerun_stats, timed_fragment
+
+# Time this script run (fragment reruns are timed separately)
+rerun_timer = RerunTimer("app")
+
 # Load environment
 load_dotenv()
 
 # Import configurations
-from config.settings import PAGE_CONFIG, CUSTOM_CSS
+from config.settings import PAGE_CONFIG, CUSTOM_CSS, EXPLANATION_CONFIG, STRUCTURED_OUTPUT_CONFIG
 from utils.session_state import initialize_session_state
 from components.sidebar import render_sidebar
+from components.metrics_panel import render_metrics_panel
 
-# Import pages
-from pages_modules import home, library, progress
-
-# Import backend
-from agents.gemini_backend import NihongoCrew
+# Import backend (the Gemini SDK itself is imported when the backend is built)
+from agents.async_backend import ResilientNihongoCrew
+from utils.quiz_pool import create_quiz_pool
+from utils.prompt_registry import usage_tracker
+from utils.quiz_schema import structured_stats
+from utils.response_cache import get_response_cache
+from utils.startup import prewarm
 
 # Page configuration
 st.set_page_config(**PAGE_CONFIG)
@@ -32,24 +40,55 @@ initialize_session_state()
 def get_gemini_backend():
     """Initialize and cache the Gemini backend"""
     try:
-        return NihongoCrew()
+        return ResilientNihongoCrew()
     except Exception as e:
         st.error(f"Failed to initialize AI system: {e}")
         return None
 
-# Get cached backend
-gemini_backend = get_gemini_backend()
+@st.cache_resource
+def get_quiz_pool(_backend):
+    """Start the shared background quiz pool for the backend"""
+    return create_quiz_pool(
+        lambda topic, difficulty, num_questions: _backend.generate_quiz_with_key(
+            topic=topic,
+            difficulty=difficulty,
+            num_questions=num_questions,
+            use_cache=False
+        )
+    )
 
-if 'agent_quizzes' not in st.session_state:
-    st.session_state.agent_quizzes = []
+def warm_backend():
+    """Build the backend and start the quiz pool ahead of the first Quiz visit"""
+    backend = get_gemini_backend()
+    if backend:
+        get_quiz_pool(backend)
 
 # Render sidebar
 page = render_sidebar()
 
+# Only the Quiz page needs the backend up front; elsewhere it is left to the
+# background pre-warm so the first page doesn't wait for the AI SDK
+if page == "📝 Quiz":
+    gemini_backend = get_gemini_backend()
+    quiz_pool = get_quiz_pool(gemini_backend) if gemini_backend else None
+else:
+    gemini_backend = quiz_pool = None
+
+response_cache = get_response_cache()
+render_metrics_panel(
+    gemini_backend.cache_stats() if gemini_backend else (response_cache.stats() if response_cache else None),
+    quiz_pool.stats() if quiz_pool else None,
+    gemini_backend.resilience_stats() if gemini_backend else None,
+    usage_tracker.usage(),
+    structured_stats.rates(),
+    rerun_stats.summary()
+)
+
 # ================================================================
 # HOME PAGE
 # ================================================================
 if page == "🏠 Home":
+    from pages_modules import home
     home.render()
 
 # ================================================================
@@ -59,7 +98,11 @@ elif page == "📝 Quiz":
     st.markdown("<h1 class='main-header'>AI-Powered Quiz 🤖</h1>", unsafe_allow_html=True)
     
     # Import display functions
-    from utils.quiz_display import display_quiz_beautiful, display_feedback_beautiful
+    from utils.quiz_display import (
+        display_quiz_beautiful, display_quiz_streaming, display_feedback_beautiful,
+        display_graded_feedback, parse_quiz_questions
+    )
+    from utils.grading import split_answer_key, grade_answers, format_feedback
     
     if gemini_backend is None:
         st.error("❌ AI system not available. Check GEMINI_API_KEY in .env")
@@ -98,39 +141,55 @@ elif page == "📝 Quiz":
     # Generate quiz button
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
-        if st.button("🚀 Generate AI Quiz", type="primary", use_container_width=True):
-            with st.spinner("🤖 AI is creating your quiz... (5-10 seconds)"):
-                try:
-                    # Generate quiz
-                    result = gemini_backend.generate_quiz(
+        generate_clicked = st.button("🚀 Generate AI Quiz", type="primary", use_container_width=True)
+    
+    if generate_clicked:
+        try:
+            # Take a pre-generated quiz, or stream one live
+            result = quiz_pool.get(topic, difficulty, num_questions) if quiz_pool else None
+            if result is None:
+                result = split_answer_key(display_quiz_streaming(
+                    gemini_backend.generate_quiz_stream(
                         topic=topic,
                         difficulty=difficulty,
                         num_questions=num_questions
                     )
-                    
-                    # Store quiz
-                    quiz_data = {
-                        'content': str(result),
-                        'topic': topic,
-                        'difficulty': difficulty,
-                        'num_questions': num_questions,
-                        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M"),
-                        'mode': 'Gemini 2.5'
-                    }
-                    st.session_state.agent_quizzes.append(quiz_data)
-                    st.session_state.current_quiz = quiz_data
-                    
-                    # Clear previous answers
-                    for key in list(st.session_state.keys()):
-                        if key.startswith('q_'):
-                            del st.session_state[key]
-                    
-                    st.success("✅ Quiz generated successfully!")
-                    st.rerun()
-                    
-                except Exception as e:
-                    st.error(f"❌ Error: {str(e)}")
-                    st.info("💡 Check internet connection or try again")
+                ))
+                if not parse_quiz_questions(result[0]) and STRUCTURED_OUTPUT_CONFIG["enabled"]:
+                    # The stream drifted from the format: get a validated JSON quiz instead
+                    with st.spinner("🔧 Fixing the quiz format..."):
+                        result = gemini_backend.generate_quiz_with_key(
+                            topic=topic,
+                            difficulty=difficulty,
+                            num_questions=num_questions,
+                            use_cache=False
+                        )
+            quiz_text, answer_key = result
+            
+            # Store quiz (the answer key stays server-side, never rendered)
+            quiz_data = {
+                'content': str(quiz_text),
+                'answer_key': answer_key,
+                'topic': topic,
+                'difficulty': difficulty,
+                'num_questions': num_questions,
+                'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M"),
+                'mode': 'Gemini 2.5'
+            }
+            quiz_data['history_seq'] = st.session_state.agent_quizzes.append(quiz_data)
+            st.session_state.current_quiz = quiz_data
+            
+            # Clear previous answers
+            for key in list(st.session_state.keys()):
+                if key.startswith('q_'):
+                    del st.session_state[key]
+            
+            st.success("✅ Quiz generated successfully!")
+            st.rerun()
+            
+        except Exception as e:
+            st.error(f"❌ Error: {str(e)}")
+            st.info("💡 Check internet connection or try again")
     
     # Display quiz
     if st.session_state.get('current_quiz'):
@@ -157,6 +216,15 @@ elif page == "📝 Quiz":
             if st.button("📊 Submit & Get Feedback", type="primary", use_container_width=True):
                 if not user_answers or len(user_answers) < quiz['num_questions']:
                     st.warning(f"⚠️ Please answer all {quiz['num_questions']} questions!")
+                elif quiz.get('answer_key') and set(user_answers) <= set(quiz['answer_key']):
+                    # Score locally against the stored key; explanations come on demand
+                    quiz['results'] = grade_answers(quiz['answer_key'], user_answers)
+                    quiz['reasons'] = {}
+                    quiz['explained'] = set()
+                    quiz['feedback'] = format_feedback(quiz['results'])
+                    quiz['user_answers'] = user_answers
+                    st.session_state.agent_quizzes.update(quiz['history_seq'], quiz)
+                    st.success("✅ Quiz graded!")
                 else:
                     with st.spinner("🤖 Analyzing answers... (5-10 seconds)"):
                         try:
@@ -166,18 +234,50 @@ elif page == "📝 Quiz":
                             )
                             
                             st.success("✅ Analysis Complete!")
-                            st.markdown("---")
-                            
-                            # Display feedback
-                            display_feedback_beautiful(feedback)
                             
                             # Store feedback
+                            quiz['results'] = None
                             quiz['feedback'] = str(feedback)
                             quiz['user_answers'] = user_answers
+                            st.session_state.agent_quizzes.update(quiz['history_seq'], quiz)
                             
                         except Exception as e:
                             st.error(f"❌ Error: {str(e)}")
         
+        # Feedback stays on screen across reruns so explanations can be requested;
+        # an "Explain" click reruns only this fragment
+        @timed_fragment("feedback")
+        def feedback_area(quiz):
+            if quiz.get('results'):
+                st.markdown("---")
+                requested = display_graded_feedback(quiz['results'], quiz['reasons'])
+                
+                # Explain wrong answers up front, anything else only when asked
+                if EXPLANATION_CONFIG["auto_explain_incorrect"]:
+                    requested += [
+                        r['num'] for r in quiz['results']
+                        if not r['is_correct'] and r['num'] not in quiz['explained']
+                    ]
+                
+                if requested:
+                    questions = {q.num: q for q in parse_quiz_questions(quiz['content'])}
+                    items = [
+                        (questions[r['num']], r) for r in quiz['results']
+                        if r['num'] in requested and r['num'] in questions
+                    ]
+                    quiz['explained'].update(requested)
+                    with st.spinner(f"🤖 Explaining {len(items)} question(s)..."):
+                        quiz['reasons'].update(gemini_backend.explain_questions(items))
+                    quiz['feedback'] = format_feedback(quiz['results'], quiz['reasons'])
+                    st.session_state.agent_quizzes.update(quiz['history_seq'], quiz)
+                    rerun_fragment()
+            
+            elif quiz.get('feedback'):
+                st.markdown("---")
+                display_feedback_beautiful(quiz['feedback'])
+        
+        feedback_area(quiz)
+        
         # Action buttons
         st.markdown("---")
         col1, col2, col3 = st.columns(3)
@@ -207,12 +307,14 @@ elif page == "📝 Quiz":
 # LIBRARY PAGE
 # ================================================================
 elif page == "📚 Library":
+    from pages_modules import library
     library.render()
 
 # ================================================================
 # PROGRESS PAGE
 # ================================================================
 elif page == "📊 Progress":
+    from pages_modules import progress
     progress.render()
     
     # AI Report Generation
@@ -222,6 +324,7 @@ elif page == "📊 Progress":
         st.info(f"📊 You have completed {len(st.session_state.agent_quizzes)} AI quizzes")
         
         if st.button("📄 Generate Comprehensive Report", type="primary"):
+            gemini_backend = get_gemini_backend()
             if gemini_backend is None:
                 st.error("❌ AI system not available")
             else:
@@ -234,7 +337,7 @@ elif page == "📊 Progress":
                         }
                         
                         report = gemini_backend.generate_project_report(
-                            quiz_history=st.session_state.quiz_history + st.session_state.agent_quizzes,
+                            quiz_history=st.session_state.quiz_history.summaries() + st.session_state.agent_quizzes.summaries(),
                             user_stats=stats
                         )
                         
@@ -261,4 +364,9 @@ st.markdown("""
         <p>NihongoAI - Powered by Google Gemini 2.5 Flash 🤖</p>
         <p style='font-size: 0.9rem;'>AI-Driven Japanese Language Learning Platform</p>
     </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+rerun_timer.stop()
+
+# First page is out: import the AI SDK and fill the quiz pool in the background
+prewarm(warmers=[warm_backend])
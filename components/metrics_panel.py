@@ -0,0 +1,78 @@
+"""
+Performance metrics panel component
+"""
+import streamlit as st
+
+def render_metrics_panel(cache_stats=None, pool_stats=None, resilience_stats=None, usage_stats=None,
+                         structured_stats=None, rerun_stats=None):
+    """
+    Render runtime performance metrics in the sidebar
+    
+    Args:
+        cache_stats (dict): Output of ResponseCache.stats()
+        pool_stats (dict): Output of QuizPool.stats()
+        resilience_stats (dict): Output of AsyncNihongoCrew.resilience_stats()
+        usage_stats (dict): Output of UsageTracker.usage()
+        structured_stats (dict): Output of StructuredOutputStats.rates()
+        rerun_stats (dict): Output of RerunStats.summary()
+    """
+    with st.sidebar.expander("⚙️ Performance", expanded=False):
+        if cache_stats:
+            st.markdown("**Response cache**")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Hits", cache_stats["hits"])
+            with col2:
+                st.metric("Misses", cache_stats["misses"])
+            st.caption(
+                f"Hit ratio {cache_stats['hit_ratio']:.0%} · "
+                f"{cache_stats['entries']} entries · {cache_stats['bytes'] / 1024:.0f} KB"
+            )
+        else:
+            st.caption("Response cache disabled")
+        
+        if pool_stats:
+            st.markdown("**Quiz pool**")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Ready", f"{pool_stats['depth']}/{pool_stats['capacity']}")
+            with col2:
+                st.metric("Hit ratio", f"{pool_stats['hit_ratio']:.0%}")
+            st.caption(
+                f"{pool_stats['generated']} generated · "
+                f"{pool_stats['refill_rate']:.1f}/min · {pool_stats['errors']} errors"
+            )
+        
+        if resilience_stats:
+            st.markdown("**Model calls**")
+            st.caption(
+                f"{resilience_stats['calls']} calls · {resilience_stats['retries']} retries · "
+                f"{resilience_stats['timeouts']} timeouts · breaker {resilience_stats['breaker']}"
+            )
+        
+        if usage_stats:
+            st.markdown("**Token usage by template**")
+            for name, usage in sorted(usage_stats.items()):
+                st.caption(
+                    f"`{name}` · {usage['calls']} calls · "
+                    f"{usage['input_tokens']:,} in / {usage['output_tokens']:,} out tokens · "
+                    f"{usage['prompt_chars'] // max(usage['calls'], 1):,} chars/prompt · "
+                    f"{usage['avg_latency_ms']:.0f} ms"
+                )
+        
+        if structured_stats:
+            st.markdown("**Structured output**")
+            for kind, stats in sorted(structured_stats.items()):
+                st.caption(
+                    f"`{kind}` · {stats['responses']} responses · "
+                    f"{stats['parse_rate']:.0%} parsed · {stats['repair_rate']:.0%} repaired · "
+                    f"{stats['fixup_rate']:.0%} fixed up · {stats['regenerate_rate']:.0%} regenerated"
+                )
+        
+        if rerun_stats:
+            st.markdown("**Rerun time**")
+            for scope, timing in sorted(rerun_stats.items()):
+                st.caption(
+                    f"`{scope}` · {timing['runs']} runs · avg {timing['avg_ms']:.0f} ms · "
+                    f"p95 {timing['p95_ms']:.0f} ms · last {timing['last_ms']:.0f} ms"
+                )
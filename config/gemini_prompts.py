@@ -0,0 +1,339 @@
+"""
+Prompt templates for the Gemini backend
+Static instructions go in the system prefix; only the variable part changes per call
+"""
+from utils.prompt_registry import PromptRegistry, PromptTemplate
+
+# Style, format and answer-key rules shared by single and packed quiz prompts
+# (the JSON prompt reuses style and randomization with its own format)
+QUIZ_STYLE = """STYLE REQUIREMENTS:
+- Short, simple N5-level sentences
+- Natural JLPT exam style
+- Use polite form (です/ます) when appropriate
+- One blank per sentence for grammar/vocabulary
+- For kanji reading, show kanji and give kana options
+
+QUESTION TYPES:
+
+If topic is "kanji":
+  Focus on kanji readings like:
+  1. 来月
+  ○ らいげつ
+  ○ らいがつ
+  ○ くがつ
+  ○ くげつ
+
+If topic is "grammar":
+  Focus on particles/grammar:
+  1. まいにち しんぶん ______ よみます。
+  ○ へ
+  ○ を
+  ○ に
+  ○ が
+
+If topic is "vocabulary":
+  Focus on word meanings:
+  1. わたしは いつも ______ を ききながら べんきょうします。
+  ○ ペン
+  ○ ラジオ
+  ○ テーブル
+  ○ ストーブ
+
+If topic is "reading":
+  - First show a 3-5 sentence passage (N5 level)
+  - Then ask questions about it in same MC format"""
+
+QUIZ_FORMAT = """FORMAT (FOLLOW EXACTLY):
+
+1. Number questions: 1., 2., 3., etc.
+2. Each option on separate line starting with "○ " (circle + space)
+3. ONE blank line between questions
+4. Plain text only, no markdown
+5. DO NOT mark correct answers next to the options
+6. NO explanations, greetings, or comments
+7. After the last question, add ONE final line with the answer key:
+   ANSWER KEY: 1=B 2=D 3=A 4=C
+   (question number = letter of the correct option, A = first option)"""
+
+QUIZ_RANDOMIZATION = """RANDOMIZATION (CRITICAL):
+- For each question, randomly place the correct answer as A, B, C, or D
+- NEVER make all answers the same letter (e.g., all A)
+- Distribute correct answers across all options
+- Example: Q1=B, Q2=D, Q3=A, Q4=C is good
+- Example: Q1=A, Q2=A, Q3=A, Q4=A is BAD"""
+
+QUIZ_RULES = f"{QUIZ_STYLE}\n\n{QUIZ_FORMAT}\n\n{QUIZ_RANDOMIZATION}"
+
+QUIZ_TEACHER = "You are a professional Japanese teacher creating JLPT practice questions."
+
+GEMINI_TEMPLATES = PromptRegistry([
+    PromptTemplate(
+        "quiz",
+        system=f"""{QUIZ_TEACHER}
+
+{QUIZ_RULES}
+
+Output ONLY the quiz and the answer key line. Start with "1." immediately.""",
+        template="""LEVEL: JLPT {difficulty}
+
+GOAL: Create EXACTLY {num_questions} multiple-choice questions.
+
+TOPIC HINT: {topic_hint}
+{variant_hint}"""
+    ),
+
+    PromptTemplate(
+        "packed_quiz",
+        system=f"""{QUIZ_TEACHER}
+
+{QUIZ_RULES}
+
+PACKING (CRITICAL):
+- Start each quiz with a line "=== QUIZ k ===" (k = 1, 2, ...)
+- Number questions from 1. inside every quiz
+- End every quiz with its own ANSWER KEY line
+
+Output ONLY the quizzes. Start with "=== QUIZ 1 ===" immediately.""",
+        template="""LEVEL: JLPT {difficulty}
+
+GOAL: Create {count} independent multiple-choice quizzes:
+{requests}"""
+    ),
+
+    PromptTemplate(
+        "quiz_json",
+        system=f"""{QUIZ_TEACHER}
+
+{QUIZ_STYLE}
+
+{QUIZ_RANDOMIZATION}
+
+JSON FORMAT (FOLLOW EXACTLY):
+- "passage": the reading passage for "reading" quizzes, otherwise ""
+- "questions": one object per question with
+  - "question": the question line (blank written as ______), no number
+  - "options": EXACTLY 4 distinct option strings, no "○" or letters
+  - "answer": index of the correct option, 0 = first option
+- Output ONLY the JSON object""",
+        template="""LEVEL: JLPT {difficulty}
+
+GOAL: Create EXACTLY {num_questions} multiple-choice questions.
+
+TOPIC HINT: {topic_hint}
+{variant_hint}"""
+    ),
+
+    PromptTemplate(
+        "analysis",
+        system="""You are a JLPT N5 teacher checking a multiple-choice quiz.
+You receive the QUIZ (questions only, no answer key) and the STUDENT'S ANSWERS (JSON).
+
+YOUR TASK:
+
+1. For EACH question:
+   - Determine which option is correct based on the quiz
+   - Compare student's answer to your correct answer
+
+2. Calculate total score X / N and percentage
+
+3. OUTPUT FORMAT (FOLLOW EXACTLY):
+
+Score: X / N (Y%)
+
+Q1: Correct/Incorrect
+- Your answer: [letter or "—" if blank]
+- Correct answer: [letter]
+- Reason: [1-2 short lines explaining why]
+
+Q2: Correct/Incorrect
+- Your answer: ...
+- Correct answer: ...
+- Reason: ...
+
+[Continue for all questions]
+
+RULES:
+- Keep Reason VERY SHORT (max 2 lines)
+- Do NOT repeat full question text
+- If answer missing, mark as "—" and incorrect
+- No extra sections before or after this format""",
+        template="""QUIZ (questions only, no answer key):
+---
+{quiz_content}
+---
+
+STUDENT'S ANSWERS (JSON):
+{answers_json}"""
+    ),
+
+    PromptTemplate(
+        "analysis_json",
+        system="""You are a JLPT N5 teacher checking a multiple-choice quiz.
+You receive the QUIZ (questions only, no answer key) and the STUDENT'S ANSWERS (JSON).
+
+For EACH question determine which option is correct and explain why.
+
+JSON FORMAT (FOLLOW EXACTLY):
+- "results": one object per question with
+  - "question": the question number
+  - "answer": index of the correct option, 0 = first option (A)
+  - "reason": 1-2 short lines explaining why, without repeating the question
+- Do NOT score the student; scoring is done separately
+- Output ONLY the JSON object""",
+        template="""QUIZ (questions only, no answer key):
+---
+{quiz_content}
+---
+
+STUDENT'S ANSWERS (JSON):
+{answers_json}"""
+    ),
+
+    PromptTemplate(
+        "json_fixup",
+        system="""You repair ONE item of a JSON response that failed validation.
+You receive the ORIGINAL REQUEST, the PROBLEM and the broken ITEM (null if it
+was missing). Return only the corrected item as a JSON object in the same
+format, keeping everything that was already right.""",
+        template="""ORIGINAL REQUEST:
+---
+{request}
+---
+
+PROBLEM: {problem}
+
+ITEM:
+{item}"""
+    ),
+
+    PromptTemplate(
+        "explain",
+        system="""You are a JLPT N5 teacher explaining a graded multiple-choice quiz.
+You receive the QUIZ (options are A, B, C, D in order) and the GRADED ANSWERS
+(already checked, do not re-grade).
+
+For EACH question write ONE line in this format:
+Q1: [1-2 short sentences explaining why the correct answer is right]
+
+RULES:
+- One line per question, nothing else
+- Do NOT repeat full question text""",
+        template="""QUIZ (options are A, B, C, D in order):
+---
+{quiz_content}
+---
+
+GRADED ANSWERS (already checked, do not re-grade):
+{graded}"""
+    ),
+
+    PromptTemplate(
+        "explain_question",
+        system="""You are a JLPT N5 teacher explaining one multiple-choice question.
+You receive the QUESTION, its OPTIONS, the CORRECT letter and the letter the STUDENT CHOSE.
+
+Write 1-2 short sentences explaining why the correct option is right; if the
+student chose differently, say briefly why their choice does not fit.
+
+RULES:
+- Plain text only, no preamble
+- Do NOT repeat the question text""",
+        template="""QUESTION: {question}
+OPTIONS:
+{options}
+CORRECT: {correct}
+STUDENT CHOSE: {chosen}"""
+    ),
+
+    PromptTemplate(
+        "report",
+        system="""Generate a professional technical project report for NihongoAI
+from the PROJECT DATA you receive.
+
+CREATE A COMPREHENSIVE REPORT WITH THESE SECTIONS:
+
+# 1. EXECUTIVE SUMMARY (2-3 paragraphs)
+- Project overview and purpose
+- Key technologies: Google Gemini 2.5 Flash, Streamlit, Python
+- Main achievements and impact
+
+# 2. SYSTEM ARCHITECTURE
+- AI-powered quiz generation system design
+- Gemini API integration approach
+- Web application framework (Streamlit)
+- Data management (vocabulary database)
+- Workflow: user input → AI generation → interactive quiz → feedback
+
+# 3. TECHNICAL IMPLEMENTATION
+- Programming language: Python 3.10+
+- AI Model: Google Gemini 2.5 Flash
+- Framework: Streamlit for web UI
+- Libraries: google-generativeai, pandas, python-dotenv
+- Features implemented:
+  * Dynamic quiz generation (5 topics, customizable difficulty)
+  * Intelligent answer analysis
+  * Progress tracking
+  * Vocabulary library (800+ N5 words)
+
+# 4. PERFORMANCE METRICS
+- Quiz generation time: 5-10 seconds
+- Answer analysis time: 5-10 seconds
+- Accuracy: High (Gemini 2.5 Flash excels at Japanese)
+- User engagement: Interactive, real-time feedback
+- Scalability: Cloud-ready, session-based
+
+# 5. KEY FEATURES
+1. Multi-topic quiz generation (kanji, grammar, vocabulary, reading)
+2. Customizable difficulty and question count
+3. AI-powered answer checking with explanations
+4. Beautiful, interactive UI with visual feedback
+5. Progress tracking and quiz history
+6. Comprehensive N5 vocabulary library
+7. Automated report generation
+
+# 6. RESULTS & IMPACT
+- Successfully generates JLPT N5-level quizzes
+- Provides detailed, helpful feedback to learners
+- Improves accessibility to Japanese language education
+- Demonstrates practical AI application in education
+- Scalable framework for other languages/levels
+
+# 7. CHALLENGES OVERCOME
+- API integration and error handling
+- Quiz formatting consistency
+- Answer randomization for fairness
+- UI/UX optimization for learners
+- Session state management in Streamlit
+
+# 8. FUTURE ENHANCEMENTS
+1. Add N4, N3, N2, N1 levels
+2. Implement user authentication
+3. Add speaking/listening practice
+4. Gamification (points, streaks, badges)
+5. Mobile app version
+6. Community features (leaderboards, shared quizzes)
+7. Advanced analytics dashboard
+8. Integration with other learning platforms
+
+# 9. CONCLUSION
+NihongoAI successfully demonstrates the power of modern AI (Google Gemini) 
+in creating personalized, interactive educational experiences. The system 
+provides high-quality JLPT N5 practice materials while maintaining ease of 
+use and accessibility. It represents a scalable foundation for AI-driven 
+language education.
+
+FORMAT:
+- Use markdown with headers (#, ##, ###)
+- Use bullet points and numbered lists
+- Keep paragraphs concise
+- Include specific technical details
+- Maintain professional academic tone
+- Total length: 1000-1500 words
+
+Output the complete report now.""",
+        template="""PROJECT DATA:
+- Total quizzes: {total_quizzes}
+- AI-powered quizzes: {ai_quizzes}
+- Quiz history entries: {history_entries}"""
+    ),
+])
@@ -66,10 +66,171 @@ CUSTOM_CSS = """
     </style>
 """
 
+# Rerun timing (utils.rerun_timing): full script runs and fragment reruns
+RERUN_TIMING_CONFIG = {
+    "log": True,  # print every rerun's time
+    "window": 200  # recent reruns kept per scope for the Performance panel
+}
+
+# Startup (utils.startup): heavy SDKs are imported on the page that needs them
+# and pre-warmed in a background thread after the first page is sent
+STARTUP_CONFIG = {
+    "prewarm": True,  # NIHONGO_PREWARM=0 turns it off
+    "deferred_modules": ["google.generativeai", "huggingface_hub", "pandas", "torch", "transformers"],
+    "budget_seconds": 0.5,  # median cold start of the Home page, streamlit already imported
+    "runs": 5
+}
+
 # Model configuration
 MODEL_CONFIG = {
     "provider": "featherless-ai",
     "model": "elyza/Llama-3-ELYZA-JP-8B",
     "temperature": 0.7,
     "max_tokens": 2000
-}
\ No newline at end of file
+}
+# LLM response cache for deterministic calls (analysis, explanations, report);
+# quiz generation neither reads nor writes it unless called with use_cache=True
+CACHE_CONFIG = {
+    "enabled": True,
+    "path": ".cache/responses.sqlite3",
+    "max_entries": 2000,
+    "max_bytes": 50 * 1024 * 1024,
+    "ttl_seconds": 7 * 24 * 3600
+}
+
+# Quiz history per browser session (utils.session_history): recent summaries
+# stay in memory, full quizzes are spilled to SQLite and loaded on demand
+SESSION_HISTORY_CONFIG = {
+    "path": ".cache/history.sqlite3",
+    "recent": 10,  # summaries kept in memory per history
+    "ttl_seconds": 30 * 24 * 3600  # spilled quizzes of old sessions are dropped
+}
+
+# Quizzes built locally from the vocabulary store (no model call):
+# topic -> question kinds, cycled in order; other topics go to the LLM
+LOCAL_QUIZ_CONFIG = {
+    "enabled": True,
+    "topics": {
+        "kanji": ["kanji_reading"],
+        "vocabulary": ["reading_meaning", "meaning_word"],
+        "general": ["kanji_reading", "reading_meaning", "meaning_word"]
+    },
+    "options": 4
+}
+
+# Distractor neighbour index (utils/vocab_neighbors.py): neighbours kept per
+# word and the weights of kana similarity, shared kanji, same category (or
+# part of speech) and same kana length
+DISTRACTOR_CONFIG = {
+    "k": 12,
+    "weights": {"kana": 3.0, "kanji": 2.0, "group": 1.0, "length": 0.5},
+    "max_kana_length": 10,  # readings are compared on their first characters
+    "block_size": 256  # query rows per vectorized batch
+}
+
+# Background quiz pool (topic, difficulty, num_questions); locally built
+# topics need no pre-generation
+QUIZ_POOL_CONFIG = {
+    "enabled": True,
+    "combinations": [
+        (topic, "N5", 5)
+        for topic in ["general", "kanji", "vocabulary", "grammar", "reading"]
+        if not (LOCAL_QUIZ_CONFIG["enabled"] and topic in LOCAL_QUIZ_CONFIG["topics"])
+    ],
+    "low_watermark": 2,
+    "high_watermark": 2,
+    "refill_interval": 2.0
+}
+
+# Model call resilience (timeouts in seconds)
+RESILIENCE_CONFIG = {
+    "timeout": 30.0,
+    "max_retries": 3,
+    "backoff_base": 0.5,
+    "backoff_max": 8.0,
+    "max_concurrency": 4,
+    "failure_threshold": 5,
+    "reset_timeout": 30.0,
+    # Only timeouts, connection errors and these HTTP statuses are retried
+    # and count toward the breaker; other errors fail the call at once
+    "retry_statuses": [408, 429, 500, 502, 503, 504]
+}
+
+# Shared HTTP connection pool for inference clients
+HTTP_POOL_CONFIG = {
+    "pool_size": 10,
+    "keepalive_expiry": 60.0
+}
+
+# Batch quiz generation
+BATCH_CONFIG = {
+    "max_concurrency": 8,
+    "pack_max_questions": 4,  # quizzes this small may share one model call
+    "pack_size": 3  # at most this many quizzes per packed call
+}
+
+# Per-question explanations after local grading
+EXPLANATION_CONFIG = {
+    "auto_explain_incorrect": True,  # explain wrong answers without a click
+    "max_concurrency": 4
+}
+
+# Structured output: generate_quiz / analyze_answers ask for schema-constrained
+# JSON, validated and repaired locally (utils.quiz_schema)
+STRUCTURED_OUTPUT_CONFIG = {
+    "enabled": True,
+    "stream": False,  # generate_quiz_stream keeps streaming "1. / ○" text
+    "options": 4,  # options per question after repair
+    "max_fixups": 2  # targeted one-question requests before regenerating
+}
+
+# Model backend: "gemini" (live), "synthetic" (offline generator),
+# "replay" (recorded responses) or "record" (live, capturing responses).
+# The LLM_BACKEND environment variable overrides this.
+BACKEND_CONFIG = {
+    "backend": "gemini",
+    "synthetic": {
+        "latency_distribution": "lognormal",  # constant | uniform | lognormal
+        "latency_median": 1.0,
+        "latency_sigma": 0.5,
+        "error_rate": 0.0,
+        "defect_rate": 0.0,  # malformed JSON questions (exercises repair)
+        "stream_chunks": 12,
+        "seed": 0
+    },
+    "replay_path": ".cache/llm_recordings.jsonl",
+    "replay_latency": True,
+    "replay_fallback": False  # answer unrecorded prompts synthetically
+}
+
+# Vocabulary store: sources are loaded once per process and reloaded
+# when the file's mtime changes (checked at most every interval seconds)
+VOCAB_CONFIG = {
+    # Prebuilt N5-N2 database (python -m utils.vocab_ingest); the N5 CSV is
+    # used when neither it nor its binary export has been built
+    "db_path": "data/vocabulary.sqlite3",
+    # Memory-mapped export of the database, preferred when present
+    "mmap_path": "data/vocabulary.bin",
+    "csv_path": "data/N5_vocabulary.csv",
+    "csv_level": "N5",
+    "pdf_sources": {
+        "N5": "data/VocabList.N5.pdf",
+        "N4": "data/VocabList.N4.pdf",
+        "N3": "data/VocabList.N3.pdf",
+        "N2": "data/VocabList.N2.pdf"
+    },
+    "mtime_check_interval": 2.0,
+    "ngram_size": 2,  # search index n-gram length
+    # Typo-tolerant fallback when a search finds nothing
+    "fuzzy_max_distance": 2,
+    "fuzzy_top_k": 20
+}
+
+# Vocabulary library rendering: words per card page, grid widths and the
+# number of rendered HTML fragments kept in memory
+LIBRARY_CONFIG = {
+    "page_size": 20,
+    "card_columns": 2,
+    "category_columns": 3,
+    "fragment_cache_size": 256
+}
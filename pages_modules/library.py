@@ -2,7 +2,9 @@
 Library page rendering
 """
 import streamlit as st
-import pandas as pd
+from config.settings import LIBRARY_CONFIG, VOCAB_CONFIG
+from utils.vocab_store import load_vocabulary
+from utils.vocab_render import get_fragment_cache, render_cards_html, render_word_grid_html
 
 def render():
     """Render the library page"""
@@ -20,26 +22,26 @@ def render():
         render_jlpt_guide_tab()
 
 def render_vocabulary_tab():
-    """Render the vocabulary tab with CSV data"""
-    st.markdown("### 🌟 Complete N5 Vocabulary Collection (800+ words)")
-    
+    """Render the vocabulary tab from the shared vocabulary store"""
     try:
-        # Load vocabulary from CSV
-        csv_path = "data/N5_vocabulary.csv"
-        vocab_data = pd.read_csv(csv_path)
+        # Shared in-memory vocabulary (read from disk only when the file changes)
+        vocab = load_vocabulary()
+        levels = vocab.levels
+        level_label = "/".join(levels)
+        
+        st.markdown(f"### 🌟 Complete JLPT {level_label} Vocabulary Collection")
         
         # Display stats
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("📚 Total Words", len(vocab_data))
+            st.metric("📚 Total Words", len(vocab))
         with col2:
-            if 'Category' in vocab_data.columns or 'category' in vocab_data.columns:
-                cat_col = 'Category' if 'Category' in vocab_data.columns else 'category'
-                st.metric("📂 Categories", vocab_data[cat_col].nunique())
+            if vocab.has_category:
+                st.metric("📂 Categories", len(vocab.categories))
             else:
                 st.metric("📂 Categories", "N/A")
         with col3:
-            st.metric("🎯 Level", "JLPT N5")
+            st.metric("🎯 Level", f"JLPT {level_label}")
         
         st.markdown("---")
         
@@ -51,26 +53,35 @@ def render_vocabulary_tab():
             search_term = st.text_input("Search vocabulary (Japanese, Romaji, or English)", 
                                        placeholder="e.g., たべる, taberu, eat")
         
-        # Category filter
+        # Level, category and part-of-speech filters (options come from the precomputed group indexes)
+        selected_level = "All"
+        if len(levels) > 1:
+            with col2:
+                selected_level = st.selectbox("Level", ["All"] + levels)
+        
         selected_category = "All"
-        if 'Category' in vocab_data.columns or 'category' in vocab_data.columns:
+        if vocab.has_category:
             with col2:
-                cat_col = 'Category' if 'Category' in vocab_data.columns else 'category'
-                categories = ["All"] + sorted(vocab_data[cat_col].unique().tolist())
-                selected_category = st.selectbox("Category", categories)
+                selected_category = st.selectbox("Category", ["All"] + vocab.categories)
+        
+        with col2:
+            selected_pos = st.selectbox("Part of Speech", ["All"] + vocab.group_values("Part of Speech"))
+        
+        # Apply filters on row ids (rows are only decoded for what is shown)
+        row_ids = vocab.search(search_term) if search_term else range(len(vocab))
         
-        # Apply filters
-        filtered_data = vocab_data.copy()
+        if search_term and not row_ids:
+            # Nothing matched exactly: fall back to close spellings (typos)
+            row_ids = vocab.fuzzy_search(search_term)
+            if row_ids:
+                st.caption(f"No exact matches for “{search_term}” – showing similar words")
         
-        if search_term:
-            mask = filtered_data.astype(str).apply(
-                lambda x: x.str.contains(search_term, case=False, na=False)
-            ).any(axis=1)
-            filtered_data = filtered_data[mask]
+        row_ids = vocab.select(row_ids, {
+            "Level": selected_level, "Category": selected_category, "Part of Speech": selected_pos
+        })
         
-        if selected_category != "All" and ('Category' in vocab_data.columns or 'category' in vocab_data.columns):
-            cat_col = 'Category' if 'Category' in vocab_data.columns else 'category'
-            filtered_data = filtered_data[filtered_data[cat_col] == selected_category]
+        # Identifies the filtered rows for the rendered-fragment cache
+        filter_key = (vocab.source, vocab.mtime, search_term, selected_level, selected_category, selected_pos)
         
         # View mode selection
         view_mode = st.radio("View Mode", ["📋 Card View", "📊 Table View", "📂 Category View"], horizontal=True)
@@ -79,49 +90,42 @@ def render_vocabulary_tab():
         
         # Render based on view mode
         if view_mode == "📋 Card View":
-            render_card_view(filtered_data)
+            render_card_view(vocab, row_ids, filter_key)
         elif view_mode == "📊 Table View":
-            render_table_view(filtered_data)
+            render_table_view(vocab.frame if len(row_ids) == len(vocab) else vocab.frame.iloc[list(row_ids)])
         else:
-            render_category_view(filtered_data, vocab_data)
+            render_category_view(vocab, row_ids, 'Category' if vocab.has_category else 'Level', filter_key)
             
     except FileNotFoundError:
         show_error_message()
     except Exception as e:
         st.error(f"❌ Error loading vocabulary: {str(e)}")
-        st.info("Please check your CSV file format and try again.")
+        st.info(
+            f"Please check `{VOCAB_CONFIG['mmap_path']}` / `{VOCAB_CONFIG['db_path']}` "
+            "or rebuild them with `python -m utils.vocab_ingest`."
+        )
 
-def render_card_view(data):
-    """Render vocabulary in card view"""
-    items_per_page = 20
-    total_pages = (len(data) - 1) // items_per_page + 1
+def render_card_view(vocab, row_ids, filter_key):
+    """Render vocabulary in card view (one cached HTML grid per page)"""
+    items_per_page = LIBRARY_CONFIG["page_size"]
+    total_pages = (len(row_ids) - 1) // items_per_page + 1
     
     if total_pages > 1:
-        page_num = st.selectbox(f"Page (showing {len(data)} results)", range(1, total_pages + 1))
+        page_num = st.selectbox(f"Page (showing {len(row_ids)} results)", range(1, total_pages + 1))
     else:
         page_num = 1
     
     start_idx = (page_num - 1) * items_per_page
     end_idx = start_idx + items_per_page
-    page_data = data.iloc[start_idx:end_idx]
-    
-    cols = st.columns(2)
-    for idx, row in enumerate(page_data.iterrows()):
-        row_data = row[1]
-        with cols[idx % 2]:
-            japanese = row_data.get('Japanese') or row_data.get('japanese') or row_data.get('Word') or row_data.iloc[0]
-            english = row_data.get('English') or row_data.get('english') or row_data.get('Meaning') or row_data.iloc[1] if len(row_data) > 1 else ""
-            romaji = row_data.get('Romaji') or row_data.get('romaji') or row_data.get('Reading') or ""
-            category = row_data.get('Category') or row_data.get('category') or row_data.get('Type') or ""
-            
-            st.markdown(f"""
-            <div class='quiz-card' style='margin-bottom: 1rem;'>
-                <h3 style='color: #FF6B6B; margin: 0;'>{japanese}</h3>
-                <p style='color: #666; margin: 0.2rem 0;'><em>{romaji}</em></p>
-                <p style='margin: 0.5rem 0;'><strong>{english}</strong></p>
-                {f"<span style='background-color: #4ECDC4; color: white; padding: 0.2rem 0.5rem; border-radius: 4px; font-size: 0.8rem;'>{category}</span>" if category else ""}
-            </div>
-            """, unsafe_allow_html=True)
+    page_ids = row_ids[start_idx:end_idx]
+    
+    key = filter_key + ("cards", page_num, items_per_page)
+    st.markdown(
+        get_fragment_cache().get_or_render(
+            key, lambda: render_cards_html(vocab.rows(page_ids), LIBRARY_CONFIG["card_columns"])
+        ),
+        unsafe_allow_html=True
+    )
 
 def render_table_view(data):
     """Render vocabulary in table view"""
@@ -135,42 +139,37 @@ def render_table_view(data):
         mime="text/csv"
     )
 
-def render_category_view(filtered_data, vocab_data):
-    """Render vocabulary organized by category"""
-    if 'Category' in vocab_data.columns or 'category' in vocab_data.columns:
-        cat_col = 'Category' if 'Category' in vocab_data.columns else 'category'
-        categories = sorted(filtered_data[cat_col].unique())
-        
-        for category in categories:
-            cat_data = filtered_data[filtered_data[cat_col] == category]
-            with st.expander(f"📌 {category} ({len(cat_data)} words)", expanded=False):
-                cols = st.columns(3)
-                for idx, row in enumerate(cat_data.iterrows()):
-                    row_data = row[1]
-                    japanese = row_data.get('Japanese') or row_data.get('japanese') or row_data.get('Word') or row_data.iloc[0]
-                    english = row_data.get('English') or row_data.get('english') or row_data.get('Meaning') or row_data.iloc[1] if len(row_data) > 1 else ""
-                    romaji = row_data.get('Romaji') or row_data.get('romaji') or row_data.get('Reading') or ""
-                    
-                    with cols[idx % 3]:
-                        st.markdown(f"**{japanese}** {f'({romaji})' if romaji else ''}")
-                        st.caption(english)
-    else:
-        st.warning("No category column found in the CSV. Please use Card or Table view.")
+def render_category_view(vocab, row_ids, group_col, filter_key):
+    """Render vocabulary organized by category (or JLPT level when there are no categories)"""
+    for group, group_ids in vocab.group(row_ids, group_col).items():
+        with st.expander(f"📌 {group} ({len(group_ids)} words)", expanded=False):
+            key = filter_key + ("category", group_col, group)
+            st.markdown(
+                get_fragment_cache().get_or_render(
+                    key, lambda: render_word_grid_html(vocab.rows(group_ids), LIBRARY_CONFIG["category_columns"])
+                ),
+                unsafe_allow_html=True
+            )
 
 def show_error_message():
-    """Show error message when CSV file is not found"""
-    st.error("❌ CSV file not found at `data/N5_vocabulary.csv`")
-    st.info("""
-    **Please ensure your CSV file is located at:**
+    """Show error message when no vocabulary source is found"""
+    st.error("❌ No vocabulary found")
+    st.info(f"""
+    **The library loads the first of these that exists:**
     ```
-    data/N5_vocabulary.csv
+    {VOCAB_CONFIG['mmap_path']}      (memory-mapped export)
+    {VOCAB_CONFIG['db_path']}  (N5-N2 database)
+    {VOCAB_CONFIG['csv_path']}    (N5 fallback)
     ```
     
-    **Expected CSV format:**
-    - Column 1: Japanese word (e.g., たべる)
-    - Column 2: English meaning (e.g., to eat)
-    - Column 3 (optional): Romaji (e.g., taberu)
-    - Column 4 (optional): Category (e.g., Verbs, Food, etc.)
+    Rebuild the database and its export from the VocabList PDFs with
+    `python -m utils.vocab_ingest`.
+    
+    **Expected CSV format (fallback):**
+    - Kanji: Japanese word (e.g., 食べる)
+    - Hiragana: Reading (e.g., たべる)
+    - English: Meaning (e.g., to eat)
+    - Category (optional): e.g., Verbs, Food, etc.
     """)
     
     # Fallback content
@@ -4,23 +4,54 @@ Progress page rendering
 import streamlit as st
 from config.prompts import PROMPTS
 
+def _entry_label(number, summary):
+    """Expander title from a history summary (classic or AI quiz)"""
+    if 'type' in summary:
+        title = f"{PROMPTS[summary['type']]['icon']} {summary['type']}"
+    else:
+        title = f"🤖 {summary.get('topic', 'quiz').title()} ({summary.get('difficulty', '')})"
+    score = f" - {summary['score']}" if 'score' in summary else ""
+    return f"#{number} - {title} - {summary.get('timestamp', '')}{score}"
+
+def _render_history(history, title):
+    """Last 10 quizzes of a SessionHistory; a quiz is read from disk only when expanded"""
+    st.markdown(f"### {title} ({len(history)} total)")
+
+    for entry in history.recent(10):
+        with st.expander(
+            _entry_label(entry.seq, entry.summary),
+            key=f"history_{history.name}_{entry.seq}",
+            on_change="rerun"
+        ) as section:
+            if not section.open:
+                continue
+            quiz = history.load(entry.seq)
+            if quiz is None:
+                st.caption("This quiz is no longer stored.")
+                continue
+            st.markdown(quiz['content'])
+            if quiz.get('feedback'):
+                st.markdown("**Feedback**")
+                st.text(quiz['feedback'])
+
 def render():
     """Render the progress page"""
     st.markdown("<h1 class='main-header'>Your Progress 📊</h1>", unsafe_allow_html=True)
-    
-    if not st.session_state.quiz_history:
+
+    histories = [
+        (st.session_state.quiz_history, "Quiz History"),
+        (st.session_state.agent_quizzes, "AI Quiz History"),
+    ]
+    if not any(history for history, _ in histories):
         st.info("🌱 No quiz history yet. Start practicing to track your progress!")
     else:
-        st.markdown(f"### Quiz History ({len(st.session_state.quiz_history)} total)")
-        
-        # Display last 10 quizzes
-        for idx, quiz in enumerate(reversed(st.session_state.quiz_history[-10:]), 1):
-            quiz_number = len(st.session_state.quiz_history) - idx + 1
-            with st.expander(f"#{quiz_number} - {PROMPTS[quiz['type']]['icon']} {quiz['type']} - {quiz['timestamp']}"):
-                st.markdown(quiz['content'])
-        
+        for history, title in histories:
+            if history:
+                _render_history(history, title)
+
         # Clear history button
         if st.button("🗑️ Clear History"):
-            st.session_state.quiz_history = []
+            for history, _ in histories:
+                history.clear()
             st.session_state.current_quiz = None
-            st.rerun()
\ No newline at end of file
+            st.rerun()
@@ -5,6 +5,9 @@ import streamlit as st
 from datetime import datetime
 from config.prompts import PROMPTS
 from utils.quiz_generator import generate_quiz
+from utils.quiz_parser import parse_quiz
+from utils.quiz_display import display_quiz_beautiful, display_feedback_beautiful
+from utils.grading import grade_answers, format_feedback
 
 def render():
     """Render the quiz page"""
@@ -65,6 +68,10 @@ def render():
                 }
                 st.session_state.quiz_history.append(st.session_state.current_quiz)
                 st.session_state.is_generating = False
+                # Clear previous answers
+                for key in list(st.session_state.keys()):
+                    if key.startswith('q_'):
+                        del st.session_state[key]
                 st.success("✅ Quiz generated successfully!")
                 st.rerun()
             except Exception as e:
@@ -87,7 +94,17 @@ def render():
                 </div>
             """, unsafe_allow_html=True)
             
-            st.markdown(st.session_state.current_quiz['content'])
+            # もんだい/せいかい quizzes become interactive questions graded
+            # against their own answer key; anything else is shown as text
+            content = st.session_state.current_quiz['content']
+            parsed = parse_quiz(content)
+            if parsed.questions:
+                user_answers = display_quiz_beautiful(content)
+                if parsed.answer_key and st.button("✅ Check Answers", type="primary"):
+                    results = grade_answers(dict(parsed.answer_key), user_answers)
+                    display_feedback_beautiful(format_feedback(results))
+            else:
+                st.markdown(content)
         
         # Action buttons
         st.markdown("---")
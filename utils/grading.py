@@ -0,0 +1,91 @@
+"""
+Local quiz grading
+Answer-key extraction, scoring and feedback formatting without an LLM call
+"""
+import re
+
+ANSWER_KEY_LINE = re.compile(r'^\s*ANSWER KEY\s*:(.*)$', re.IGNORECASE | re.MULTILINE)
+ANSWER_KEY_ENTRY = re.compile(r'(\d+)\s*[=:.)-]\s*([A-D])', re.IGNORECASE)
+
+
+def split_answer_key(raw_text):
+    """
+    Separate the trailing answer key line from generated quiz text
+
+    Args:
+        raw_text (str): Model output ending with "ANSWER KEY: 1=B 2=D ..."
+
+    Returns:
+        tuple: (quiz_text without the key, {question_num: letter})
+    """
+    match = ANSWER_KEY_LINE.search(raw_text)
+    if not match:
+        return raw_text.strip(), {}
+
+    answer_key = {
+        num: letter.upper()
+        for num, letter in ANSWER_KEY_ENTRY.findall(match.group(1))
+    }
+    quiz_text = (raw_text[:match.start()] + raw_text[match.end():]).strip()
+    return quiz_text, answer_key
+
+
+def format_answer_key(answer_key):
+    """
+    The "ANSWER KEY: 1=B 2=D ..." line split_answer_key() reads
+
+    Args:
+        answer_key (dict): {question_num: letter}
+    """
+    return "ANSWER KEY: " + " ".join(f"{num}={answer_key[num]}" for num in sorted(answer_key, key=int))
+
+
+def grade_answers(answer_key, user_answers):
+    """
+    Score user answers against the answer key
+
+    Args:
+        answer_key (dict): {question_num: correct letter}
+        user_answers (dict): {question_num: chosen letter}
+
+    Returns:
+        list: one {num, user, correct, is_correct} dict per question, in order
+    """
+    results = []
+    for num in sorted(answer_key, key=int):
+        user = user_answers.get(num)
+        correct = answer_key[num]
+        results.append({
+            'num': num,
+            'user': user,
+            'correct': correct,
+            'is_correct': user == correct
+        })
+    return results
+
+
+def format_feedback(results, reasons=None):
+    """
+    Render graded results in the format display_feedback_beautiful() reads
+
+    Args:
+        results (list): Output of grade_answers()
+        reasons (dict): Optional {question_num: explanation}
+
+    Returns:
+        str: "Score: X / N (Y%)" followed by one block per question
+    """
+    reasons = reasons or {}
+    total = len(results)
+    score = sum(1 for r in results if r['is_correct'])
+    percent = round(100 * score / total) if total else 0
+
+    lines = [f"Score: {score} / {total} ({percent}%)"]
+    for r in results:
+        lines.append("")
+        lines.append(f"Q{r['num']}: {'Correct' if r['is_correct'] else 'Incorrect'}")
+        lines.append(f"- Your answer: {r['user'] or '—'}")
+        lines.append(f"- Correct answer: {r['correct']}")
+        if reasons.get(r['num']):
+            lines.append(f"- Reason: {reasons[r['num']]}")
+    return "\n".join(lines)
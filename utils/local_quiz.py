@@ -0,0 +1,202 @@
+"""
+Offline vocabulary quiz engine
+Builds "1. / ○" quizzes straight from the vocabulary store, answer key known by construction
+"""
+import random
+import threading
+
+from config.settings import LOCAL_QUIZ_CONFIG
+from utils.vocab_store import load_vocabulary
+
+QUESTION_FORMATS = {
+    "kanji_reading": "「{}」の よみかたは？",
+    "reading_meaning": "「{}」の いみは？",
+    "meaning_word": "「{}」は にほんごで？",
+}
+MAX_DRAWS = 200
+
+
+def short_gloss(english):
+    """First sense of an English gloss, lower-cased like the rest ("Magazine,..." -> "magazine")."""
+    gloss = english.split(",")[0].split(";")[0].strip()
+    return gloss[:1].lower() + gloss[1:] if gloss[1:2].islower() else gloss
+
+
+class LocalQuizEngine:
+    """
+    Multiple-choice vocabulary quizzes without a model call.
+
+    Three item kinds are drawn from one JLPT level:
+        kanji_reading    kanji word  -> kana reading
+        reading_meaning  kana        -> English meaning
+        meaning_word     English     -> word (kanji, or kana for kana-only words)
+    Distractors are the word's nearest neighbours (Vocabulary.neighbors:
+    similar kana, shared kanji, same group), then other words of the same
+    level and part of speech, and never another valid answer (other
+    readings of the same kanji, other meanings of the same reading, other
+    words with the same meaning).
+    """
+
+    def __init__(self, vocab, options=4):
+        self.vocab = vocab
+        self.options = options
+        kanji, hiragana, english = vocab.column("Kanji"), vocab.column("Hiragana"), vocab.column("English")
+        self._pos = vocab.column("Part of Speech")
+        self._neighbors = vocab.neighbors
+        # Display forms of every row
+        self._answers = {
+            "kanji_reading": hiragana,
+            "reading_meaning": [short_gloss(gloss) for gloss in english],
+            "meaning_word": [k or h for k, h in zip(kanji, hiragana)],
+        }
+        self._prompts = {
+            "kanji_reading": kanji,
+            "reading_meaning": hiragana,
+            "meaning_word": self._answers["reading_meaning"],
+        }
+        # Every valid answer for a prompt, so distractors can't be correct too
+        self._valid = {kind: {} for kind in QUESTION_FORMATS}
+        for kind, prompts in self._prompts.items():
+            for prompt, answer in zip(prompts, self._answers[kind]):
+                self._valid[kind].setdefault(prompt, set()).add(answer)
+        # Per-level row pools: all rows, kanji rows and rows by part of speech
+        self._pools = {}
+
+    @staticmethod
+    def supports(topic):
+        """Whether quizzes on topic are built locally (per LOCAL_QUIZ_CONFIG)."""
+        return LOCAL_QUIZ_CONFIG["enabled"] and (topic or "").lower() in LOCAL_QUIZ_CONFIG["topics"]
+
+    def _pool(self, difficulty):
+        """(all rows, kanji rows, {part of speech: rows}) of a level (every row for unknown levels)."""
+        pool = self._pools.get(difficulty)
+        if pool is None:
+            ids = list(self.vocab.select(range(len(self.vocab)), {"Level": difficulty})) or list(range(len(self.vocab)))
+            by_pos = {}
+            for i in ids:
+                by_pos.setdefault(self._pos[i], []).append(i)
+            with_kanji = [i for i in ids if self._prompts["kanji_reading"][i]] or ids
+            pool = self._pools[difficulty] = (ids, with_kanji, by_pos)
+        return pool
+
+    def _distractors(self, kind, row_id, pool, rng):
+        """Row ids of options-1 wrong answers for row_id."""
+        ids, _, by_pos = pool
+        answers = self._answers[kind]
+        taken = set(self._valid[kind][self._prompts[kind][row_id]])
+        chosen = []
+        # A random pick among the closest neighbours keeps repeated quizzes varied
+        neighbors = self._neighbors.top(row_id, 2 * (self.options - 1))
+        rng.shuffle(neighbors)
+        for candidate in neighbors:
+            if len(chosen) == self.options - 1:
+                return chosen
+            if answers[candidate] and answers[candidate] not in taken:
+                taken.add(answers[candidate])
+                chosen.append(candidate)
+
+        for candidates in (by_pos.get(self._pos[row_id], ids), ids):
+            for _ in range(MAX_DRAWS):
+                if len(chosen) == self.options - 1:
+                    return chosen
+                candidate = rng.choice(candidates)
+                if answers[candidate] and answers[candidate] not in taken:
+                    taken.add(answers[candidate])
+                    chosen.append(candidate)
+        return chosen
+
+    def question(self, kind, row_id, pool, rng):
+        """
+        One question about row_id
+
+        Returns:
+            tuple: (question text, [options], index of the correct option)
+        """
+        answers = self._answers[kind]
+        wrong = [answers[i] for i in self._distractors(kind, row_id, pool, rng)]
+        correct = rng.randrange(len(wrong) + 1)
+        options = wrong[:correct] + [answers[row_id]] + wrong[correct:]
+        return QUESTION_FORMATS[kind].format(self._prompts[kind][row_id]), options, correct
+
+    def generate(self, topic="vocabulary", difficulty="N5", num_questions=5, seed=None):
+        """
+        Build a quiz
+
+        Args:
+            topic (str): A LOCAL_QUIZ_CONFIG topic (kanji, vocabulary, general)
+            difficulty (str): JLPT level to draw words from
+            num_questions (int): Number of questions
+            seed: Makes the words, distractors and answer positions reproducible
+
+        Returns:
+            tuple: (quiz_text, answer_key) like NihongoCrew.generate_quiz_with_key
+        """
+        rng = random.Random(seed)
+        kinds = LOCAL_QUIZ_CONFIG["topics"][(topic or "").lower()]
+        pool = self._pool(difficulty)
+
+        lines, answer_key, used = [], {}, set()
+        for num in range(1, num_questions + 1):
+            kind = kinds[(num - 1) % len(kinds)]
+            candidates = pool[1] if kind == "kanji_reading" else pool[0]
+            row_id = rng.choice(candidates)
+            for _ in range(MAX_DRAWS):
+                if row_id not in used and self._answers[kind][row_id]:
+                    break
+                row_id = rng.choice(candidates)
+            used.add(row_id)
+
+            text, options, correct = self.question(kind, row_id, pool, rng)
+            lines.append(f"{num}. {text}")
+            lines.extend(f"○ {option}" for option in options)
+            lines.append("")
+            answer_key[str(num)] = chr(65 + correct)
+        return "\n".join(lines).strip(), answer_key
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_local_quiz_engine():
+    """
+    Get the quiz engine for the current shared vocabulary
+
+    Rebuilt only when the vocabulary store reloads its source.
+
+    Returns:
+        LocalQuizEngine
+    """
+    global _engine
+    vocab = load_vocabulary()
+    with _engine_lock:
+        if _engine is None or _engine.vocab is not vocab:
+            _engine = LocalQuizEngine(vocab, options=LOCAL_QUIZ_CONFIG["options"])
+        return _engine
+
+
+# ================================================================
+# BENCHMARK
+# ================================================================
+def benchmark_local_quiz(quizzes=2000):
+    """Average time per 5-question quiz (engine already built)."""
+    import time
+
+    from utils.quiz_display import parse_quiz_questions
+
+    started = time.perf_counter()
+    engine = get_local_quiz_engine()
+    print(f"engine ready in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    for topic in LOCAL_QUIZ_CONFIG["topics"]:
+        started = time.perf_counter()
+        for seed in range(quizzes):
+            quiz_text, answer_key = engine.generate(topic, "N5", 5, seed=seed)
+        per_quiz_us = (time.perf_counter() - started) / quizzes * 1e6
+        assert len(parse_quiz_questions(quiz_text)) == len(answer_key) == 5
+        print(f"{topic:<11} {per_quiz_us:7.1f} µs per quiz")
+    print(engine.generate("general", "N5", 3, seed=1)[0])
+
+
+if __name__ == "__main__":
+    benchmark_local_quiz()
@@ -0,0 +1,146 @@
+"""
+Compiled prompt templates and per-template usage accounting
+"""
+import threading
+from collections import namedtuple
+from string import Formatter
+
+# A rendered request: the static system prefix plus the variable user prompt
+RenderedPrompt = namedtuple("RenderedPrompt", ["template", "system", "prompt"])
+
+
+class PromptTemplate:
+    """
+    Prompt split into a static system prefix and a variable part.
+
+    The variable part is parsed once into literal/field pieces, so
+    rendering is a single join; the system prefix is byte-identical on
+    every call and can be reused as a provider-side cached prefix.
+    """
+
+    def __init__(self, name, system, template):
+        self.name = name
+        self.system = system
+        self._pieces = [
+            (literal, field, spec)
+            for literal, field, spec, _ in Formatter().parse(template)
+        ]
+        self.fields = {field for _, field, _ in self._pieces if field}
+
+    def render(self, **values):
+        """
+        Fill the variable part
+
+        Returns:
+            RenderedPrompt
+        """
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"Template '{self.name}' is missing values for: {', '.join(sorted(missing))}")
+
+        out = []
+        for literal, field, spec in self._pieces:
+            out.append(literal)
+            if field:
+                out.append(format(values[field], spec))
+        return RenderedPrompt(self.name, self.system, "".join(out))
+
+
+class PromptRegistry:
+    """Named, compiled prompt templates"""
+
+    def __init__(self, templates=()):
+        self._templates = {}
+        for template in templates:
+            self.register(template)
+
+    def register(self, template):
+        self._templates[template.name] = template
+        return template
+
+    def get(self, name):
+        return self._templates[name]
+
+    def names(self):
+        return list(self._templates)
+
+    def render(self, name, **values):
+        """Render the named template"""
+        return self._templates[name].render(**values)
+
+
+class UsageTracker:
+    """Prompt size, token and latency counters per template (or feature)"""
+
+    def __init__(self):
+        self._usage = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, prompt_chars, input_tokens=0, output_tokens=0, cached_tokens=0, latency=0.0):
+        """
+        Record one model call made for a template
+
+        Args:
+            name: Template (or feature) name
+            prompt_chars: Characters sent (system prefix + prompt)
+            input_tokens / output_tokens / cached_tokens: Provider token counts
+            latency: Seconds spent waiting for the model
+        """
+        with self._lock:
+            usage = self._usage.setdefault(name, {
+                "calls": 0,
+                "prompt_chars": 0,
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "cached_tokens": 0,
+                "latency": 0.0
+            })
+            usage["calls"] += 1
+            usage["prompt_chars"] += prompt_chars
+            usage["input_tokens"] += input_tokens or 0
+            usage["output_tokens"] += output_tokens or 0
+            usage["cached_tokens"] += cached_tokens or 0
+            usage["latency"] += latency
+
+    def usage(self):
+        """
+        Usage totals per template
+
+        Returns:
+            dict: {name: {calls, prompt_chars, input_tokens, output_tokens,
+                   cached_tokens, avg_latency_ms}}
+        """
+        with self._lock:
+            return {
+                name: {
+                    "calls": u["calls"],
+                    "prompt_chars": u["prompt_chars"],
+                    "input_tokens": u["input_tokens"],
+                    "output_tokens": u["output_tokens"],
+                    "cached_tokens": u["cached_tokens"],
+                    "avg_latency_ms": u["latency"] / u["calls"] * 1000 if u["calls"] else 0.0
+                }
+                for name, u in self._usage.items()
+            }
+
+
+# Process-wide usage accounting shared by every backend
+usage_tracker = UsageTracker()
+
+
+def record_response_usage(rendered, response, latency):
+    """
+    Record a Gemini-style response against the template that produced it
+
+    Token counts are read from response.usage_metadata when the model
+    reports them and left at zero otherwise.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    usage_tracker.record(
+        rendered.template,
+        len(rendered.system) + len(rendered.prompt),
+        input_tokens=getattr(usage, "prompt_token_count", 0),
+        output_tokens=getattr(usage, "candidates_token_count", 0),
+        cached_tokens=getattr(usage, "cached_content_token_count", 0),
+        latency=latency
+    )
@@ -3,70 +3,20 @@ Enhanced Quiz Display Component for NihongoAI
 Better formatting and interactive UI
 """
 import streamlit as st
-import re
-
-def parse_quiz_questions(quiz_text):
-    """
-    Parse quiz text into structured format
-    Returns: list of {question_num, question_text, options: [A, B, C, D]}
-    """
-    questions = []
-    lines = quiz_text.strip().split('\n')
-    
-    current_q = None
-    current_options = []
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
-            if current_q and current_options:
-                questions.append({
-                    'num': current_q['num'],
-                    'text': current_q['text'],
-                    'options': current_options[:4]  # Ensure max 4 options
-                })
-                current_q = None
-                current_options = []
-            continue
-        
-        # Check if line starts with number (question)
-        if re.match(r'^\d+\.', line):
-            if current_q and current_options:
-                questions.append({
-                    'num': current_q['num'],
-                    'text': current_q['text'],
-                    'options': current_options[:4]
-                })
-            
-            parts = line.split('.', 1)
-            current_q = {
-                'num': parts[0].strip(),
-                'text': parts[1].strip() if len(parts) > 1 else ''
-            }
-            current_options = []
-        
-        # Check if line is an option (starts with ○)
-        elif line.startswith('○'):
-            option_text = line[1:].strip()  # Remove ○ and trim
-            if option_text:
-                current_options.append(option_text)
-    
-    # Don't forget last question
-    if current_q and current_options:
-        questions.append({
-            'num': current_q['num'],
-            'text': current_q['text'],
-            'options': current_options[:4]
-        })
-    
-    return questions
-
+from utils.grading import format_feedback
+from utils.quiz_parser import iter_quiz_questions, parse_quiz_questions
+from utils.rerun_timing import timed_fragment
 
 def display_quiz_beautiful(quiz_text):
     """
     Display quiz in beautiful, interactive format
-    Returns: dict of user answers {question_num: selected_option_index}
+    
+    Every question is its own fragment, so an answer click reruns only
+    that question instead of the whole page.
+    
+    Returns: dict of user answers {question_num: letter}
     """
+    # Memoized: reruns reuse the parsed questions
     questions = parse_quiz_questions(quiz_text)
     
     if not questions:
@@ -76,49 +26,115 @@ def display_quiz_beautiful(quiz_text):
     st.markdown("### 📝 Answer the Questions")
     st.info(f"💡 Total Questions: {len(questions)} | Select one option for each question")
     
-    user_answers = {}
+    passage = ""
+    for q in questions:
+        if q.passage and q.passage != passage:
+            passage = q.passage
+            render_passage(passage)
+        render_question(q)
     
-    for idx, q in enumerate(questions):
-        st.markdown("---")
-        
-        # Question card with better styling
-        st.markdown(f"""
-        <div style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-                    padding: 1rem; border-radius: 10px; margin: 1rem 0;'>
-            <h3 style='color: white; margin: 0;'>
-                Question {q['num']}
-            </h3>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Question text - larger font for Japanese
-        st.markdown(f"""
-        <div style='background-color: #f8f9fa; padding: 1.5rem; 
-                    border-radius: 10px; margin: 1rem 0; border-left: 4px solid #4ECDC4;'>
-            <p style='font-size: 1.4rem; font-weight: 500; margin: 0; color: #2c3e50;'>
-                {q['text']}
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
+    return selected_answers(questions)
+
+
+@timed_fragment("question")
+def render_question(q):
+    """Render one question card with its options as radio buttons"""
+    render_question_card(q)
+    
+    # Options as radio buttons with better styling
+    if len(q.options) >= 2:
+        # Create option labels with letters
+        option_labels = [f"{chr(65+i)}) {opt}" for i, opt in enumerate(q.options)]
         
-        # Options as radio buttons with better styling
-        if len(q['options']) >= 2:
-            # Create option labels with letters
-            option_labels = [f"{chr(65+i)}) {opt}" for i, opt in enumerate(q['options'])]
-            
-            selected = st.radio(
-                f"Select your answer for Question {q['num']}:",
-                options=range(len(q['options'])),
-                format_func=lambda x: option_labels[x],
-                key=f"q_{q['num']}",
-                label_visibility="collapsed"
-            )
-            
-            user_answers[q['num']] = chr(65 + selected)  # Convert to A, B, C, D
-        else:
-            st.warning(f"⚠️ Question {q['num']} has insufficient options")
+        st.radio(
+            f"Select your answer for Question {q.num}:",
+            options=range(len(q.options)),
+            format_func=lambda x, labels=option_labels: labels[x],
+            key=f"q_{q.num}",
+            label_visibility="collapsed"
+        )
+    else:
+        st.warning(f"⚠️ Question {q.num} has insufficient options")
+
+
+def selected_answers(questions):
+    """
+    Answers picked so far, read from the radios' session state
     
-    return user_answers
+    Returns: dict {question_num: letter}
+    """
+    answers = {}
+    for q in questions:
+        selected = st.session_state.get(f"q_{q.num}")
+        if selected is not None and len(q.options) >= 2:
+            answers[q.num] = chr(65 + selected)  # Convert to A, B, C, D
+    return answers
+
+
+def render_passage(passage):
+    """Render a reading passage shown above its questions"""
+    st.markdown("---")
+    st.markdown("#### 📖 Read the passage")
+    st.info(passage)
+
+
+def render_question_card(q):
+    """Render the header and text card of a single question"""
+    st.markdown("---")
+    
+    # Question card with better styling
+    st.markdown(f"""
+    <div style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
+                padding: 1rem; border-radius: 10px; margin: 1rem 0;'>
+        <h3 style='color: white; margin: 0;'>
+            Question {q.num}
+        </h3>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Question text - larger font for Japanese
+    st.markdown(f"""
+    <div style='background-color: #f8f9fa; padding: 1.5rem; 
+                border-radius: 10px; margin: 1rem 0; border-left: 4px solid #4ECDC4;'>
+        <p style='font-size: 1.4rem; font-weight: 500; margin: 0; color: #2c3e50;'>
+            {q.text}
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+
+
+def display_quiz_streaming(chunks):
+    """
+    Render questions while the quiz is still being generated
+    
+    Each question is shown as soon as its options are complete; answering
+    becomes available once the full quiz has arrived.
+    
+    Returns: full quiz text
+    """
+    st.markdown("### 📝 Your quiz is arriving...")
+    status = st.empty()
+    parts = []
+    
+    def tee():
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+    
+    count = 0
+    passage = ""
+    for q in iter_quiz_questions(tee()):
+        count += 1
+        status.caption(f"⏳ {count} question(s) ready, generating the rest...")
+        if q.passage and q.passage != passage:
+            passage = q.passage
+            render_passage(passage)
+        render_question_card(q)
+        for i, opt in enumerate(q.options):
+            st.markdown(f"{chr(65+i)}) {opt}")
+    
+    status.caption(f"✅ {count} question(s) generated")
+    return "".join(parts).strip()
 
 
 def display_quiz_simple_cards(quiz_text):
@@ -128,27 +144,27 @@ def display_quiz_simple_cards(quiz_text):
     questions = parse_quiz_questions(quiz_text)
     user_answers = {}
     
-    for idx, q in enumerate(questions):
+    for q in questions:
         with st.container():
-            st.markdown(f"### Question {q['num']}")
-            st.markdown(f"**{q['text']}**")
+            st.markdown(f"### Question {q.num}")
+            st.markdown(f"**{q.text}**")
             
-            if len(q['options']) >= 2:
-                cols = st.columns(min(len(q['options']), 2))
+            if len(q.options) >= 2:
+                cols = st.columns(min(len(q.options), 2))
                 
-                for i, option in enumerate(q['options']):
+                for i, option in enumerate(q.options):
                     with cols[i % 2]:
                         if st.button(
                             f"{chr(65+i)}) {option}",
-                            key=f"btn_q{q['num']}_opt{i}",
+                            key=f"btn_q{q.num}_opt{i}",
                             use_container_width=True
                         ):
-                            user_answers[q['num']] = chr(65 + i)
-                            st.session_state[f"answer_q{q['num']}"] = chr(65 + i)
+                            user_answers[q.num] = chr(65 + i)
+                            st.session_state[f"answer_q{q.num}"] = chr(65 + i)
             
             # Show selected answer
-            if f"answer_q{q['num']}" in st.session_state:
-                answer_key = f"answer_q{q['num']}"
+            if f"answer_q{q.num}" in st.session_state:
+                answer_key = f"answer_q{q.num}"
                 st.success(f"✅ Selected: {st.session_state[answer_key]}")
             
             st.markdown("---")
@@ -163,13 +179,7 @@ def display_feedback_beautiful(feedback_text):
     lines = feedback_text.split('\n')
     
     # Extract score
-    score_line = lines[0] if lines else "Score: 0 / 0 (0%)"
-    st.markdown(f"""
-    <div style='background: linear-gradient(135deg, #11998e 0%, #38ef7d 100%); 
-                padding: 2rem; border-radius: 15px; text-align: center; margin: 2rem 0;'>
-        <h1 style='color: white; margin: 0; font-size: 2.5rem;'>{score_line}</h1>
-    </div>
-    """, unsafe_allow_html=True)
+    display_score(lines[0] if lines else "Score: 0 / 0 (0%)")
     
     # Parse and display each question feedback
     current_q = None
@@ -198,6 +208,44 @@ def display_feedback_beautiful(feedback_text):
         display_question_feedback(current_q, current_feedback)
 
 
+def display_score(score_line):
+    """Display the score banner"""
+    st.markdown(f"""
+    <div style='background: linear-gradient(135deg, #11998e 0%, #38ef7d 100%); 
+                padding: 2rem; border-radius: 15px; text-align: center; margin: 2rem 0;'>
+        <h1 style='color: white; margin: 0; font-size: 2.5rem;'>{score_line}</h1>
+    </div>
+    """, unsafe_allow_html=True)
+
+
+def display_graded_feedback(results, reasons):
+    """
+    Display locally graded results with on-demand explanations
+    
+    Args:
+        results: Output of grade_answers()
+        reasons: {question_num: explanation} known so far
+    
+    Returns: list of question numbers whose "Explain" button was clicked
+    """
+    feedback_lines = format_feedback(results).split('\n')
+    display_score(feedback_lines[0])
+    
+    requested = []
+    for r in results:
+        status = 'Correct' if r['is_correct'] else 'Incorrect'
+        lines = [f"- Your answer: {r['user'] or '—'}", f"- Correct answer: {r['correct']}"]
+        if reasons.get(r['num']):
+            lines.append(f"- Reason: {reasons[r['num']]}")
+        display_question_feedback({'num': f"Q{r['num']}", 'status': status}, lines)
+        
+        if not reasons.get(r['num']):
+            if st.button(f"💡 Explain Q{r['num']}", key=f"explain_{r['num']}"):
+                requested.append(r['num'])
+    
+    return requested
+
+
 def display_question_feedback(q_info, feedback_lines):
     """Helper to display individual question feedback"""
     status = q_info['status'].lower()
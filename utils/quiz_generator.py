@@ -2,31 +2,260 @@
 Quiz generation utilities using LLM
 """
 import os
-from huggingface_hub import InferenceClient
-from config.settings import MODEL_CONFIG
+import threading
+import time
+from types import SimpleNamespace
+from config.settings import MODEL_CONFIG, HTTP_POOL_CONFIG
+from utils.response_cache import ResponseCache, get_response_cache
+from utils.prompt_registry import usage_tracker
+from agents.llm_backends import create_model
 
-def generate_quiz(prompt):
+_http_pool_lock = threading.Lock()
+_http_pool_configured = False
+_backend_model = None
+_backend_lock = threading.Lock()
+
+
+def _configure_http_pool():
+    """
+    Install a keep-alive connection pool for every huggingface_hub request
+
+    Newer huggingface_hub versions share one httpx client, older ones one
+    requests session; both are sized from HTTP_POOL_CONFIG.
+    """
+    global _http_pool_configured
+    if _http_pool_configured:
+        return
+
+    import huggingface_hub
+
+    pool_size = HTTP_POOL_CONFIG["pool_size"]
+
+    if hasattr(huggingface_hub, "set_client_factory"):
+        # huggingface_hub 1.x builds on httpx, 2.x on its httpx2 successor
+        if int(huggingface_hub.__version__.split(".")[0]) >= 2:
+            import httpx2 as httpx
+        else:
+            import httpx
+
+        # Keep the hub's own request hooks (offline mode, request ids);
+        # set_client_factory() closes this default session again
+        event_hooks = huggingface_hub.get_session().event_hooks
+        limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=HTTP_POOL_CONFIG["keepalive_expiry"]
+        )
+
+        def client_factory():
+            return httpx.Client(
+                event_hooks=event_hooks,
+                follow_redirects=True,
+                timeout=None,
+                limits=limits
+            )
+
+        huggingface_hub.set_client_factory(client_factory)
+
+    elif hasattr(huggingface_hub, "configure_http_backend"):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        def backend_factory():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            return session
+
+        huggingface_hub.configure_http_backend(backend_factory=backend_factory)
+
+    _http_pool_configured = True
+
+
+def create_inference_client(provider=None):
+    """
+    New InferenceClient for provider (defaults to MODEL_CONFIG) on the pooled HTTP session
+
+    Clients are not shared: each one tracks the responses it opened and
+    close() ends all of them, so one client used by two reruns at once
+    could cut off the other's response. Creating one is cheap, the
+    keep-alive connections live in the hub's session, not the client.
+    Use it as a context manager so its responses are released.
+
+    Returns:
+        InferenceClient
+    """
+    # Imported on first use: huggingface_hub costs ~0.3 s and pages that
+    # never generate a quiz shouldn't pay for it
+    from huggingface_hub import InferenceClient
+
+    with _http_pool_lock:
+        _configure_http_pool()
+    return InferenceClient(provider=provider or MODEL_CONFIG["provider"], api_key=os.getenv("HF_TOKEN"))
+
+
+class _InferenceModel:
+    """Gemini-compatible adapter over InferenceClient (pooled HTTP session)"""
+
+    model_name = MODEL_CONFIG["model"]
+
+    def generate_content(self, contents, stream=False):
+        text, input_tokens, output_tokens = _chat_completion(contents)
+        return SimpleNamespace(
+            text=text,
+            usage_metadata=SimpleNamespace(prompt_token_count=input_tokens, candidates_token_count=output_tokens)
+        )
+
+
+def _get_backend_model():
+    """Model selected by LLM_BACKEND / BACKEND_CONFIG (live inference by default)"""
+    global _backend_model
+    with _backend_lock:
+        if _backend_model is None:
+            _backend_model = create_model(real_model_factory=_InferenceModel) or _InferenceModel()
+    return _backend_model
+
+
+def _chat_completion(prompt):
+    """
+    One chat completion over the pooled HTTP session
+
+    Returns:
+        tuple: (content, prompt_tokens, completion_tokens)
+    """
+    messages = [{"role": "user", "content": prompt}]
+
+    with create_inference_client() as client:
+        completion = client.chat.completions.create(
+            model=MODEL_CONFIG["model"],
+            messages=messages,
+            temperature=MODEL_CONFIG["temperature"],
+            max_tokens=MODEL_CONFIG["max_tokens"]
+        )
+
+    usage = getattr(completion, "usage", None)
+    return (
+        completion.choices[0].message["content"],
+        getattr(usage, "prompt_tokens", 0),
+        getattr(usage, "completion_tokens", 0)
+    )
+
+
+def generate_quiz(prompt, use_cache=False):
     """
     Generate quiz using LLM
-    
+
     Args:
         prompt (str): The prompt template for quiz generation
-        
+        use_cache (bool): Serve a stored response for an identical request
+            (off by default: the classic prompts are static, so a cached
+            response would repeat the same quiz for everyone)
+
     Returns:
         str: Generated quiz content
     """
-    client = InferenceClient(
-        provider=MODEL_CONFIG["provider"],
-        api_key=os.getenv("HF_TOKEN")
-    )
-    
-    messages = [{"role": "user", "content": prompt}]
-    
-    completion = client.chat.completions.create(
-        model=MODEL_CONFIG["model"],
-        messages=messages,
-        temperature=MODEL_CONFIG["temperature"],
-        max_tokens=MODEL_CONFIG["max_tokens"]
+    model = _get_backend_model()
+    cache = get_response_cache()
+    params = {
+        "provider": MODEL_CONFIG["provider"],
+        "temperature": MODEL_CONFIG["temperature"],
+        "max_tokens": MODEL_CONFIG["max_tokens"]
+    }
+    key = ResponseCache.make_key(model.model_name, prompt, params)
+    if use_cache and cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    started = time.perf_counter()
+    response = model.generate_content(prompt)
+    usage = getattr(response, "usage_metadata", None)
+    usage_tracker.record(
+        "classic_quiz",
+        len(prompt),
+        input_tokens=getattr(usage, "prompt_token_count", 0),
+        output_tokens=getattr(usage, "candidates_token_count", 0),
+        latency=time.perf_counter() - started
     )
-    
-    return completion.choices[0].message["content"]
\ No newline at end of file
+
+    content = response.text
+
+    if use_cache and cache is not None:
+        cache.set(key, content)
+    return content
+
+
+# ================================================================
+# BENCHMARK
+# ================================================================
+def benchmark_client_overhead(calls=200):
+    """
+    Per-call overhead and connections opened by a client per call
+
+    Runs against a local keep-alive HTTP stub speaking the chat completions
+    API, so only client setup and connection handling are measured. The
+    hub shares one keep-alive session between clients, so closing each
+    client (as _chat_completion does) or leaving its responses to the GC
+    should cost the same and open one connection; a connection count near
+    the number of calls means the pooling broke.
+    """
+    import json
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    import huggingface_hub
+    from huggingface_hub import InferenceClient
+
+    body = json.dumps({
+        "id": "stub", "object": "chat.completion", "created": 0, "model": "stub",
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": "1. 本\n○ ほん"}}]
+    }).encode("utf-8")
+    connections = []
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            super().setup()
+            connections.append(self.client_address)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    messages = [{"role": "user", "content": "quiz"}]
+
+    def run(make_client, release):
+        connections.clear()
+        started = time.perf_counter()
+        for _ in range(calls):
+            client = make_client()
+            client.chat.completions.create(model="stub", messages=messages)
+            if release:
+                client.close()
+        return (time.perf_counter() - started) / calls * 1000, len(connections)
+
+    _configure_http_pool()
+    huggingface_hub.close_session()
+    left_ms, left_conns = run(lambda: InferenceClient(base_url=base_url, api_key="stub"), False)
+    closed_ms, closed_conns = run(lambda: InferenceClient(base_url=base_url, api_key="stub"), True)
+    server.shutdown()
+
+    print(f"Client per call, responses left to the GC : {left_ms:.3f} ms/call, {left_conns} new connection(s)")
+    print(f"Client per call, closed after the call    : {closed_ms:.3f} ms/call, {closed_conns} new connection(s)")
+
+
+if __name__ == "__main__":
+    benchmark_client_overhead()
@@ -0,0 +1,316 @@
+"""
+Quiz text parser
+Single-pass tokenizer for "1. / ○" and "もんだい1: / A)" quizzes, passages and answer keys
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+from types import MappingProxyType
+
+# Immutable, slotted question: num "1", text, options tuple, the reading
+# passage it belongs to ("" if none) and the answer letter when the text
+# carried a key (None otherwise)
+Question = namedtuple("Question", ["num", "text", "options", "passage", "answer"])
+ParsedQuiz = namedtuple("ParsedQuiz", ["questions", "answer_key"])
+
+# Line kinds, dispatched on the first character so most lines need one
+# cheap check (options) or one anchored match (questions)
+CIRCLES = frozenset("○〇◯")
+LETTERS = frozenset("ABCDＡＢＣＤ")
+NUMBERED = re.compile(r"(\d+)\s*[.．](?!\d)\s*(.*)")
+MONDAI = re.compile(r"もんだい\s*(\d+)\s*[:：.．]?\s*(.*)")
+# Upper case only: "a. ..." / "b) ..." lines are prose, not options
+LETTERED = re.compile(r"[A-DＡ-Ｄ]\s*[)）.．]\s*(.+)")
+KEY_HEADER = re.compile(r"(?:せいかい|ANSWER\s+KEY)\s*[:：]?\s*(.*)", re.IGNORECASE)
+KEY_ENTRY = re.compile(r"(\d+)\s*[)）=:：.．-]\s*([A-DＡ-Ｄ])", re.IGNORECASE)
+FULLWIDTH_LETTERS = str.maketrans("ＡＢＣＤａｂｃｄ", "ABCDabcd")
+
+
+class QuizStreamParser:
+    """
+    Incremental quiz parser
+
+    Feed text chunks as they arrive; each question is emitted as soon as
+    it has ``options`` options, otherwise once it is closed by a blank
+    line, the next question, the answer key or the end of the stream.
+    A question is emitted once; options beyond ``options`` are ignored.
+    Lines that are not questions, options or key entries either continue
+    the current question (before its first option) or form the reading
+    passage of the questions that follow.
+    """
+
+    def __init__(self, options=None):
+        """
+        Args:
+            options (int): Options of a complete question (4 for "○" quizzes,
+                           3 for A–C ones); None waits for each question to close
+        """
+        self.options = options
+        self._buffer = ""
+        self._num = None
+        self._text = []
+        self._options = []
+        self._emitted = False
+        self._pending = []
+        self._passage = ""
+        self._in_key = False
+        self.answer_key = {}
+
+    def feed(self, chunk):
+        """
+        Consume a chunk of quiz text
+
+        Returns:
+            list: Questions completed by this chunk
+        """
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split("\n")
+        completed = []
+        self._lines(lines, completed)
+        return completed
+
+    def close(self):
+        """
+        Flush the trailing partial line at end of stream
+
+        Returns:
+            list: Remaining completed questions
+        """
+        completed = []
+        if self._buffer:
+            self._lines([self._buffer], completed)
+            self._buffer = ""
+        self._finish(completed)
+        return completed
+
+    def _emit(self, completed):
+        completed.append(Question(
+            self._num, " ".join(self._text), tuple(self._options), self._passage, None
+        ))
+        self._emitted = True
+
+    def _finish(self, completed):
+        if self._num is not None and self._options and not self._emitted:
+            self._emit(completed)
+        self._num = None
+        self._text = []
+        self._options = []
+        self._emitted = False
+
+    def _start(self, num, text, completed):
+        if self._num is not None:
+            self._finish(completed)
+        if self._pending:
+            self._passage = "\n".join(self._pending)
+            self._pending = []
+        self._num = num
+        self._text = [text] if text else []
+        self._in_key = False
+
+    def _lines(self, lines, completed):
+        # Blank lines and "○" options are most of a quiz: handled inline,
+        # without a method call or a regex, the rest goes through _line()
+        options, expected = self._options, self.options
+        for line in lines:
+            line = line.strip()
+            if not line:
+                if options:
+                    self._finish(completed)
+                    options = self._options
+                continue
+            first = line[0]
+            if first in CIRCLES:
+                option = line[1:].lstrip()
+                if option and self._num is not None and not self._emitted:
+                    options.append(option)
+                    if len(options) == expected:
+                        self._emit(completed)
+                continue
+            self._line(line, first, completed)
+            options = self._options
+
+    def _line(self, line, first, completed):
+        if first.isdigit():
+            if self._in_key:
+                self._key_entries(line)
+                return
+            match = NUMBERED.match(line)
+            if match:
+                self._start(match.group(1), match.group(2), completed)
+                return
+        elif first in LETTERS:
+            match = LETTERED.match(line)
+            if match and self._num is not None:
+                if not self._emitted:
+                    self._options.append(match.group(1).strip())
+                    if len(self._options) == self.options:
+                        self._emit(completed)
+                return
+        elif first == "も":
+            match = MONDAI.match(line)
+            if match:
+                self._start(match.group(1), match.group(2), completed)
+                return
+
+        match = KEY_HEADER.match(line) if first in "せAa" else None
+        if match:
+            self._finish(completed)
+            self._in_key = True
+            self._key_entries(match.group(1))
+        elif self._in_key:
+            self._key_entries(line)
+        elif self._num is not None and not self._options:
+            self._text.append(line)
+        else:
+            self._finish(completed)
+            self._pending.append(line)
+
+    def _key_entries(self, text):
+        for num, letter in KEY_ENTRY.findall(text):
+            self.answer_key[num] = letter.translate(FULLWIDTH_LETTERS).upper()
+
+
+def _parse(quiz_text):
+    parser = QuizStreamParser()
+    questions = parser.feed(quiz_text) + parser.close()
+    key = parser.answer_key
+    if key:
+        questions = [Question(num, text, options, passage, key.get(num))
+                     for num, text, options, passage, _ in questions]
+    return ParsedQuiz(tuple(questions), MappingProxyType(dict(key)))
+
+
+@lru_cache(maxsize=256)
+def parse_quiz(quiz_text):
+    """
+    Parse a quiz (memoized on the text, so reruns don't reparse)
+
+    Returns:
+        ParsedQuiz: (questions tuple of Question, read-only {num: letter}
+                    answer key from a せいかい / ANSWER KEY section)
+    """
+    return _parse(quiz_text)
+
+
+def parse_quiz_questions(quiz_text):
+    """
+    Questions of a quiz in any supported format
+
+    Returns:
+        tuple: Question objects, in order
+    """
+    return parse_quiz(quiz_text).questions
+
+
+def iter_quiz_questions(chunks, options=4):
+    """
+    Parse a stream of quiz text chunks incrementally
+
+    Args:
+        options (int): Options per question (see QuizStreamParser)
+
+    Yields:
+        Question: each question as soon as it has its options (or is closed)
+    """
+    parser = QuizStreamParser(options)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+# ================================================================
+# BENCHMARK
+# ================================================================
+_LEGACY_QUESTION_LINE = re.compile(r'^\d+\.')
+
+
+def _legacy_parse(quiz_text):
+    """Previous parser: "1. / ○" only, dict per question, first four options."""
+    questions, current_q, current_options = [], None, []
+    for line in quiz_text.strip().split('\n'):
+        line = line.strip()
+        if not line:
+            if current_q and current_options:
+                questions.append({**current_q, 'options': current_options[:4]})
+                current_q, current_options = None, []
+        elif _LEGACY_QUESTION_LINE.match(line):
+            if current_q and current_options:
+                questions.append({**current_q, 'options': current_options[:4]})
+            parts = line.split('.', 1)
+            current_q, current_options = {'num': parts[0].strip(), 'text': parts[1].strip()}, []
+        elif line.startswith('○') and line[1:].strip():
+            current_options.append(line[1:].strip())
+    if current_q and current_options:
+        questions.append({**current_q, 'options': current_options[:4]})
+    return questions
+
+
+def _synthetic_corpus(count, seed=0):
+    """count quizzes mixing both formats, passages and answer keys."""
+    import random
+
+    rng = random.Random(seed)
+    words = ["ほん", "ひと", "みず", "やま", "かわ", "くるま", "がっこう", "せんせい", "でんしゃ", "ともだち"]
+    corpus = []
+    for _ in range(count):
+        questions = rng.randint(3, 8)
+        if rng.random() < 0.5:
+            lines = []
+            if rng.random() < 0.2:
+                lines += ["きのう ともだちと やまへ いきました。", "とても たのしかったです。", ""]
+            for i in range(1, questions + 1):
+                lines.append(f"{i}. 「{rng.choice(words)}」の いみは？")
+                lines += [f"○ {rng.choice(words)}" for _ in range(4)] + [""]
+            lines.append("ANSWER KEY: " + " ".join(f"{i}={rng.choice('ABCD')}" for i in range(1, questions + 1)))
+        else:
+            lines = []
+            for i in range(1, questions + 1):
+                lines.append(f"もんだい{i}: 「{rng.choice(words)}」の　よみかたは　なんですか。")
+                lines += [f"{letter}) {rng.choice(words)}" for letter in "ABC"] + [""]
+            lines += ["せいかい:"] + [f"{i}) {rng.choice('ABC')}" for i in range(1, questions + 1)]
+        corpus.append("\n".join(lines))
+    return corpus
+
+
+def benchmark_parser(count=100_000):
+    """
+    Throughput of the parser on count synthetic quizzes (cold, then memoized)
+
+    The legacy parser only understands "1. / ○" quizzes, so both are also
+    timed on that half of the corpus alone.
+    """
+    import time
+
+    corpus = _synthetic_corpus(count)
+    circles = [text for text in corpus if "○" in text]
+    megabytes = sum(len(text.encode("utf-8")) for text in corpus) / 1e6
+    print(f"{count} quizzes ({len(circles)} in the ○ format), {megabytes:.1f} MB")
+
+    def timed(parse, texts):
+        started = time.perf_counter()
+        questions = sum(len(parse(text)) for text in texts)
+        return len(texts) / (time.perf_counter() - started), questions
+
+    legacy = timed(_legacy_parse, circles)
+    circles_cold = timed(lambda text: _parse(text).questions, circles)
+    started = time.perf_counter()
+    cold = timed(lambda text: _parse(text).questions, corpus)
+    cold_s = time.perf_counter() - started
+
+    sample = corpus[:256]
+    for text in sample:
+        parse_quiz(text)
+    started = time.perf_counter()
+    for _ in range(count // len(sample)):
+        for text in sample:
+            parse_quiz(text)
+    warm_s = time.perf_counter() - started
+
+    print(f"○ quizzes   legacy       {legacy[0]:>10,.0f} quizzes/s  {legacy[1]:>7} questions")
+    print(f"○ quizzes   single-pass  {circles_cold[0]:>10,.0f} quizzes/s  {circles_cold[1]:>7} questions")
+    print(f"all quizzes single-pass  {cold[0]:>10,.0f} quizzes/s  {cold[1]:>7} questions  {megabytes / cold_s:.1f} MB/s")
+    print(f"all quizzes memoized     {count / warm_s:>10,.0f} quizzes/s")
+
+
+if __name__ == "__main__":
+    benchmark_parser()
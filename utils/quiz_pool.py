@@ -0,0 +1,175 @@
+"""
+Pre-generated quiz pool
+Background worker keeping ready-made quizzes per (topic, difficulty, num_questions)
+"""
+import threading
+import time
+from collections import deque
+
+from config.settings import QUIZ_POOL_CONFIG
+
+
+class QuizPool:
+    """
+    Warm pool of quizzes in front of a generate function.
+
+    A daemon thread tops every configured combination back up to
+    ``high_watermark`` as soon as its depth falls below ``low_watermark``.
+    Setting both watermarks to the same value refills a slot as soon as it
+    is consumed.
+    """
+
+    def __init__(self, generate_fn, combinations, low_watermark=2, high_watermark=2, refill_interval=2.0):
+        """
+        Args:
+            generate_fn: Callable(topic, difficulty, num_questions) returning a quiz
+            combinations: Iterable of (topic, difficulty, num_questions) to keep warm
+            low_watermark: Depth below which a combination is refilled
+            high_watermark: Depth a refill tops a combination up to
+            refill_interval: Minimum seconds between two background generations
+        """
+        if low_watermark > high_watermark:
+            raise ValueError("low_watermark must not exceed high_watermark")
+
+        self.generate_fn = generate_fn
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.refill_interval = refill_interval
+
+        self._queues = {tuple(combo): deque() for combo in combinations}
+        self._refilling = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.errors = 0
+        self._started_at = None
+
+    # ================================================================
+    # LIFECYCLE
+    # ================================================================
+    def start(self):
+        """Start the background refill worker (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stopped.clear()
+        self._started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="quiz-pool", daemon=True)
+        self._thread.start()
+        self._wakeup.set()
+        return self
+
+    def stop(self, timeout=None):
+        """Stop the worker after its current generation"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    # ================================================================
+    # CONSUMPTION
+    # ================================================================
+    def get(self, topic, difficulty, num_questions):
+        """
+        Take a ready quiz for the combination
+
+        Returns:
+            The pooled quiz, or None when the combination is empty or not pooled
+        """
+        combo = (topic, difficulty, num_questions)
+        with self._lock:
+            queue = self._queues.get(combo)
+            if queue:
+                item = queue.popleft()
+                self.hits += 1
+                if len(queue) < self.low_watermark:
+                    self._refilling.add(combo)
+                    self._wakeup.set()
+                return item
+            self.misses += 1
+            return None
+
+    # ================================================================
+    # WORKER
+    # ================================================================
+    def _next_combo(self):
+        """Pick the emptiest combination that still needs filling"""
+        with self._lock:
+            for combo, queue in self._queues.items():
+                if len(queue) < self.low_watermark:
+                    self._refilling.add(combo)
+            pending = [c for c in self._refilling if len(self._queues[c]) < self.high_watermark]
+            self._refilling.intersection_update(pending)
+            if not pending:
+                return None
+            return min(pending, key=lambda c: len(self._queues[c]))
+
+    def _run(self):
+        while not self._stopped.is_set():
+            combo = self._next_combo()
+            if combo is None:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            try:
+                item = self.generate_fn(*combo)
+            except Exception as e:
+                print(f"⚠️ Quiz pool refill failed for {combo}: {e}")
+                with self._lock:
+                    self.errors += 1
+            else:
+                with self._lock:
+                    self._queues[combo].append(item)
+                    self.generated += 1
+
+            self._stopped.wait(self.refill_interval)
+
+    # ================================================================
+    # METRICS
+    # ================================================================
+    def stats(self):
+        """
+        Pool metrics
+
+        Returns:
+            dict: depth (total and per combination), hits, misses, hit_ratio,
+            generated, errors and refill_rate (quizzes per minute)
+        """
+        with self._lock:
+            depths = {combo: len(queue) for combo, queue in self._queues.items()}
+            lookups = self.hits + self.misses
+            elapsed = time.time() - self._started_at if self._started_at else 0
+            return {
+                "depth": sum(depths.values()),
+                "capacity": self.high_watermark * len(depths),
+                "depths": depths,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "generated": self.generated,
+                "errors": self.errors,
+                "refill_rate": self.generated / elapsed * 60 if elapsed else 0.0,
+            }
+
+
+def create_quiz_pool(generate_fn):
+    """
+    Build and start a pool from QUIZ_POOL_CONFIG
+
+    Returns:
+        QuizPool or None when pooling is disabled
+    """
+    if not QUIZ_POOL_CONFIG["enabled"]:
+        return None
+    return QuizPool(
+        generate_fn,
+        QUIZ_POOL_CONFIG["combinations"],
+        low_watermark=QUIZ_POOL_CONFIG["low_watermark"],
+        high_watermark=QUIZ_POOL_CONFIG["high_watermark"],
+        refill_interval=QUIZ_POOL_CONFIG["refill_interval"],
+    ).start()
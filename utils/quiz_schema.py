@@ -0,0 +1,448 @@
+"""
+Structured (JSON) quiz output
+Response schemas, local validation, deterministic repair and parse/repair/fix-up/regenerate rates
+"""
+import json
+import re
+import threading
+from collections import namedtuple
+
+# Gemini response schemas (OpenAPI subset) for generation_config
+QUESTION_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "question": {"type": "STRING"},
+        "options": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "answer": {"type": "INTEGER"},
+    },
+    "required": ["question", "options", "answer"],
+}
+QUIZ_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "passage": {"type": "STRING"},
+        "questions": {"type": "ARRAY", "items": QUESTION_SCHEMA},
+    },
+    "required": ["passage", "questions"],
+}
+ANALYSIS_ITEM_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "question": {"type": "INTEGER"},
+        "answer": {"type": "INTEGER"},
+        "reason": {"type": "STRING"},
+    },
+    "required": ["question", "answer", "reason"],
+}
+ANALYSIS_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {"results": {"type": "ARRAY", "items": ANALYSIS_ITEM_SCHEMA}},
+    "required": ["results"],
+}
+
+CODE_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$")
+OPTION_MARKER = re.compile(r"^(?:[○〇◯]|[A-Ha-h][).．])\s*")
+LETTERS = "ABCDEFGH"
+
+# Validated quiz: passage, questions ({question, options, answer} or None
+# where broken), descriptions of the repairs made and {position: (problem,
+# original item)} of the questions that still need a fix-up request
+QuizRepair = namedtuple("QuizRepair", ["passage", "questions", "repairs", "broken"])
+AnalysisRepair = namedtuple("AnalysisRepair", ["results", "repairs", "broken"])
+
+
+class StructuredOutputError(ValueError):
+    """A structured response that is unusable even after repair."""
+
+
+def load_json(text):
+    """
+    Decode a JSON object response (a markdown code fence around it is tolerated)
+
+    Raises:
+        StructuredOutputError: Not a JSON object
+    """
+    try:
+        data = json.loads(CODE_FENCE.sub("", text))
+    except json.JSONDecodeError as e:
+        raise StructuredOutputError(f"invalid JSON: {e}") from e
+    if not isinstance(data, dict):
+        raise StructuredOutputError("expected a JSON object")
+    return data
+
+
+def _text(value):
+    """Single-line text of a JSON value ("" for null)."""
+    return " ".join(str(value).split()) if value is not None else ""
+
+
+def _answer_index(value):
+    """
+    (index, was_letter) of an answer given as 1, "1" or "B"
+
+    Returns:
+        tuple: index None when unusable
+    """
+    if isinstance(value, bool):
+        return None, False
+    if isinstance(value, int):
+        return value, False
+    if isinstance(value, float) and value.is_integer():
+        return int(value), False
+    if isinstance(value, str):
+        value = value.strip()
+        if value.lstrip("-").isdigit():
+            return int(value), False
+        letter = value[:1].upper()
+        if letter and letter in LETTERS and not value[1:2].isalpha():
+            return LETTERS.index(letter), True
+    return None, False
+
+
+def _clean_question(item):
+    """Normalized {question, options, answer, letter} of a raw item (None if not an object)."""
+    if not isinstance(item, dict):
+        return None
+    options = item.get("options")
+    options = [_text(option) for option in options] if isinstance(options, list) else []
+    answer, letter = _answer_index(item.get("answer"))
+    return {
+        "question": _text(item.get("question")),
+        "options": [OPTION_MARKER.sub("", option) or option for option in options if option],
+        "answer": answer,
+        "letter": letter,
+    }
+
+
+def _one_based(items, counts, repairs):
+    """
+    Shift numeric answers down by one when they are evidently 1-based
+
+    Evidence: every numeric answer lies in 1..n, none is 0 and at least
+    two equal n (out of range for a 0-based index). A lone answer at n is
+    as likely one bad index as a 1-based key, so it is left out of range
+    for the per-question fix-up rather than shifting every other answer.
+    """
+    numeric = [(item, count) for item, count in zip(items, counts) if item and item["answer"] is not None and not item["letter"]]
+    if (numeric and all(1 <= item["answer"] <= count for item, count in numeric)
+            and sum(item["answer"] == count for item, count in numeric) >= 2):
+        for item, _ in numeric:
+            item["answer"] -= 1
+        repairs.append("1-based answer indices")
+
+
+def repair_question(item, options=4, spare=()):
+    """
+    Validate one question and fix it without the model where possible
+
+    Deterministic repairs: letter answers become indices, option markers
+    ("○", "A)") and duplicated options are dropped (the answer follows the
+    kept copy), surplus wrong options are dropped and a missing option is
+    filled from spare (the other questions' options, so it is the same kind
+    of answer).
+
+    Args:
+        item (dict): Raw or _clean_question() item
+        options (int): Options every question must end up with
+        spare (iterable): Fill-in candidates, in order of preference
+
+    Returns:
+        tuple: (question dict or None, problem or None, [repairs])
+    """
+    question = item if item and "letter" in item else _clean_question(item)
+    if question is None:
+        return None, "not a question object", []
+    if not question["question"]:
+        return None, "empty question text", []
+    choices = question["options"]
+    if question["answer"] is None or not 0 <= question["answer"] < len(choices):
+        return None, f"answer index {question['answer']} is out of range for {len(choices)} options", []
+
+    repairs = ["letter answer"] if question["letter"] else []
+    correct = choices[question["answer"]].casefold()
+    seen, unique = set(), []
+    for choice in choices:
+        if choice.casefold() not in seen:
+            seen.add(choice.casefold())
+            unique.append(choice)
+    if len(unique) < len(choices):
+        repairs.append("duplicate options")
+
+    if len(unique) > options:
+        wrong = [choice for choice in unique if choice.casefold() != correct][:options - 1]
+        unique = [choice for choice in unique if choice.casefold() == correct or choice in wrong]
+        repairs.append(f"{len(choices)} options")
+    elif len(unique) < options:
+        for choice in spare:
+            if len(unique) == options:
+                break
+            if choice.casefold() not in seen:
+                seen.add(choice.casefold())
+                unique.append(choice)
+        if len(unique) < options:
+            return None, f"only {len(unique)} distinct options, {options} needed", repairs
+        repairs.append("missing option")
+
+    answer = next(i for i, choice in enumerate(unique) if choice.casefold() == correct)
+    return {"question": question["question"], "options": unique, "answer": answer}, None, repairs
+
+
+def repair_quiz(data, num_questions, options=4):
+    """
+    Validate a QUIZ_SCHEMA response and repair it deterministically
+
+    Besides repair_question(), answers that are evidently 1-based are
+    shifted and surplus questions dropped. Questions that stay invalid
+    (no text, answer still out of range, too few spare options) and
+    missing questions are left for a targeted fix-up request.
+
+    Raises:
+        StructuredOutputError: No question list at all
+
+    Returns:
+        QuizRepair
+    """
+    items = data.get("questions")
+    if not isinstance(items, list):
+        raise StructuredOutputError('"questions" is not a list')
+
+    repairs = []
+    if len(items) > num_questions:
+        repairs.append(f"{len(items) - num_questions} surplus question(s)")
+        items = items[:num_questions]
+    cleaned = [_clean_question(item) for item in items]
+    _one_based(cleaned, [len(item["options"]) if item else 0 for item in cleaned], repairs)
+
+    questions, broken = [], {}
+    for position in range(num_questions):
+        if position >= len(cleaned):
+            questions.append(None)
+            broken[position] = (f"question {position + 1} is missing; write a new one unlike the others", None)
+            continue
+        spare = [choice for other in cleaned if other and other is not cleaned[position] for choice in other["options"]]
+        question, problem, fixes = repair_question(cleaned[position], options, spare)
+        questions.append(question)
+        repairs.extend(f"Q{position + 1}: {fix}" for fix in fixes)
+        if question is None:
+            broken[position] = (f"question {position + 1}: {problem}; give EXACTLY {options} distinct options "
+                                f"and a 0-based answer index", items[position])
+    return QuizRepair(_passage(data.get("passage")), questions, repairs, broken)
+
+
+def _passage(value):
+    """Non-blank passage lines joined by newlines."""
+    lines = str(value or "").splitlines()
+    return "\n".join(" ".join(line.split()) for line in lines if line.strip())
+
+
+def render_quiz(passage, questions):
+    """
+    "1. / ○" quiz text (utils.quiz_parser format) of validated questions
+
+    Returns:
+        tuple: (quiz_text, answer_key) like NihongoCrew.generate_quiz_with_key
+    """
+    lines = [passage, ""] if passage else []
+    answer_key = {}
+    for num, question in enumerate(questions, 1):
+        lines.append(f"{num}. {question['question']}")
+        lines.extend(f"○ {option}" for option in question["options"])
+        lines.append("")
+        answer_key[str(num)] = LETTERS[question["answer"]]
+    return "\n".join(lines).strip(), answer_key
+
+
+# ================================================================
+# ANSWER ANALYSIS
+# ================================================================
+def _analysis_item(item):
+    """Normalized {num, answer, letter, reason} of a raw result (None if unusable)."""
+    if not isinstance(item, dict):
+        return None
+    num = re.sub(r"\D", "", _text(item.get("question")))
+    answer, letter = _answer_index(item.get("answer"))
+    return {"num": num.lstrip("0") or num, "answer": answer, "letter": letter, "reason": _text(item.get("reason"))}
+
+
+def repair_analysis(data, nums, option_counts):
+    """
+    Validate an ANALYSIS_SCHEMA response against the questions answered
+
+    Letter and evidently 1-based answers are converted; results for
+    questions the student didn't answer are ignored. Missing results and
+    answers out of range are left for a fix-up request.
+
+    Args:
+        data (dict): Decoded response
+        nums (list): Question numbers of the student's answers ("1", ...)
+        option_counts (dict): {num: number of options} from the quiz text
+
+    Returns:
+        AnalysisRepair: results {num: {"answer": index, "reason": str}}
+    """
+    items = data.get("results")
+    if not isinstance(items, list):
+        raise StructuredOutputError('"results" is not a list')
+
+    repairs = []
+    by_num = {}
+    for item in map(_analysis_item, items):
+        if item and item["num"] in nums and item["num"] not in by_num:
+            by_num[item["num"]] = item
+    _one_based(list(by_num.values()), [option_counts.get(num, 4) for num in by_num], repairs)
+
+    results, broken = {}, {}
+    for num in nums:
+        item = by_num.get(num)
+        problem = check_analysis_item(item, option_counts.get(num, 4))
+        if problem:
+            broken[num] = (f"result for question {num}: {problem}", item and {
+                "question": int(num), "answer": item["answer"], "reason": item["reason"]})
+            continue
+        if item["letter"]:
+            repairs.append(f"Q{num}: letter answer")
+        results[num] = {"answer": item["answer"], "reason": item["reason"] or "—"}
+    return AnalysisRepair(results, repairs, broken)
+
+
+def check_analysis_item(item, count=4):
+    """Problem with a normalized analysis result, None when it is usable."""
+    if item is None:
+        return "missing"
+    if item["answer"] is None or not 0 <= item["answer"] < count:
+        return f"answer index {item['answer']} is out of range for {count} options (0-based)"
+    return None
+
+
+def parse_analysis_item(data, count=4):
+    """
+    Validate a single ANALYSIS_ITEM_SCHEMA object (a fix-up response)
+
+    Returns:
+        tuple: ({"answer", "reason"} or None, problem or None)
+    """
+    item = _analysis_item(data)
+    problem = check_analysis_item(item, count)
+    if problem:
+        return None, problem
+    return {"answer": item["answer"], "reason": item["reason"] or "—"}, None
+
+
+def render_analysis(results, user_answers):
+    """
+    Feedback markdown in the "analysis" template's format, scored locally
+
+    Returns:
+        str: "Score: X / N (Y%)" followed by one block per question
+    """
+    blocks, score = [], 0
+    for num in sorted(user_answers, key=lambda n: int(n) if str(n).isdigit() else 0):
+        correct = LETTERS[results[num]["answer"]]
+        chosen = user_answers[num] or "—"
+        ok = chosen == correct
+        score += ok
+        blocks.append(
+            f"Q{num}: {'Correct' if ok else 'Incorrect'}\n"
+            f"- Your answer: {chosen}\n"
+            f"- Correct answer: {correct}\n"
+            f"- Reason: {results[num]['reason']}"
+        )
+    total = len(user_answers)
+    percent = round(100 * score / total) if total else 0
+    return "\n\n".join([f"Score: {score} / {total} ({percent}%)"] + blocks)
+
+
+# ================================================================
+# OUTCOME ACCOUNTING
+# ================================================================
+class StructuredOutputStats:
+    """
+    Outcome counters per structured request kind (quiz, analysis)
+
+    Each response ends as exactly one of:
+        parsed       valid as returned
+        repaired     valid after deterministic local repair
+        fixed_up     needed targeted one-item fix-up request(s)
+        regenerated  first response unusable, a full regeneration worked
+        failed       the regeneration was unusable too
+    """
+
+    OUTCOMES = ("parsed", "repaired", "fixed_up", "regenerated", "failed")
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind, outcome, repairs=0, fixups=0):
+        with self._lock:
+            counts = self._counts.setdefault(kind, dict.fromkeys(self.OUTCOMES + ("repairs", "fixups"), 0))
+            counts[outcome] += 1
+            counts["repairs"] += repairs
+            counts["fixups"] += fixups
+
+    def rates(self):
+        """
+        Counters and rates per kind
+
+        Returns:
+            dict: {kind: {responses, parsed, repaired, fixed_up, regenerated,
+                   failed, repairs, fixups, parse_rate, repair_rate,
+                   fixup_rate, regenerate_rate}}
+        """
+        with self._lock:
+            stats = {}
+            for kind, counts in self._counts.items():
+                responses = sum(counts[outcome] for outcome in self.OUTCOMES)
+                stats[kind] = {
+                    "responses": responses,
+                    **counts,
+                    "parse_rate": counts["parsed"] / responses,
+                    "repair_rate": counts["repaired"] / responses,
+                    "fixup_rate": counts["fixed_up"] / responses,
+                    "regenerate_rate": (counts["regenerated"] + counts["failed"]) / responses,
+                }
+            return stats
+
+
+# Process-wide accounting shared by every backend
+structured_stats = StructuredOutputStats()
+
+
+# ================================================================
+# BENCHMARK
+# ================================================================
+def benchmark_structured_output(quizzes=500, defect_rate=0.3):
+    """Outcome rates of JSON quizzes and analyses from a synthetic model drifting at defect_rate."""
+    import contextlib
+    import io
+    import time
+
+    from agents.gemini_backend import NihongoCrew
+    from agents.llm_backends import SyntheticModel
+    from utils import quiz_schema  # the backend's copy, not __main__'s
+
+    crew = NihongoCrew(model=SyntheticModel(latency_distribution="constant", latency_median=0.0,
+                                            defect_rate=defect_rate))
+    crew.cache = None
+    started = time.perf_counter()
+    failures = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(quizzes):
+            try:
+                quiz_text, answer_key = crew.generate_quiz_with_key("grammar", "N5", 5, use_cache=False)
+                crew.analyze_answers(quiz_text, {num: "A" for num in answer_key})
+            except quiz_schema.StructuredOutputError:
+                failures += 1
+    elapsed = time.perf_counter() - started
+
+    print(f"{quizzes} quizzes + analyses at defect rate {defect_rate:.0%}, "
+          f"{elapsed / quizzes * 1000:.2f} ms each (model time excluded), {failures} failed")
+    for kind, stats in quiz_schema.structured_stats.rates().items():
+        print(f"{kind:<9} parsed {stats['parse_rate']:6.1%} · repaired {stats['repair_rate']:6.1%} · "
+              f"fixed up {stats['fixup_rate']:6.1%} ({stats['fixups']} one-item calls) · "
+              f"regenerated {stats['regenerate_rate']:6.1%}")
+        print(f"{'':<9} full regenerations without local repair: {1 - stats['parse_rate']:.1%}")
+
+
+if __name__ == "__main__":
+    benchmark_structured_output()
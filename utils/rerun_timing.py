@@ -0,0 +1,106 @@
+"""
+Rerun timing for the Streamlit pages
+Per-rerun wall time of the whole script and of each fragment, logged and summarized
+"""
+import functools
+import threading
+import time
+from collections import deque
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from config.settings import RERUN_TIMING_CONFIG
+
+
+class RerunStats:
+    """Recent rerun durations per scope ("app", "question", "feedback", ...)"""
+
+    def __init__(self, window=200):
+        self.window = window
+        self._durations = {}
+        self._lock = threading.Lock()
+
+    def record(self, scope, seconds):
+        with self._lock:
+            self._durations.setdefault(scope, deque(maxlen=self.window)).append(seconds)
+        if RERUN_TIMING_CONFIG["log"]:
+            print(f"⏱️ {scope} rerun {seconds * 1000:.1f} ms")
+
+    def summary(self):
+        """
+        Timing summary per scope over the recent window
+
+        Returns:
+            dict: {scope: {runs, avg_ms, p95_ms, last_ms}}
+        """
+        with self._lock:
+            snapshot = {scope: sorted(durations) for scope, durations in self._durations.items()}
+            last = {scope: durations[-1] for scope, durations in self._durations.items()}
+        return {
+            scope: {
+                "runs": len(durations),
+                "avg_ms": sum(durations) / len(durations) * 1000,
+                "p95_ms": durations[min(len(durations) - 1, int(len(durations) * 0.95))] * 1000,
+                "last_ms": last[scope] * 1000,
+            }
+            for scope, durations in snapshot.items() if durations
+        }
+
+
+# Process-wide timings shared by every session
+rerun_stats = RerunStats(RERUN_TIMING_CONFIG["window"])
+
+
+class RerunTimer:
+    """
+    Time one run of the top-level script
+
+    Start it first thing and stop() it at the end; runs cut short by
+    st.rerun() or st.stop() are not recorded.
+    """
+
+    def __init__(self, scope="app"):
+        self.scope = scope
+        self.started = time.perf_counter()
+
+    def stop(self):
+        rerun_stats.record(self.scope, time.perf_counter() - self.started)
+
+
+def _fragment_rerun():
+    """Whether the current run reruns fragments only (not the whole script)."""
+    ctx = get_script_run_ctx()
+    return bool(ctx and getattr(ctx, "fragment_ids_this_run", None))
+
+
+def rerun_fragment():
+    """
+    Rerun the calling fragment
+
+    A fragment-scoped rerun is only allowed during a fragment rerun; when
+    the fragment is running as part of a full script run, rerun the app.
+    """
+    st.rerun(scope="fragment" if _fragment_rerun() else "app")
+
+
+def timed_fragment(scope):
+    """
+    st.fragment that records how long its own reruns take
+
+    Interacting with a widget inside the fragment reruns only the
+    fragment, so its timing is the cost of e.g. one answer click. Runs
+    as part of a full script run are already counted under "app".
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def run(*args, **kwargs):
+            if not _fragment_rerun():
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                rerun_stats.record(scope, time.perf_counter() - started)
+        return st.fragment(run)
+    return decorate
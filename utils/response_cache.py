@@ -0,0 +1,172 @@
+"""
+Persistent response cache for LLM calls
+Content-addressed SQLite store with LRU eviction, TTL and hit/miss counters
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from config.settings import CACHE_CONFIG
+
+
+class ResponseCache:
+    """
+    Disk-backed cache for model responses.
+
+    Entries are keyed by a hash of (model name, prompt hash, generation
+    parameters), expire after ``ttl_seconds`` and are evicted least recently
+    used first once ``max_entries`` or ``max_bytes`` is exceeded.
+    """
+
+    def __init__(self, path, max_entries=2000, max_bytes=50 * 1024 * 1024, ttl_seconds=7 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)")
+
+    @staticmethod
+    def make_key(model_name, prompt, params=None):
+        """
+        Build a cache key from model name, prompt and generation parameters
+
+        Returns:
+            str: hex digest identifying the request
+        """
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        payload = json.dumps(
+            {"model": model_name, "prompt": prompt_hash, "params": params or {}},
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return the cached value for key, or None on miss/expiry"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Store value under key and evict entries beyond the size caps"""
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        """Drop expired entries, then least recently used ones until within caps"""
+        if self.ttl_seconds:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+
+        while count > self.max_entries or total > self.max_bytes:
+            oldest = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_access ASC LIMIT 1"
+            ).fetchone()
+            if oldest is None:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (oldest[0],))
+            count -= 1
+            total -= oldest[1]
+
+    def clear(self):
+        """Remove every entry and reset counters"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Cache statistics
+
+        Returns:
+            dict: hits, misses, hit_ratio, entries and bytes on disk
+        """
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": count,
+            "bytes": total,
+        }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(path=None):
+    """
+    Get the process-wide cache for path (defaults to CACHE_CONFIG)
+
+    Returns:
+        ResponseCache or None when caching is disabled
+    """
+    if not CACHE_CONFIG["enabled"]:
+        return None
+
+    path = path or CACHE_CONFIG["path"]
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = ResponseCache(
+                path,
+                max_entries=CACHE_CONFIG["max_entries"],
+                max_bytes=CACHE_CONFIG["max_bytes"],
+                ttl_seconds=CACHE_CONFIG["ttl_seconds"],
+            )
+        return _caches[path]
@@ -0,0 +1,248 @@
+"""
+Bounded quiz history per browser session
+Recent summaries in a ring buffer, full quizzes spilled to SQLite
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque, namedtuple
+
+from config.settings import SESSION_HISTORY_CONFIG
+
+# seq: position in the history (1 = first quiz), summary: small dict for listings
+HistoryEntry = namedtuple("HistoryEntry", ["seq", "summary"])
+
+# Quiz fields copied into the in-memory summary; everything else stays on disk
+SUMMARY_FIELDS = ("type", "topic", "difficulty", "num_questions", "timestamp", "mode")
+
+
+def summarize(quiz):
+    """
+    Listing summary of a quiz: its short fields plus the score once graded
+
+    Returns:
+        dict: e.g. {topic, difficulty, num_questions, timestamp, mode, score}
+    """
+    summary = {field: quiz[field] for field in SUMMARY_FIELDS if field in quiz}
+    if quiz.get("results"):
+        correct = sum(1 for r in quiz["results"] if r["is_correct"])
+        summary["score"] = f"{correct}/{len(quiz['results'])}"
+    return summary
+
+
+class HistoryStore:
+    """
+    SQLite store for the full quizzes of every session
+
+    Rows are keyed by (session, history, seq) and dropped ``ttl_seconds``
+    after their last write, so sessions that never come back expire.
+    Payloads round-trip through JSON: sets come back as lists and dict
+    keys as strings.
+    """
+
+    def __init__(self, path, ttl_seconds=30 * 24 * 3600):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS history (
+                session TEXT NOT NULL,
+                name TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                summary TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (session, name, seq)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_history_updated ON history(updated_at)")
+        self._expire(time.time())
+
+    def put(self, session, name, seq, summary, payload):
+        """Write (or overwrite) one quiz and drop expired rows"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO history (session, name, seq, summary, payload, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (session, name, seq,
+                 json.dumps(summary, ensure_ascii=False),
+                 json.dumps(payload, ensure_ascii=False, default=list),
+                 now),
+            )
+            self._expire(now)
+
+    def get(self, session, name, seq):
+        """Return the full quiz, or None if it expired or was cleared"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM history WHERE session = ? AND name = ? AND seq = ?",
+                (session, name, seq)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def summaries(self, session, name):
+        """Every stored summary of one history, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, summary FROM history WHERE session = ? AND name = ? ORDER BY seq",
+                (session, name)
+            ).fetchall()
+        return [HistoryEntry(seq, json.loads(summary)) for seq, summary in rows]
+
+    def clear(self, session, name):
+        """Remove one history of one session"""
+        with self._lock:
+            self._conn.execute("DELETE FROM history WHERE session = ? AND name = ?", (session, name))
+
+    def _expire(self, now):
+        if self.ttl_seconds:
+            self._conn.execute("DELETE FROM history WHERE updated_at < ?", (now - self.ttl_seconds,))
+
+    def stats(self):
+        """
+        Store statistics
+
+        Returns:
+            dict: sessions, entries and payload bytes on disk
+        """
+        with self._lock:
+            sessions, entries, total = self._conn.execute(
+                "SELECT COUNT(DISTINCT session), COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM history"
+            ).fetchone()
+        return {"sessions": sessions, "entries": entries, "bytes": total}
+
+
+class SessionHistory:
+    """
+    Quiz history of one session with bounded memory
+
+    Keeps the summaries of the last ``recent`` quizzes and a count; the full
+    quizzes live in the store and are read back with load(). Supports
+    len() and truth testing like the list it replaces.
+    """
+
+    def __init__(self, session, name, store, recent=10):
+        self.session = session
+        self.name = name
+        self.store = store
+        self._recent = deque(maxlen=recent)
+        self._count = 0
+
+    def append(self, quiz):
+        """
+        Add a quiz (summary in memory, full quiz to the store)
+
+        Returns:
+            int: Its seq, for update() and load()
+        """
+        self._count += 1
+        summary = summarize(quiz)
+        self._recent.append(HistoryEntry(self._count, summary))
+        self.store.put(self.session, self.name, self._count, summary, quiz)
+        return self._count
+
+    def update(self, seq, quiz):
+        """Rewrite a quiz after it changed (graded, explanations added)"""
+        summary = summarize(quiz)
+        for i, entry in enumerate(self._recent):
+            if entry.seq == seq:
+                self._recent[i] = HistoryEntry(seq, summary)
+        self.store.put(self.session, self.name, seq, summary, quiz)
+
+    def recent(self, limit=None):
+        """Most recent entries, newest first"""
+        entries = list(reversed(self._recent))
+        return entries[:limit] if limit else entries
+
+    def load(self, seq):
+        """Full quiz for seq from the store (None if expired)"""
+        return self.store.get(self.session, self.name, seq)
+
+    def summaries(self):
+        """Summaries of the whole history, oldest first (read from the store)"""
+        return self.store.summaries(self.session, self.name)
+
+    def clear(self):
+        self._recent.clear()
+        self._count = 0
+        self.store.clear(self.session, self.name)
+
+    def __len__(self):
+        return self._count
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_history_store(path=None):
+    """
+    Get the process-wide history store for path (defaults to SESSION_HISTORY_CONFIG)
+
+    Returns:
+        HistoryStore
+    """
+    path = path or SESSION_HISTORY_CONFIG["path"]
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = HistoryStore(path, ttl_seconds=SESSION_HISTORY_CONFIG["ttl_seconds"])
+        return _stores[path]
+
+
+# ================================================================
+# BENCHMARK
+# ================================================================
+def benchmark_session_memory(quizzes=(10, 100, 1000)):
+    """Memory held per session by a plain list vs SessionHistory, graded 5-question quizzes."""
+    import tempfile
+    import tracemalloc
+
+    from utils.grading import format_feedback, grade_answers
+    from utils.local_quiz import get_local_quiz_engine
+
+    engine = get_local_quiz_engine()
+
+    def quiz(seed):
+        quiz_text, answer_key = engine.generate("general", "N5", 5, seed=seed)
+        results = grade_answers(answer_key, {num: "A" for num in answer_key})
+        return {
+            "content": quiz_text, "answer_key": answer_key, "topic": "general", "difficulty": "N5",
+            "num_questions": 5, "timestamp": "2024-01-01 12:00", "mode": "Local",
+            "results": results, "feedback": format_feedback(results), "user_answers": {},
+        }
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = HistoryStore(os.path.join(directory, "history.sqlite3"))
+        for count in quizzes:
+            payloads = [quiz(seed) for seed in range(count)]
+            for name, history in (("list", []), ("SessionHistory", SessionHistory(f"s{count}", "bench", store))):
+                tracemalloc.start()
+                started = time.perf_counter()
+                for payload in payloads:
+                    # Each stored quiz is a fresh copy, as in the app
+                    history.append(json.loads(json.dumps(payload)))
+                elapsed = time.perf_counter() - started
+                held = tracemalloc.get_traced_memory()[0]
+                tracemalloc.stop()
+                print(f"{count:5d} quizzes | {name:<14} {held / 1024:8.1f} KB held | "
+                      f"{elapsed / count * 1e6:7.1f} µs per append")
+            history = SessionHistory(f"s{count}", "bench", store)
+            started = time.perf_counter()
+            history.load(count // 2)
+            print(f"{'':16}load one quiz {(time.perf_counter() - started) * 1e6:.0f} µs")
+        print(f"store: {store.stats()}")
+
+
+if __name__ == "__main__":
+    benchmark_session_memory()
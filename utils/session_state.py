@@ -1,12 +1,25 @@
 """
 Session state management utilities
 """
+import uuid
+
 import streamlit as st
 
+from config.settings import SESSION_HISTORY_CONFIG
+from utils.session_history import SessionHistory, get_history_store
+
 def initialize_session_state():
     """Initialize all session state variables"""
-    if 'quiz_history' not in st.session_state:
-        st.session_state.quiz_history = []
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    
+    # Quiz histories keep recent summaries only; full quizzes are on disk
+    for name in ('quiz_history', 'agent_quizzes'):
+        if name not in st.session_state:
+            st.session_state[name] = SessionHistory(
+                st.session_state.session_id, name, get_history_store(),
+                recent=SESSION_HISTORY_CONFIG["recent"]
+            )
     
     if 'current_quiz' not in st.session_state:
         st.session_state.current_quiz = None
@@ -0,0 +1,189 @@
+"""
+Startup time of the Streamlit entry points
+Background pre-warm after first paint, import-time report and budget check
+"""
+import importlib
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from config.settings import STARTUP_CONFIG
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_prewarm_lock = threading.Lock()
+_prewarm_started = False
+
+
+def prewarm_enabled():
+    """STARTUP_CONFIG["prewarm"], unless NIHONGO_PREWARM=0 turns it off."""
+    return STARTUP_CONFIG["prewarm"] and os.getenv("NIHONGO_PREWARM", "1") != "0"
+
+
+def prewarm(modules=(), warmers=()):
+    """
+    Import heavy modules (and run warm-up callables) in a daemon thread
+
+    Call it at the end of the entry script, after the first page has been
+    sent: the imports then overlap with the user reading the page instead
+    of delaying it. Runs once per process; later calls are no-ops.
+
+    Args:
+        modules (iterable): Module names to import, e.g. "google.generativeai"
+        warmers (iterable): Callables run after the imports (e.g. cached resource getters)
+
+    Returns:
+        threading.Thread or None when disabled or already started
+    """
+    global _prewarm_started
+    if not prewarm_enabled():
+        return None
+    with _prewarm_lock:
+        if _prewarm_started:
+            return None
+        _prewarm_started = True
+
+    def run():
+        for name in modules:
+            started = time.perf_counter()
+            try:
+                importlib.import_module(name)
+            except ImportError as e:
+                print(f"⚠️ Pre-warm skipped {name}: {e}")
+                continue
+            print(f"🔥 Pre-warmed {name} in {(time.perf_counter() - started) * 1000:.0f} ms")
+        for warm in warmers:
+            try:
+                warm()
+            except Exception as e:
+                print(f"⚠️ Pre-warm failed: {e}")
+
+    thread = threading.Thread(target=run, name="startup-prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+# ================================================================
+# MEASUREMENT
+# ================================================================
+# `streamlit run` has imported streamlit before the script starts, so the
+# probe does the same and only times the script itself (bare mode, Home page).
+_MARKER = "--- script start ---"
+_PROBE = (
+    "import os, runpy, sys, time\n"
+    "import streamlit\n"
+    f"print({_MARKER!r}, file=sys.stderr, flush=True)\n"
+    "started = time.perf_counter()\n"
+    "runpy.run_path(sys.argv[1], run_name='__main__')\n"
+    "elapsed = time.perf_counter() - started\n"
+    "loaded = [name for name in sys.argv[2:] if name in sys.modules]\n"
+    "print('STARTUP', elapsed, ','.join(loaded), file=sys.stderr, flush=True)\n"
+    "os._exit(0)\n"
+)
+
+
+def _run_probe(entry, importtime=False, backend=None):
+    """
+    Run entry once in a fresh interpreter
+
+    Args:
+        backend (str): LLM_BACKEND for the run; None keeps the configured one
+
+    Returns:
+        tuple: (seconds, deferred modules loaded, stderr)
+    """
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", _PROBE, entry, *STARTUP_CONFIG["deferred_modules"]]
+    env = {**os.environ, "PYTHONPATH": _ROOT, "NIHONGO_PREWARM": "0"}
+    if backend:
+        env["LLM_BACKEND"] = backend
+    stderr = subprocess.run(
+        command, cwd=_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, env=env
+    ).stderr
+    for line in stderr.splitlines():
+        if line.startswith("STARTUP "):
+            parts = line.split(" ")
+            loaded = parts[2].split(",") if len(parts) > 2 and parts[2] else []
+            return float(parts[1]), loaded, stderr
+    raise RuntimeError(f"{entry} did not finish:\n{stderr[-2000:]}")
+
+
+def probe_backends():
+    """Backends to measure: the configured one (LLM_BACKEND / BACKEND_CONFIG), then synthetic."""
+    from agents.llm_backends import selected_backend
+
+    return list(dict.fromkeys([selected_backend(), "synthetic"]))
+
+
+def import_time_report(entry="app_with_gemini.py", top=25, backend=None):
+    """
+    Per-module import cost of one cold start of entry (python -X importtime)
+
+    Only imports made by the script count; streamlit itself is loaded first.
+    The configured backend is used unless backend names another.
+
+    Returns:
+        list: [(module, cumulative_ms, self_ms)] most expensive first
+    """
+    _, _, stderr = _run_probe(entry, importtime=True, backend=backend)
+    modules = []
+    lines = stderr.splitlines()
+    for line in lines[lines.index(_MARKER) + 1:]:
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not cumulative_us.strip().isdigit():
+            continue
+        modules.append((name.strip(), int(cumulative_us) / 1000, int(self_us) / 1000))
+    modules.sort(key=lambda module: module[1], reverse=True)
+    return modules[:top]
+
+
+def check_startup_budget(entries=("app_with_gemini.py", "app.py"), runs=None, backends=None):
+    """
+    Startup regression check: median cold start per entry and backend against the budget
+
+    Fails if an entry is over STARTUP_CONFIG["budget_seconds"] or imports
+    one of STARTUP_CONFIG["deferred_modules"] before the first page.
+
+    Args:
+        backends (list): LLM_BACKEND values to run with (default: probe_backends())
+
+    Returns:
+        list: Failure messages (empty when within budget)
+    """
+    runs = runs or STARTUP_CONFIG["runs"]
+    budget = STARTUP_CONFIG["budget_seconds"]
+    failures = []
+    for backend in backends or probe_backends():
+        for entry in entries:
+            samples, loaded = [], set()
+            for _ in range(runs):
+                seconds, modules, _ = _run_probe(entry, backend=backend)
+                samples.append(seconds)
+                loaded.update(modules)
+            median = statistics.median(samples)
+            status = "✅" if median <= budget and not loaded else "❌"
+            print(f"{status} {entry:<20} {backend:<10} median {median * 1000:6.0f} ms over {runs} runs "
+                  f"(budget {budget * 1000:.0f} ms)")
+            if median > budget:
+                failures.append(f"{entry} ({backend}): {median:.2f}s over the {budget:.2f}s startup budget")
+            if loaded:
+                failures.append(f"{entry} ({backend}): imports {', '.join(sorted(loaded))} at startup")
+    return failures
+
+
+if __name__ == "__main__":
+    for entry in ("app_with_gemini.py", "app.py"):
+        print(f"\n📦 Import time of {entry} with the {probe_backends()[0]} backend (cumulative / self)")
+        for name, cumulative_ms, self_ms in import_time_report(entry, top=15):
+            print(f"  {cumulative_ms:8.1f} ms  {self_ms:8.1f} ms  {name}")
+    print()
+    failures = check_startup_budget()
+    for failure in failures:
+        print(f"❌ {failure}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,203 @@
+"""
+Kana <-> romaji transliteration
+Table-driven Hepburn conversion on tries, plus search-text normalization
+"""
+import unicodedata
+
+_VOWELS = "aiueo"
+_ROWS = {
+    "": "あいうえお", "k": "かきくけこ", "s": "さしすせそ", "t": "たちつてと",
+    "n": "なにぬねの", "h": "はひふへほ", "m": "まみむめも", "r": "らりるれろ",
+    "g": "がぎぐげご", "z": "ざじずぜぞ", "d": "だぢづでど", "b": "ばびぶべぼ",
+    "p": "ぱぴぷぺぽ",
+}
+_HEPBURN_EXCEPTIONS = {
+    "si": "shi", "ti": "chi", "tu": "tsu", "hu": "fu", "zi": "ji", "di": "ji", "du": "zu",
+}
+_YOUON = {
+    "き": "ky", "ぎ": "gy", "し": "sh", "じ": "j", "ち": "ch", "ぢ": "j", "に": "ny",
+    "ひ": "hy", "び": "by", "ぴ": "py", "み": "my", "り": "ry",
+}
+_EXTRA = {
+    "や": "ya", "ゆ": "yu", "よ": "yo", "わ": "wa", "を": "o", "ん": "n", "ゔ": "vu",
+    "ぁ": "a", "ぃ": "i", "ぅ": "u", "ぇ": "e", "ぉ": "o", "ゃ": "ya", "ゅ": "yu", "ょ": "yo", "ゎ": "wa",
+    # Loanword combinations (katakana is folded to hiragana first)
+    "しぇ": "she", "じぇ": "je", "ちぇ": "che", "ふぁ": "fa", "ふぃ": "fi", "ふぇ": "fe",
+    "ふぉ": "fo", "てぃ": "ti", "でぃ": "di", "とぅ": "tu", "どぅ": "du", "うぃ": "wi",
+    "うぇ": "we", "うぉ": "wo", "ゔぁ": "va", "ゔぃ": "vi", "ゔぇ": "ve", "ゔぉ": "vo",
+    "つぁ": "tsa",
+}
+# Alternative spellings accepted when reading romaji (Kunrei/Nihon-shiki, IME habits)
+_ROMAJI_ALIASES = {
+    "si": "し", "ti": "ち", "tu": "つ", "hu": "ふ", "zi": "じ", "wo": "を", "n'": "ん",
+    "sya": "しゃ", "syu": "しゅ", "syo": "しょ", "tya": "ちゃ", "tyu": "ちゅ", "tyo": "ちょ", "cya": "ちゃ", "cyu": "ちゅ", "cyo": "ちょ", "zya": "じゃ", "zyu": "じゅ",
+    "zyo": "じょ", "jya": "じゃ", "jyu": "じゅ", "jyo": "じょ", "xtu": "っ", "ltu": "っ",
+    "xya": "ゃ", "xyu": "ゅ", "xyo": "ょ", "xa": "ぁ", "xi": "ぃ", "xu": "ぅ", "xe": "ぇ", "xo": "ぉ",
+    "-": "ー",
+}
+_MACRONS = {"ā": "aa", "ī": "ii", "ū": "uu", "ē": "ee", "ō": "ou", "â": "aa", "î": "ii", "û": "uu", "ê": "ee", "ô": "ou"}
+
+
+class _Trie:
+    """Character trie with longest-prefix lookup."""
+
+    def __init__(self):
+        self._root = {}
+
+    def insert(self, key, value):
+        node = self._root
+        for char in key:
+            node = node.setdefault(char, {})
+        node.setdefault(None, value)
+
+    def longest_match(self, text, start):
+        """(value, length) of the longest key at text[start:], or (None, 0)."""
+        node, value, length = self._root, None, 0
+        for i in range(start, len(text)):
+            node = node.get(text[i])
+            if node is None:
+                break
+            if None in node:
+                value, length = node[None], i - start + 1
+        return value, length
+
+
+def _build_tables():
+    kana_to_romaji = {}
+    for consonant, kana_row in _ROWS.items():
+        for vowel, kana in zip(_VOWELS, kana_row):
+            romaji = consonant + vowel
+            kana_to_romaji[kana] = _HEPBURN_EXCEPTIONS.get(romaji, romaji)
+    for kana, prefix in _YOUON.items():
+        for small, vowel in zip("ゃゅょ", "auo"):
+            kana_to_romaji[kana + small] = prefix + vowel
+    kana_to_romaji.update(_EXTRA)
+
+    kana_trie = _Trie()
+    for kana, romaji in kana_to_romaji.items():
+        kana_trie.insert(kana, romaji)
+
+    # Reverse table: the first kana listed for a spelling wins (じ over ぢ, ず over づ)
+    romaji_trie = _Trie()
+    for kana, romaji in kana_to_romaji.items():
+        if len(kana) == 1 and kana in "ぁぃぅぇぉゃゅょゎ":
+            continue
+        romaji_trie.insert(romaji, kana)
+    for romaji, kana in _ROMAJI_ALIASES.items():
+        romaji_trie.insert(romaji, kana)
+    return kana_trie, romaji_trie
+
+
+_KANA_TRIE, _ROMAJI_TRIE = _build_tables()
+
+
+def katakana_to_hiragana(text):
+    """Fold katakana (ァ-ヶ, ヽヾ) to hiragana; everything else is kept."""
+    return "".join(
+        chr(ord(char) - 0x60) if "ァ" <= char <= "ヶ" or char in "ヽヾ" else char
+        for char in text
+    )
+
+
+def fold(text):
+    """
+    Script-insensitive search form of text
+
+    NFKC (full/half-width), case folding and katakana -> hiragana.
+    """
+    return katakana_to_hiragana(unicodedata.normalize("NFKC", str(text)).casefold())
+
+
+def kana_to_romaji(text):
+    """
+    Hepburn romanization of hiragana/katakana
+
+    Small tsu doubles the next consonant (っち -> tchi), the long-vowel
+    mark repeats the previous vowel (コーヒー -> koohii) and characters
+    without a reading (kanji, punctuation) are passed through.
+    """
+    text = fold(text)
+    out = []
+    geminate = False
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char == "っ":
+            geminate = True
+            i += 1
+            continue
+        if char == "ー":
+            previous = next((c for c in reversed("".join(out)) if c in _VOWELS), "")
+            out.append(previous)
+            i += 1
+            continue
+
+        romaji, length = _KANA_TRIE.longest_match(text, i)
+        if romaji is None:
+            romaji, length = char, 1
+        elif geminate and romaji[0] not in _VOWELS + "n":
+            romaji = ("t" if romaji.startswith("ch") else romaji[0]) + romaji
+        geminate = False
+        out.append(romaji)
+        i += length
+    return "".join(out)
+
+
+def romaji_to_kana(text):
+    """
+    Hiragana reading of romaji (Hepburn, Kunrei or IME-style spelling)
+
+    Doubled consonants become small tsu, a lone "n" before a consonant or
+    at the end becomes ん; unconvertible characters are passed through.
+    """
+    text = "".join(_MACRONS.get(char, char) for char in text.lower())
+    out = []
+    i = 0
+    while i < len(text):
+        char = text[i]
+        following = text[i + 1] if i + 1 < len(text) else ""
+        if char == following and char not in _VOWELS + "n" and char.isalpha():
+            out.append("っ")
+            i += 1
+            continue
+        if char == "t" and text.startswith("ch", i + 1):
+            out.append("っ")
+            i += 1
+            continue
+
+        kana, length = _ROMAJI_TRIE.longest_match(text, i)
+        if char == "n" and (not following or following not in _VOWELS + "y'"):
+            # "nn" before a vowel is ん + n-row (onna); otherwise it is a typed ん
+            after = text[i + 2] if i + 2 < len(text) else ""
+            double = following == "n" and (not after or after not in _VOWELS + "y")
+            kana, length = "ん", 2 if double else 1
+        if kana is None:
+            kana, length = char, 1
+        out.append(kana)
+        i += length
+    return "".join(out)
+
+
+def is_kana(text):
+    """Whether text is entirely hiragana (after folding) or the long-vowel mark."""
+    return bool(text) and all("ぁ" <= char <= "ゖ" or char == "ー" for char in text)
+
+
+def normalize_query(query):
+    """
+    Search variants of a user query, all in fold() form
+
+    A romaji query also yields its hiragana reading and the canonical
+    Hepburn spelling (so "tabe", "taberu", "syasin" and "gakkō" find the
+    precomputed romaji column); other queries are just folded.
+
+    Returns:
+        list: Distinct variants, the folded query first
+    """
+    folded = fold(query).strip()
+    variants = [folded]
+    if folded and (folded.isascii() or any(char in _MACRONS for char in folded)):
+        kana = romaji_to_kana(folded.replace(" ", ""))
+        if is_kana(kana):
+            variants.extend([kana, kana_to_romaji(kana)])
+    return list(dict.fromkeys(v for v in variants if v))
@@ -0,0 +1,183 @@
+"""
+Typo-tolerant vocabulary search
+Trigram candidate filtering + bounded edit distance, used when exact search finds nothing
+"""
+import re
+from collections import Counter, defaultdict
+
+from utils.vocab_index import normalize_text
+
+PAD = "\x02"
+ENGLISH_WORD = re.compile(r"[a-z]+")
+MIN_TERM_LENGTH = 2  # whole field values (two-kana words)
+MIN_WORD_LENGTH = 3  # English words ("to", "a" would match everything)
+
+
+def bounded_levenshtein(a, b, limit):
+    """
+    Edit distance between a and b, or limit + 1 once it must exceed limit
+
+    Only the diagonal band of width 2 * limit + 1 is computed.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) > len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        low, high = max(1, i - limit), min(len(b), i + limit)
+        current = [i] + [limit + 1] * len(b)
+        best = current[0] if low == 1 else limit + 1
+        for j in range(low, high + 1):
+            cost = previous[j - 1] + (char_a != b[j - 1])
+            cost = min(cost, previous[j] + 1, current[j - 1] + 1)
+            current[j] = cost
+            if cost < best:
+                best = cost
+        if best > limit:
+            return limit + 1
+        previous = current
+    return min(previous[len(b)], limit + 1)
+
+
+def _trigrams(term):
+    padded = PAD * 2 + term + PAD * 2
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FuzzyIndex:
+    """
+    Trigram index over vocabulary terms for approximate lookups.
+
+    Terms are the folded Kanji, Hiragana and Romaji values and the single
+    English words of every row. A query term within edit distance k shares
+    at least (len + 2) - 3k padded trigrams with a match (q-gram lemma), so
+    trigram counts prune the candidates before the (banded) edit distance
+    is computed.
+    """
+
+    def __init__(self, columns, max_distance=2):
+        """
+        Args:
+            columns (dict): {"Kanji": [...], "Hiragana": [...], "Romaji": [...], "English": [...]}
+            max_distance (int): Largest edit distance ever accepted
+        """
+        self.max_distance = max_distance
+        term_rows = defaultdict(list)
+        for field, values in columns.items():
+            for row_id, value in enumerate(values):
+                text = normalize_text(value)
+                if field == "English":
+                    terms = [word for word in ENGLISH_WORD.findall(text) if len(word) >= MIN_WORD_LENGTH]
+                else:
+                    terms = [text] if len(text) >= MIN_TERM_LENGTH else []
+                for term in terms:
+                    term_rows[term].append(row_id)
+
+        self._terms = list(term_rows)
+        self._term_rows = [sorted(set(term_rows[term])) for term in self._terms]
+        postings = defaultdict(list)
+        for term_id, term in enumerate(self._terms):
+            for gram in _trigrams(term):
+                postings[gram].append(term_id)
+        self._postings = dict(postings)
+
+    def __len__(self):
+        return len(self._terms)
+
+    def threshold(self, term):
+        """Edit distance allowed for a query term: 1 up to 5 characters, then max_distance."""
+        return min(self.max_distance, 1 if len(term) <= 5 else 2)
+
+    def matches(self, term):
+        """
+        Indexed terms close to term
+
+        Returns:
+            list: (distance, term_id) pairs within the term's threshold
+        """
+        limit = self.threshold(term)
+        grams = _trigrams(term)
+        needed = len(term) + 2 - 3 * limit
+
+        counts = Counter()
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is not None:
+                counts.update(posting)
+
+        terms = self._terms
+        found = []
+        for term_id, shared in counts.items():
+            if shared >= needed:
+                distance = bounded_levenshtein(term, terms[term_id], limit)
+                if distance <= limit:
+                    found.append((distance, term_id))
+        return found
+
+    def search(self, *queries, top_k=20):
+        """
+        Rows with a term close to any query (or, for several words, to any of them)
+
+        Args:
+            queries (str): Search text and its variants (e.g. from
+                           transliteration.normalize_query)
+            top_k (int): Maximum rows returned
+
+        Returns:
+            list: Row ids, closest first (ties in row order)
+        """
+        best = {}
+        for query in dict.fromkeys(normalize_text(q) for q in queries):
+            if " " in query:
+                terms = {word for word in ENGLISH_WORD.findall(query) if len(word) >= MIN_WORD_LENGTH}
+            elif len(query) >= MIN_TERM_LENGTH:
+                terms = {query}
+            else:
+                terms = set()
+            for term in terms:
+                for distance, term_id in self.matches(term):
+                    for row_id in self._term_rows[term_id]:
+                        if distance < best.get(row_id, distance + 1):
+                            best[row_id] = distance
+        return sorted(best, key=lambda row_id: (best[row_id], row_id))[:top_k]
+
+
+# ================================================================
+# BENCHMARK
+# ================================================================
+def benchmark_fuzzy(rows=20000, repeat=50):
+    """Build time and per-query latency on a rows-long table of compounds."""
+    import random
+    import time
+
+    from utils.transliteration import kana_to_romaji, normalize_query
+    from utils.vocab_store import load_vocabulary
+
+    vocab = load_vocabulary()
+    base = vocab.rows(range(len(vocab)))
+    rng = random.Random(0)
+    columns = {"Kanji": [], "Hiragana": [], "Romaji": [], "English": []}
+    for _ in range(rows):
+        a, b = rng.choice(base), rng.choice(base)
+        columns["Kanji"].append(a.Kanji + b.Kanji)
+        columns["Hiragana"].append(a.Hiragana + b.Hiragana)
+        columns["Romaji"].append(kana_to_romaji(a.Hiragana + b.Hiragana))
+        columns["English"].append(f"{a.English} {b.English}")
+
+    started = time.perf_counter()
+    index = FuzzyIndex(columns)
+    print(f"{rows} rows, {len(index)} terms, built in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    queries = ["meat", "watr", "mountian", "あお", "たべり", "taberi", "gakou", "libary", "to meat"]
+    print(f"{'query':<10} {'hits':>5} {'ms':>7}")
+    for query in queries:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            hits = index.search(*normalize_query(query))
+        elapsed = (time.perf_counter() - started) / repeat * 1000
+        print(f"{query:<10} {len(hits):>5} {elapsed:>7.2f}")
+
+
+if __name__ == "__main__":
+    benchmark_fuzzy()
@@ -0,0 +1,81 @@
+"""
+Precomputed group indexes for vocabulary filters
+Column value -> row ids, built once per load; filters combine by set intersection
+"""
+import re
+
+ADVERB_GLOSS = re.compile(r"^[a-z]+ly\b")
+
+
+def part_of_speech(kanji, hiragana, english):
+    """
+    Coarse part of speech from the gloss and the written form
+
+    The VocabLists carry no word classes, so this is a heuristic: English
+    "to ..." glosses are verbs, kanji words ending in い okurigana (other
+    than verbs) are い-adjectives, "...ly" glosses adverbs, the rest nouns
+    and other words.
+    """
+    gloss = english.strip().lower()
+    if gloss.startswith("to "):
+        return "Verb"
+    if kanji and kanji.endswith("い") and hiragana.endswith("い"):
+        return "い-Adjective"
+    if ADVERB_GLOSS.match(gloss):
+        return "Adverb"
+    return "Noun / Other"
+
+
+class GroupIndex:
+    """
+    Row ids of every distinct value of one column.
+
+    ``ids(value)`` is the sorted id list (source order) and
+    ``members(value)`` the same ids as a frozenset for intersections.
+    """
+
+    def __init__(self, values):
+        groups = {}
+        for row_id, value in enumerate(values):
+            groups.setdefault(value, []).append(row_id)
+        groups.pop("", None)
+        self._ids = groups
+        self._members = {value: frozenset(ids) for value, ids in groups.items()}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, value):
+        return value in self._ids
+
+    @property
+    def values(self):
+        """Distinct values in order of first appearance."""
+        return list(self._ids)
+
+    def ids(self, value):
+        return self._ids.get(value, [])
+
+    def members(self, value):
+        return self._members.get(value, frozenset())
+
+
+def filter_row_ids(row_ids, selections):
+    """
+    Keep the row ids inside every selected group
+
+    Args:
+        row_ids (sequence): Candidate rows (e.g. ranked search results)
+        selections (list): (GroupIndex, value) pairs to intersect
+
+    Returns:
+        list: row_ids in their original order, restricted to the intersection
+    """
+    sets = sorted((index.members(value) for index, value in selections), key=len)
+    if not sets:
+        return row_ids
+    allowed = sets[0].intersection(*sets[1:])
+    if isinstance(row_ids, range) and row_ids == range(len(row_ids)):
+        # Unfiltered source: the intersection already is the answer
+        return sorted(allowed)
+    return [row_id for row_id in row_ids if row_id in allowed]
@@ -0,0 +1,219 @@
+"""
+Character n-gram inverted index for vocabulary search
+Posting-list intersection with exact > prefix > substring ranking
+"""
+from collections import defaultdict
+from itertools import islice
+
+from utils.transliteration import fold
+
+VOCAB_FIELDS = ("Kanji", "Hiragana", "Romaji", "English")
+FIELD_SEP = "\x1f"
+_NO_ROWS = frozenset()
+
+
+def normalize_text(text):
+    """Folded (width, case, katakana), trimmed form used for indexing and querying."""
+    return fold(text).strip()
+
+
+class VocabIndex:
+    """
+    Inverted index from character n-grams (and single characters) to rows.
+
+    A query is resolved by intersecting the posting lists of its n-grams,
+    smallest first, and ranked exact match > prefix (of the field or of
+    any word in it) > substring, ties in row order. Exact matches come
+    from a field-value lookup and prefix candidates from a second index
+    of the n-grams that start a word, so only queries longer than the
+    n-gram are verified against the row text, one rank at a time and
+    only until ``limit`` rows are found.
+    """
+
+    def __init__(self, columns, n=2):
+        """
+        Args:
+            columns (list): One list of str per indexed field (e.g. VOCAB_FIELDS),
+                            all of the same length
+            n (int): N-gram length
+        """
+        self.n = n
+        # One "\x1f"-delimited string per row, so a single `in` checks every field
+        self._rows = []
+
+        postings = defaultdict(list)
+        starts = defaultdict(list)
+        # Row ids per whole field value
+        self._exact = {}
+        for row_id, values in enumerate(zip(*columns)):
+            texts = [normalize_text(value) for value in values]
+            self._rows.append(FIELD_SEP + FIELD_SEP.join(texts) + FIELD_SEP)
+            grams = set()
+            heads = set()
+            for text in texts:
+                grams.update(text)
+                grams.update(text[i:i + n] for i in range(len(text) - n + 1))
+                start = 0
+                for word in text.split(" "):
+                    heads.update((text[start:start + 1], text[start:start + n]))
+                    start += len(word) + 1
+                if text:
+                    row_ids = self._exact.setdefault(text, [])
+                    if not row_ids or row_ids[-1] != row_id:
+                        row_ids.append(row_id)
+            for gram in grams:
+                postings[gram].append(row_id)
+            for gram in heads:
+                starts[gram].append(row_id)
+        self._postings = {gram: frozenset(rows) for gram, rows in postings.items()}
+        # Rows where a field or a word in it starts with the gram
+        self._starts = {gram: frozenset(rows) for gram, rows in starts.items() if gram}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def candidates(self, query):
+        """Row ids containing every n-gram of the (normalized) query."""
+        if len(query) < self.n:
+            grams = {query}
+        else:
+            grams = {query[i:i + self.n] for i in range(len(query) - self.n + 1)}
+
+        lists = []
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is None:
+                return set()
+            lists.append(posting)
+        lists.sort(key=len)
+        return lists[0].intersection(*lists[1:])
+
+    def search(self, *queries, limit=None):
+        """
+        Find rows matching any of the queries in any field
+
+        Args:
+            queries (str): Search text and its variants (e.g. from
+                           transliteration.normalize_query); blank returns every row
+            limit (int): Stop after this many rows (None returns every match)
+
+        Returns:
+            list: Row positions, best matches first
+        """
+        queries = [q for q in dict.fromkeys(normalize_text(q) for q in queries) if q]
+        if not queries:
+            return list(range(len(self._rows) if limit is None else min(limit, len(self._rows))))
+
+        # Per rank: rows known to match, rows to verify and the patterns
+        # that verify them. Queries no longer than the n-gram need none.
+        n = self.n
+        exact = set()
+        prefix, prefix_unverified, prefix_patterns = set(), set(), []
+        substring, substring_unverified, long_queries = set(), set(), []
+        for query in queries:
+            exact.update(self._exact.get(query, _NO_ROWS))
+            found = self.candidates(query)
+            heads = self._starts.get(query[:n], _NO_ROWS)
+            if len(query) > n:
+                prefix_unverified.update(heads.intersection(found))
+                substring_unverified.update(found)
+                prefix_patterns += [FIELD_SEP + query, " " + query]
+                long_queries.append(query)
+            else:
+                prefix.update(heads)
+                substring.update(found)
+
+        rows = self._rows
+        results = []
+        seen = set()
+        for known, unverified, patterns in ((exact, (), ()),
+                                             (prefix, prefix_unverified, prefix_patterns),
+                                             (substring, substring_unverified, long_queries)):
+            known = known.difference(seen)
+            if unverified:
+                unverified = unverified.difference(seen, known)
+            if limit is None:
+                # One pass per pattern over the rows to verify
+                known.update(row_id for pattern in patterns
+                             for row_id in unverified if pattern in rows[row_id])
+                ranked = sorted(known)
+            else:
+                # Verify in rank order, only up to the rows still needed
+                ranked = sorted(known.union(unverified))
+                if unverified:
+                    ranked = (row_id for row_id in ranked if row_id in known
+                              or any(pattern in rows[row_id] for pattern in patterns))
+                ranked = list(islice(ranked, limit - len(results)))
+            results += ranked
+            if limit is not None and len(results) >= limit:
+                break
+            seen.update(ranked)
+        return results
+
+
+# ================================================================
+# BENCHMARK
+# ================================================================
+def benchmark_search(rows=20000, repeat=50, limit=20):
+    """
+    Compare index lookups with the previous pandas scan
+
+    Builds a rows-long table of two-word compounds from the N5 vocabulary
+    and times both approaches on a mix of Japanese, romaji and English
+    queries (index timings include query normalization), for the full
+    result list and for the first ``limit`` rows.
+    """
+    import random
+    import time
+
+    import pandas as pd
+
+    from utils.transliteration import normalize_query
+    from utils.vocab_store import load_vocabulary, normalize_vocab_frame
+
+    vocab = load_vocabulary()
+    base = vocab.rows(range(len(vocab)))
+    rng = random.Random(0)
+    records = []
+    for _ in range(rows):
+        a, b = rng.choice(base), rng.choice(base)
+        records.append({
+            "Kanji": a.Kanji + b.Kanji,
+            "Hiragana": a.Hiragana + b.Hiragana,
+            "English": f"{a.English} {b.English}"
+        })
+    frame = normalize_vocab_frame(pd.DataFrame(records))
+
+    started = time.perf_counter()
+    index = VocabIndex([frame[field].tolist() for field in VOCAB_FIELDS])
+    build_ms = (time.perf_counter() - started) * 1000
+
+    queries = ["たべる", "water", "eat", "ほん", "学校", "mountain", "き", "to go", "taberu"]
+    print(f"{rows} rows, index built in {build_ms:.1f} ms")
+    print(f"{'query':<10} {'hits':>6} {'pandas ms':>10} {'index ms':>9} {f'top {limit} ms':>10}")
+    for query in queries:
+        started = time.perf_counter()
+        for _ in range(max(1, repeat // 10)):
+            mask = frame.astype(str).apply(
+                lambda x: x.str.contains(query, case=False, na=False)
+            ).any(axis=1)
+        scan_ms = (time.perf_counter() - started) / max(1, repeat // 10) * 1000
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            hits = index.search(*normalize_query(query))
+        index_ms = (time.perf_counter() - started) / repeat * 1000
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            top = index.search(*normalize_query(query), limit=limit)
+        top_ms = (time.perf_counter() - started) / repeat * 1000
+
+        # Folding also matches katakana/width variants the scan misses
+        assert set(frame.index[mask]) <= set(hits)
+        assert top == hits[:limit]
+        print(f"{query:<10} {len(hits):>6} {scan_ms:>10.2f} {index_ms:>9.3f} {top_ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    benchmark_search()
@@ -0,0 +1,292 @@
+"""
+Offline vocabulary ingestion
+Extracts the JLPT VocabList PDFs into one indexed SQLite database
+(plus its memory-mapped binary export, see utils.vocab_mmap)
+
+Usage:
+    python -m utils.vocab_ingest [--force] [--test]
+"""
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from config.settings import VOCAB_CONFIG
+from utils.transliteration import kana_to_romaji
+from utils.vocab_mmap import write_mapped_vocab
+
+# Reading column: kana plus the separators used between alternative readings
+READING_TOKEN = re.compile(r"^[぀-ヿー～〜・、/／()（）=＝]+$")
+JAPANESE_CHAR = re.compile(r"[぀-ヿ㐀-鿿豈-﫿々〆]")
+HEADER_LINES = ("JLPT", "Kanji Hiragana English")
+# Reading glued to the English meaning ("よけいtoo", "よろこび(a) joy")
+GLUED_ENGLISH = re.compile(r"([぀-ヿー])(?=[A-Za-z]|\([A-Za-z])")
+SMALL_KANA = re.compile(r"[ぁぃぅぇぉっゃゅょゎァィゥェォッャュョヮ]")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS levels (
+    level TEXT PRIMARY KEY,
+    rank INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    words INTEGER NOT NULL,
+    ingested_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS vocab (
+    id INTEGER PRIMARY KEY,
+    level TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    kanji TEXT NOT NULL,
+    hiragana TEXT NOT NULL,
+    romaji TEXT NOT NULL,
+    english TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_vocab_level ON vocab(level, position);
+CREATE INDEX IF NOT EXISTS idx_vocab_hiragana ON vocab(hiragana);
+"""
+
+
+def file_sha256(path):
+    """Content hash of a source file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _morae(kana):
+    """Kana count without the small kana that belong to the previous one."""
+    return len(SMALL_KANA.sub("", kana))
+
+
+def _continues(word, line):
+    """
+    Whether line finishes a kana word wrapped onto it ("したがっ" + "て したがって ...")
+
+    Otherwise word was a whole kana-only entry with an empty English column
+    and line is the next entry ("できれば" + "手品 てじな ...").
+    """
+    if not JAPANESE_CHAR.search(line):
+        return True
+    tokens = line.split()
+    if READING_TOKEN.match(tokens[0]) and _morae(tokens[0]) <= 2:
+        return True
+    return len(tokens) > 1 and tokens[1].startswith(word)
+
+
+def parse_vocab_lines(lines):
+    """
+    Parse "Kanji Hiragana English" table lines
+
+    Kanji is optional (kana-only words start with the reading, or repeat it
+    in the Kanji column) and so is English. Words or readings wrapped onto
+    the next line are joined back and lines without any Japanese continue
+    the previous English meaning.
+
+    Returns:
+        tuple: ([(kanji, hiragana, english), ...], [unparsed lines])
+    """
+    rows, skipped = [], []
+    pending = ""   # start of a word or reading wrapped onto the next line
+    kana_word = ""  # lone kana line: a wrapped word or a whole entry without English
+    for line in lines:
+        line = line.strip()
+        if not line or line.isdigit() or line.startswith(HEADER_LINES):
+            continue
+        if kana_word:
+            if _continues(kana_word, line):
+                pending = kana_word
+            else:
+                rows.append(("", kana_word, ""))
+            kana_word = ""
+        if pending:
+            line, pending = pending + line, ""
+
+        if not JAPANESE_CHAR.search(line):
+            if rows:
+                kanji, reading, english = rows[-1]
+                rows[-1] = (kanji, reading, f"{english} {line}".strip())
+            continue
+
+        tokens = GLUED_ENGLISH.sub(r"\1 ", line).split()
+        start = next((i for i, token in enumerate(tokens) if READING_TOKEN.match(token)), None)
+        if start is None:
+            if len(tokens) == 1:
+                # Kanji wrapped onto the next line
+                pending = line
+            else:
+                skipped.append(line)
+            continue
+
+        reading, end = tokens[start], start + 1
+        while end < len(tokens) and READING_TOKEN.match(tokens[end]) and (
+                reading.endswith(("/", "／")) or tokens[end].startswith(("/", "／"))):
+            reading += tokens[end]
+            end += 1
+        if end < len(tokens) and tokens[end] == reading:
+            # Kana-only word repeated in the Kanji column ("いつも いつも always")
+            end += 1
+
+        english = " ".join(tokens[end:])
+        if reading.endswith(("/", "／")) and not english:
+            # Alternative reading wrapped onto the next line
+            pending = " ".join(tokens[:start] + [reading])
+        elif len(tokens) == 1:
+            kana_word = reading
+        else:
+            # English may still follow on its own line ("余計 よけい" + "too")
+            rows.append((" ".join(tokens[:start]), reading, english))
+    if kana_word:
+        rows.append(("", kana_word, ""))
+    return rows, skipped
+
+
+def extract_pdf(level, path):
+    """
+    Extract one VocabList PDF (runs in a worker process)
+
+    Returns:
+        tuple: (level, [(kanji, hiragana, romaji, english), ...], skipped lines)
+    """
+    from pypdf import PdfReader
+
+    lines = []
+    for page in PdfReader(path).pages:
+        lines.extend((page.extract_text() or "").splitlines())
+
+    rows, skipped = parse_vocab_lines(lines)
+    return level, [(k, h, kana_to_romaji(h), e) for k, h, e in rows], skipped
+
+
+def export_mapped(db_path, mmap_path):
+    """Write the binary vocabulary file from the database."""
+    from utils.vocab_store import _read_database, normalize_vocab_frame
+
+    frame = normalize_vocab_frame(_read_database(db_path))
+    write_mapped_vocab(frame, mmap_path)
+    print(f"🗺️ {len(frame)} words exported to {mmap_path} ({os.path.getsize(mmap_path) / 1024:.0f} KB)")
+
+
+def ingest(sources=None, db_path=None, mmap_path=None, force=False):
+    """
+    Ingest changed PDFs into the vocabulary database
+
+    Args:
+        sources (dict): {level: pdf path}, easiest level first (defaults to VOCAB_CONFIG)
+        db_path (str): Output SQLite file (defaults to VOCAB_CONFIG)
+        mmap_path (str): Output binary file (defaults to VOCAB_CONFIG)
+        force (bool): Re-extract even when the content hash is unchanged
+
+    Returns:
+        dict: {level: word count} for the levels that were (re)ingested
+    """
+    sources = sources or VOCAB_CONFIG["pdf_sources"]
+    db_path = db_path or VOCAB_CONFIG["db_path"]
+    mmap_path = mmap_path or VOCAB_CONFIG["mmap_path"]
+
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    known = dict(conn.execute("SELECT level, sha256 FROM levels"))
+
+    hashes = {level: file_sha256(path) for level, path in sources.items()}
+    changed = [level for level in sources if force or known.get(level) != hashes[level]]
+    for level in sources:
+        if level not in changed:
+            print(f"⏭️ {level}: unchanged, skipped")
+
+    ingested = {}
+    if changed:
+        with ProcessPoolExecutor(max_workers=len(changed)) as pool:
+            futures = [pool.submit(extract_pdf, level, sources[level]) for level in changed]
+            results = [future.result() for future in futures]
+
+        ranks = {level: rank for rank, level in enumerate(sources)}
+        with conn:
+            for level, rows, skipped in results:
+                conn.execute("DELETE FROM vocab WHERE level = ?", (level,))
+                conn.executemany(
+                    "INSERT INTO vocab (level, position, kanji, hiragana, romaji, english) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(level, position, *row) for position, row in enumerate(rows)]
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO levels (level, rank, source, sha256, words, ingested_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (level, ranks[level], sources[level], hashes[level], len(rows), time.time())
+                )
+                ingested[level] = len(rows)
+                print(f"✅ {level}: {len(rows)} words" + (f" ({len(skipped)} unparsed lines)" if skipped else ""))
+                for line in skipped:
+                    print(f"   ⚠️ {line}")
+
+        conn.execute("VACUUM")
+    conn.close()
+
+    if changed or not os.path.exists(mmap_path):
+        export_mapped(db_path, mmap_path)
+
+    # Distractor neighbour cache next to it (kept when still up to date)
+    from utils.vocab_neighbors import load_or_build
+    from utils.vocab_store import VocabStore
+
+    load_or_build(VocabStore().get(mmap_path))
+    return ingested
+
+
+# ================================================================
+# TESTING
+# ================================================================
+def test_parse_vocab_lines():
+    """Check the parser on the line shapes found in the VocabList PDFs"""
+    cases = [
+        # Kana-only word repeated in the Kanji column
+        (["いつも いつも always,usually"], [("", "いつも", "always,usually")]),
+        (["だが だが", "でも でも but,however"], [("", "だが", ""), ("", "でも", "but,however")]),
+        # Empty English column, the next line is a new entry
+        (["急に きゅうに", "給料 きゅうりょう salary,wages"],
+         [("急に", "きゅうに", ""), ("給料", "きゅうりょう", "salary,wages")]),
+        (["できれば", "手品 てじな sleight of hand"], [("", "できれば", ""), ("手品", "てじな", "sleight of hand")]),
+        (["それと", "それとも or,or else"], [("", "それと", ""), ("", "それとも", "or,or else")]),
+        (["お出掛け おでかけ", "お手伝いさ", "ん おてつだいさん maid"],
+         [("お出掛け", "おでかけ", ""), ("お手伝いさん", "おてつだいさん", "maid")]),
+        # English wrapped onto its own line
+        (["余計 よけい", "too much,unnecessary"], [("余計", "よけい", "too much,unnecessary")]),
+        (["喜び よろこび(a) joy,(a)", "delight"], [("喜び", "よろこび", "(a) joy,(a) delight")]),
+        # Words and readings wrapped onto the next line
+        (["したがっ", "て したがって therefore"], [("", "したがって", "therefore")]),
+        (["オートメーショ", "ン automation"], [("", "オートメーション", "automation")]),
+        (["ジェット", "機 ジェットき jet aeroplane"], [("ジェット機", "ジェットき", "jet aeroplane")]),
+        (["ラジカセ /", "ラジオカセット radio cassette player"],
+         [("", "ラジカセ/ラジオカセット", "radio cassette player")]),
+    ]
+    failures = 0
+    for lines, expected in cases:
+        rows, _ = parse_vocab_lines(lines)
+        if rows != expected:
+            failures += 1
+            print(f"❌ {lines}\n   got      {rows}\n   expected {expected}")
+    print(f"{'✅' if not failures else '❌'} parse_vocab_lines: {len(cases) - failures}/{len(cases)} line shapes")
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the vocabulary database from the JLPT PDFs")
+    parser.add_argument("--force", action="store_true", help="re-extract every PDF")
+    parser.add_argument("--test", action="store_true", help="only check the line parser")
+    args = parser.parse_args()
+
+    if args.test:
+        raise SystemExit(0 if test_parse_vocab_lines() else 1)
+
+    started = time.perf_counter()
+    ingest(force=args.force)
+    print(f"📚 Vocabulary database ready at {VOCAB_CONFIG['db_path']} ({time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
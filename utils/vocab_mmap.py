@@ -0,0 +1,280 @@
+"""
+Memory-mapped binary vocabulary
+Compact string table + offset arrays, mapped read-only and shared through the page cache
+
+Layout (all sections 4-byte aligned):
+    b"NVOCAB1\\0" | uint32 header length | JSON header
+    offsets        uint32[fields][rows + 1]  byte offsets into the string table
+    category rows  uint32[]                  row ids grouped by category
+    strings        UTF-8 string table
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+
+MAGIC = b"NVOCAB1\0"
+FIELDS = ("Kanji", "Hiragana", "Romaji", "English", "Category")
+
+VocabRow = namedtuple("VocabRow", ["Kanji", "Hiragana", "Romaji", "English", "Level", "Category"])
+
+
+def _align(n):
+    return (n + 3) & ~3
+
+
+def write_mapped_vocab(frame, path):
+    """
+    Write a normalized vocabulary frame (see utils.vocab_store) to path
+
+    Rows are grouped by level (in first-appearance order) so each level is
+    one contiguous row range. The file is written next to path and renamed
+    over it, so processes that still map the old file keep a valid view.
+    """
+    levels = list(dict.fromkeys(frame["Level"])) if "Level" in frame.columns else [""]
+    if "Level" in frame.columns:
+        order = sorted(range(len(frame)), key=lambda i, rank={lv: r for r, lv in enumerate(levels)}: rank[frame["Level"].iat[i]])
+        frame = frame.iloc[order].reset_index(drop=True)
+
+    level_ranges, start = {}, 0
+    for level in levels:
+        count = int((frame["Level"] == level).sum()) if "Level" in frame.columns else len(frame)
+        level_ranges[level] = [start, count]
+        start += count
+
+    strings = bytearray()
+    offsets = array("I")
+    for field in FIELDS:
+        values = frame[field].tolist() if field in frame.columns else [""] * len(frame)
+        offsets.append(len(strings))
+        for value in values:
+            strings += value.encode("utf-8")
+            offsets.append(len(strings))
+
+    categories, category_rows = {}, array("I")
+    if "Category" in frame.columns:
+        groups = {}
+        for row_id, category in enumerate(frame["Category"].tolist()):
+            if category:
+                groups.setdefault(category, []).append(row_id)
+        for category in sorted(groups):
+            categories[category] = [len(category_rows), len(groups[category])]
+            category_rows.extend(groups[category])
+
+    header = {
+        "rows": len(frame),
+        "fields": list(FIELDS),
+        "byteorder": sys.byteorder,
+        "levels": level_ranges,
+        "categories": categories,
+    }
+    # Section offsets depend on the header size, so size it with placeholders first
+    for _ in range(2):
+        header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        base = _align(len(MAGIC) + 4 + len(header_bytes))
+        header["offsets_at"] = base
+        header["category_rows_at"] = base + offsets.itemsize * len(offsets)
+        header["strings_at"] = _align(header["category_rows_at"] + category_rows.itemsize * len(category_rows))
+        header["strings_size"] = len(strings)
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes)
+        f.write(b"\0" * (header["offsets_at"] - f.tell()))
+        f.write(offsets.tobytes())
+        f.write(category_rows.tobytes())
+        f.write(b"\0" * (header["strings_at"] - f.tell()))
+        f.write(strings)
+    os.replace(tmp_path, path)
+
+
+class MappedVocabulary:
+    """
+    Read-only, lazily decoded view of a binary vocabulary file.
+
+    Opening maps the file and reads only the small header; offsets are
+    used in place and strings are decoded on access, so a page of rows
+    costs a handful of slices and no DataFrame is built unless
+    to_frame() is called.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a binary vocabulary file")
+
+        (header_len,) = struct.unpack_from("<I", self._mm, len(MAGIC))
+        start = len(MAGIC) + 4
+        header = json.loads(self._mm[start:start + header_len].decode("utf-8"))
+        self._rows = header["rows"]
+        self._fields = {name: i for i, name in enumerate(header["fields"])}
+        self._levels = header["levels"]
+        self._level_starts = [start for start, _ in self._levels.values()]
+        self._level_names = list(self._levels)
+        self._categories = header["categories"]
+
+        view = memoryview(self._mm)
+        offsets = view[header["offsets_at"]:header["category_rows_at"]]
+        category_rows = view[header["category_rows_at"]:header["category_rows_at"] + 4 * sum(
+            count for _, count in self._categories.values())]
+        if header["byteorder"] == sys.byteorder:
+            self._offsets = offsets.cast("I")
+            self._category_rows = category_rows.cast("I")
+        else:
+            self._offsets = array("I", offsets.tobytes())
+            self._offsets.byteswap()
+            self._category_rows = array("I", category_rows.tobytes())
+            self._category_rows.byteswap()
+        self._strings = view[header["strings_at"]:header["strings_at"] + header["strings_size"]]
+
+    def __len__(self):
+        return self._rows
+
+    @property
+    def levels(self):
+        """Levels in file order (easiest first)."""
+        return list(self._level_names)
+
+    @property
+    def categories(self):
+        return list(self._categories)
+
+    def level_ids(self, level):
+        """Row ids of a level (a contiguous range)."""
+        start, count = self._levels.get(level, (0, 0))
+        return range(start, start + count)
+
+    def category_ids(self, category):
+        """Row ids of a category."""
+        start, count = self._categories.get(category, (0, 0))
+        return self._category_rows[start:start + count].tolist()
+
+    def level_of(self, row_id):
+        return self._level_names[bisect_right(self._level_starts, row_id) - 1] if self._level_names else ""
+
+    def value(self, row_id, field):
+        """One decoded field of one row."""
+        base = self._fields[field] * (self._rows + 1) + row_id
+        return bytes(self._strings[self._offsets[base]:self._offsets[base + 1]]).decode("utf-8")
+
+    def row(self, row_id):
+        """
+        Decode one row
+
+        Returns:
+            VocabRow
+        """
+        if not 0 <= row_id < self._rows:
+            raise IndexError(row_id)
+        return VocabRow(
+            self.value(row_id, "Kanji"), self.value(row_id, "Hiragana"), self.value(row_id, "Romaji"),
+            self.value(row_id, "English"), self.level_of(row_id), self.value(row_id, "Category")
+        )
+
+    def rows(self, row_ids):
+        """Lazily decode the given rows."""
+        return (self.row(row_id) for row_id in row_ids)
+
+    def column(self, name):
+        """Every value of a field (or "Level") as a list of str."""
+        if name == "Level":
+            return [level for level, (_, count) in self._levels.items() for _ in range(count)]
+        base = self._fields[name] * (self._rows + 1)
+        offsets = self._offsets[base:base + self._rows + 1].tolist()
+        blob = bytes(self._strings[offsets[0]:offsets[-1]])
+        first = offsets[0]
+        return [blob[a - first:b - first].decode("utf-8") for a, b in zip(offsets, offsets[1:])]
+
+    def to_frame(self):
+        """Materialize a normalized DataFrame (e.g. for the Table view)."""
+        import pandas as pd
+
+        columns = {name: self.column(name) for name in ("Kanji", "Hiragana", "Romaji", "English", "Level")}
+        if self._categories:
+            columns["Category"] = self.column("Category")
+        return pd.DataFrame(columns, dtype=str)
+
+    def close(self):
+        for view in (self._offsets, self._category_rows, self._strings):
+            if isinstance(view, memoryview):
+                view.release()
+        self._mm.close()
+
+
+# ================================================================
+# BENCHMARK
+# ================================================================
+_COLD_START_SCRIPTS = {
+    "pandas (SQLite)": (
+        "import pandas as pd, sqlite3\n"
+        "from config.settings import VOCAB_CONFIG\n"
+        "conn = sqlite3.connect(VOCAB_CONFIG['db_path'])\n"
+        "frame = pd.read_sql_query('SELECT * FROM vocab ORDER BY id', conn, dtype=str)\n"
+        "rows = frame.iloc[:20].to_dict('records')\n"
+    ),
+    "pandas (CSV)": (
+        "import pandas as pd\n"
+        "from config.settings import VOCAB_CONFIG\n"
+        "frame = pd.read_csv(VOCAB_CONFIG['csv_path'], dtype=str, encoding='utf-8-sig')\n"
+        "rows = frame.iloc[:20].to_dict('records')\n"
+    ),
+    "mmap": (
+        "from config.settings import VOCAB_CONFIG\n"
+        "from utils.vocab_mmap import MappedVocabulary\n"
+        "vocab = MappedVocabulary(VOCAB_CONFIG['mmap_path'])\n"
+        "rows = list(vocab.rows(range(20)))\n"
+    ),
+    "load_vocabulary()": (
+        "from utils.vocab_store import load_vocabulary\n"
+        "vocab = load_vocabulary()\n"
+        "rows = vocab.rows(range(20))\n"
+    ),
+    "+ first search": (
+        "from utils.vocab_store import load_vocabulary\n"
+        "vocab = load_vocabulary()\n"
+        "rows = vocab.rows(vocab.search('taberu')[:20])\n"
+    ),
+}
+
+
+def benchmark_cold_start(runs=5):
+    """
+    Time to first page of rows and peak RSS in fresh interpreter processes
+
+    Compares the pandas paths (SQLite / CSV) with opening the mapped file,
+    on its own and through load_vocabulary() as the app does (the search
+    index is only built by the first search).
+    """
+    import subprocess
+    import time
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    probe = (
+        "import time, resource\nstarted = time.perf_counter()\n{script}"
+        "print((time.perf_counter() - started) * 1000, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n"
+    )
+    for name, script in _COLD_START_SCRIPTS.items():
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            out = subprocess.run(
+                [sys.executable, "-c", probe.format(script=script)],
+                cwd=root, capture_output=True, text=True, check=True,
+                env={**os.environ, "PYTHONPATH": root}
+            ).stdout.splitlines()[-1].split()
+            samples.append((float(out[0]), int(out[1]) / 1024, (time.perf_counter() - started) * 1000))
+        load_ms = min(s[0] for s in samples)
+        rss_mb = min(s[1] for s in samples)
+        process_ms = min(s[2] for s in samples)
+        print(f"{name:<16} load {load_ms:7.1f} ms | process {process_ms:7.1f} ms | peak RSS {rss_mb:6.1f} MB")
+
+
+if __name__ == "__main__":
+    benchmark_cold_start()
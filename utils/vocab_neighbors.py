@@ -0,0 +1,236 @@
+"""
+Distractor neighbour index
+Top-k look-alike words per row (kana edit distance, shared kanji, same group), built with NumPy
+"""
+import hashlib
+import os
+
+import numpy as np
+
+from config.settings import DISTRACTOR_CONFIG
+
+KANJI = ("㐀", "鿿")
+
+
+def _kana_codes(readings, max_length):
+    """(rows, max_length) int32 code points, -1 padded, and the clipped lengths."""
+    codes = np.full((len(readings), max_length), -1, dtype=np.int32)
+    lengths = np.zeros(len(readings), dtype=np.int16)
+    for row, reading in enumerate(readings):
+        reading = reading[:max_length]
+        codes[row, :len(reading)] = [ord(char) for char in reading]
+        lengths[row] = len(reading)
+    return codes, lengths
+
+
+def kana_distances(codes, lengths, block_size=256, cap=3):
+    """
+    Pairwise Levenshtein distances (clipped to cap) between kana code rows
+
+    The DP runs over character positions while every (query, candidate)
+    pair of a block is updated at once, so the Python loop is
+    O(max_length^2) per block regardless of the number of pairs.
+
+    Returns:
+        ndarray: (rows, rows) int8
+    """
+    rows, max_length = codes.shape
+    out = np.empty((rows, rows), dtype=np.int8)
+    cand = codes.T[:, None, :]  # (max_length, 1, rows)
+    steps = np.arange(max_length + 1, dtype=np.int16)
+
+    for start in range(0, rows, block_size):
+        query = codes[start:start + block_size]
+        block = len(query)
+        # previous[j] = distance between query[:i] and candidate[:j]
+        previous = np.broadcast_to(steps[:, None, None], (max_length + 1, block, rows)).copy()
+        result = np.broadcast_to(lengths[None, :], (block, rows)).astype(np.int16)  # i = 0 rows
+        query_lengths = lengths[start:start + block_size]
+        for i in range(1, max_length + 1):
+            current = np.empty_like(previous)
+            current[0] = i
+            mismatch = query[:, i - 1][None, :, None] != cand  # (max_length, block, rows)
+            for j in range(1, max_length + 1):
+                np.minimum(previous[j - 1] + mismatch[j - 1], previous[j] + 1, out=current[j])
+                np.minimum(current[j], current[j - 1] + 1, out=current[j])
+            done = query_lengths == i
+            if done.any():
+                result[done] = np.take_along_axis(
+                    current[:, done, :], lengths[None, None, :].astype(np.intp), axis=0
+                )[0]
+            previous = current
+        out[start:start + block] = np.minimum(result, cap)
+    return out
+
+
+def _shared_kanji(written):
+    """(rows, rows) count of distinct kanji two written forms share."""
+    vocabulary = {}
+    pairs = []
+    for row, word in enumerate(written):
+        for char in set(word):
+            if KANJI[0] <= char <= KANJI[1]:
+                pairs.append((row, vocabulary.setdefault(char, len(vocabulary))))
+    matrix = np.zeros((len(written), max(len(vocabulary), 1)), dtype=np.float32)
+    if pairs:
+        rows, cols = zip(*pairs)
+        matrix[list(rows), list(cols)] = 1
+    return matrix @ matrix.T
+
+
+def neighbor_scores(readings, written, groups, weights, max_length, block_size):
+    """
+    Distractor plausibility of every pair of one level
+
+    Returns:
+        ndarray: (rows, rows) float32, -inf where a word can't be a
+                 distractor (itself, same reading or same written form)
+    """
+    codes, lengths = _kana_codes(readings, max_length)
+    distance = kana_distances(codes, lengths, block_size=block_size).astype(np.float32)
+    cap = distance.max() if distance.size else 1
+
+    scores = weights["kana"] * (cap - distance) / max(cap, 1)
+    scores += weights["kanji"] * np.minimum(_shared_kanji(written), 2) / 2
+    group_codes = np.unique(np.asarray(groups), return_inverse=True)[1]
+    scores += weights["group"] * (group_codes[:, None] == group_codes[None, :])
+    scores += weights["length"] * (lengths[:, None] == lengths[None, :])
+
+    reading_codes = np.unique(np.asarray(readings), return_inverse=True)[1]
+    written_codes = np.unique(np.asarray(written), return_inverse=True)[1]
+    blocked = (reading_codes[:, None] == reading_codes[None, :]) | (written_codes[:, None] == written_codes[None, :])
+    scores[blocked] = -np.inf
+    return scores
+
+
+class NeighborIndex:
+    """
+    Precomputed top-k distractor candidates for every row.
+
+    Neighbours are taken from the row's own JLPT level and ranked by a
+    weighted sum of kana similarity (edit distance), shared kanji, same
+    category (or part of speech) and same kana length. Lookups are one
+    array row: ``top(row_id)``.
+    """
+
+    def __init__(self, ids, scores, fingerprint=""):
+        self.ids = ids
+        self.scores = scores
+        self.fingerprint = fingerprint
+
+    def __len__(self):
+        return len(self.ids)
+
+    def top(self, row_id, k=None):
+        """Neighbour row ids of row_id, most plausible first (unused slots are dropped)."""
+        ids = self.ids[row_id, :k]
+        return ids[ids >= 0].tolist()
+
+    @classmethod
+    def build(cls, vocab, k=None):
+        """
+        Build from a Vocabulary (utils.vocab_store), one level at a time
+
+        Returns:
+            NeighborIndex
+        """
+        k = k or DISTRACTOR_CONFIG["k"]
+        readings, kanji = vocab.column("Hiragana"), vocab.column("Kanji")
+        written = [w or r for w, r in zip(kanji, readings)]
+        groups = vocab.column("Category" if vocab.has_category else "Part of Speech")
+
+        ids = np.full((len(vocab), k), -1, dtype=np.int32)
+        scores = np.full((len(vocab), k), -np.inf, dtype=np.float32)
+        for level in vocab.levels:
+            members = np.asarray(vocab.select(range(len(vocab)), {"Level": level}), dtype=np.int32)
+            level_scores = neighbor_scores(
+                [readings[i] for i in members], [written[i] for i in members], [groups[i] for i in members],
+                DISTRACTOR_CONFIG["weights"], DISTRACTOR_CONFIG["max_kana_length"], DISTRACTOR_CONFIG["block_size"]
+            )
+            width = min(k, len(members))
+            top = np.argpartition(-level_scores, width - 1, axis=1)[:, :width]
+            top_scores = np.take_along_axis(level_scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind="stable")
+            top, top_scores = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+            valid = np.isfinite(top_scores)
+            ids[members, :width] = np.where(valid, members[top], -1)
+            scores[members, :width] = top_scores
+        return cls(ids, scores, fingerprint(vocab, k))
+
+    def save(self, path):
+        np.savez_compressed(path, ids=self.ids, scores=self.scores, fingerprint=np.array(self.fingerprint))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["ids"], data["scores"], str(data["fingerprint"]))
+
+
+def fingerprint(vocab, k):
+    """Content hash of everything the index depends on (valid across checkouts)."""
+    digest = hashlib.sha256(repr((k, sorted(DISTRACTOR_CONFIG.items()))).encode("utf-8"))
+    for name in ("Level", "Hiragana", "Kanji", "Category" if vocab.has_category else "Part of Speech"):
+        digest.update("\x1f".join(vocab.column(name)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def neighbor_cache_path(source):
+    """Cache file stored next to a vocabulary source."""
+    return os.path.splitext(source)[0] + ".neighbors.npz"
+
+
+def load_or_build(vocab):
+    """
+    The neighbour index of a Vocabulary, from its cache file when still valid
+
+    Returns:
+        NeighborIndex
+    """
+    path = neighbor_cache_path(vocab.source)
+    expected = fingerprint(vocab, DISTRACTOR_CONFIG["k"])
+    if os.path.exists(path):
+        try:
+            index = NeighborIndex.load(path)
+            if index.fingerprint == expected and len(index) == len(vocab):
+                return index
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Ignoring unreadable neighbour cache {path}: {e}")
+
+    index = NeighborIndex.build(vocab)
+    try:
+        index.save(path)
+        print(f"🧭 Distractor neighbours cached at {path}")
+    except OSError as e:
+        print(f"⚠️ Could not cache distractor neighbours: {e}")
+    return index
+
+
+# ================================================================
+# BENCHMARK
+# ================================================================
+def benchmark_neighbors():
+    """Build time for the shared N5-N2 vocabulary and a few sample neighbourhoods."""
+    import time
+
+    from utils.vocab_store import load_vocabulary
+
+    vocab = load_vocabulary()
+    started = time.perf_counter()
+    index = NeighborIndex.build(vocab)
+    print(f"{len(vocab)} words, neighbour index built in {time.perf_counter() - started:.2f} s")
+
+    started = time.perf_counter()
+    for row_id in range(len(vocab)):
+        index.top(row_id, 3)
+    print(f"lookup: {(time.perf_counter() - started) / len(vocab) * 1e6:.2f} µs")
+
+    column = vocab.column("Hiragana")
+    kanji = vocab.column("Kanji")
+    for word in ("来月", "学校", "食べる", "先生"):
+        row_id = kanji.index(word)
+        print(f"{word} ({column[row_id]}): " + ", ".join(
+            f"{kanji[i] or column[i]} ({column[i]})" for i in index.top(row_id, 6)))
+
+
+if __name__ == "__main__":
+    benchmark_neighbors()
@@ -0,0 +1,190 @@
+"""
+Batched HTML rendering for the vocabulary library
+Whole pages and groups are rendered to one HTML payload and cached by filter/page
+"""
+import html
+import threading
+from collections import OrderedDict
+
+from config.settings import LIBRARY_CONFIG
+
+CARD_HTML = (
+    "<div class='quiz-card' style='margin: 0;'>"
+    "<h3 style='color: #FF6B6B; margin: 0;'>{japanese}</h3>"
+    "<p style='color: #666; margin: 0.2rem 0;'><em>{reading}</em></p>"
+    "<p style='margin: 0.5rem 0;'><strong>{english}</strong></p>{badge}</div>"
+)
+BADGE_HTML = (
+    "<span style='background-color: #4ECDC4; color: white; padding: 0.2rem 0.5rem; "
+    "border-radius: 4px; font-size: 0.8rem;'>{}</span>"
+)
+WORD_HTML = (
+    "<div><strong>{japanese}</strong>{reading}"
+    "<div style='color: #808495; font-size: 0.85rem;'>{english}</div></div>"
+)
+GRID_HTML = "<div style='display: grid; grid-template-columns: repeat({columns}, minmax(0, 1fr)); gap: {gap};'>{items}</div>"
+
+
+def render_cards_html(rows, columns=2):
+    """
+    One HTML grid of vocabulary cards
+
+    Args:
+        rows (iterable): VocabRow tuples (see Vocabulary.rows)
+        columns (int): Cards per grid row
+
+    Returns:
+        str: Single-line HTML (safe for st.markdown)
+    """
+    items = []
+    for row in rows:
+        kanji, hiragana, romaji, english, _, category = map(html.escape, row)
+        kana = hiragana if kanji else ""
+        items.append(CARD_HTML.format(
+            japanese=kanji or hiragana,
+            reading=" · ".join(part for part in (kana, romaji) if part),
+            english=english,
+            badge=BADGE_HTML.format(category) if category else ""
+        ))
+    return GRID_HTML.format(columns=columns, gap="1rem", items="".join(items))
+
+
+def render_word_grid_html(rows, columns=3):
+    """
+    One compact HTML grid of words (Category view)
+
+    Returns:
+        str: Single-line HTML (safe for st.markdown)
+    """
+    items = []
+    for row in rows:
+        kanji, hiragana, romaji, english = map(html.escape, row[:4])
+        reading = hiragana if kanji else romaji
+        items.append(WORD_HTML.format(
+            japanese=kanji or hiragana,
+            reading=f" ({reading})" if reading else "",
+            english=english
+        ))
+    return GRID_HTML.format(columns=columns, gap="0.75rem", items="".join(items))
+
+
+class FragmentCache:
+    """LRU cache of rendered HTML fragments keyed by (source, filters, view, page)."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._fragments = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key, render):
+        """
+        Cached fragment for key, rendering it with render() on a miss
+
+        Args:
+            key (tuple): Hashable description of the rendered content
+            render (callable): Zero-argument function returning the HTML
+        """
+        with self._lock:
+            fragment = self._fragments.get(key)
+            if fragment is not None:
+                self._fragments.move_to_end(key)
+                self.hits += 1
+                return fragment
+            self.misses += 1
+
+        fragment = render()
+        with self._lock:
+            self._fragments[key] = fragment
+            while len(self._fragments) > self.max_entries:
+                self._fragments.popitem(last=False)
+        return fragment
+
+
+_fragment_cache = None
+_fragment_cache_lock = threading.Lock()
+
+
+def get_fragment_cache():
+    """
+    Get the process-wide fragment cache (shared by every session)
+
+    Returns:
+        FragmentCache
+    """
+    global _fragment_cache
+    with _fragment_cache_lock:
+        if _fragment_cache is None:
+            _fragment_cache = FragmentCache(LIBRARY_CONFIG["fragment_cache_size"])
+        return _fragment_cache
+
+
+# ================================================================
+# BENCHMARK
+# ================================================================
+def _legacy_category_view(levels):
+    """Previous rendering: one st.markdown + st.caption per word."""
+    import streamlit as st
+    from utils.vocab_store import load_vocabulary
+
+    data = load_vocabulary(levels=levels).frame
+    for group in dict.fromkeys(data["Level"]):
+        group_data = data[data["Level"] == group]
+        with st.expander(f"📌 {group} ({len(group_data)} words)"):
+            cols = st.columns(3)
+            for idx, row in enumerate(group_data.iterrows()):
+                row_data = row[1]
+                japanese = row_data["Kanji"] or row_data["Hiragana"]
+                reading = row_data["Hiragana"] if row_data["Kanji"] else row_data["Romaji"]
+                with cols[idx % 3]:
+                    st.markdown(f"**{japanese}** {f'({reading})' if reading else ''}")
+                    st.caption(row_data["English"])
+
+
+def _batched_category_view(levels):
+    """Current rendering: the library's Category view (one cached grid per expander)."""
+    from pages_modules.library import render_category_view
+    from utils.vocab_store import load_vocabulary
+
+    vocab = load_vocabulary(levels=levels)
+    render_category_view(vocab, range(len(vocab)), "Level", (vocab.source, vocab.mtime, str(levels)))
+
+
+def benchmark_render(runs=3):
+    """
+    Time a full Category-view rerun, per-word elements vs batched payloads
+
+    Uses Streamlit's AppTest, so script execution and delta serialization
+    are included; the batched path is shown cold (first render) and warm
+    (fragment cache hit, as on every later rerun).
+    """
+    import os
+    import time
+    from streamlit.testing.v1 import AppTest
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(root)
+
+    def timed(view, levels, runs):
+        at = AppTest.from_string(
+            f"import sys\nsys.path.insert(0, {root!r})\n"
+            f"from utils.vocab_render import {view}\n{view}({levels!r})\n",
+            default_timeout=600
+        )
+        times = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            at.run()
+            times.append((time.perf_counter() - started) * 1000)
+            assert not at.exception, at.exception
+        return times
+
+    for name, levels in (("N5", ["N5"]), ("N5-N2", None)):
+        legacy = timed("_legacy_category_view", levels, 1)[0]
+        batched = timed("_batched_category_view", levels, runs)
+        print(f"{name:<6} per-word: {legacy:8.0f} ms | batched cold: {batched[0]:6.0f} ms, warm: {min(batched[1:]):6.0f} ms")
+
+
+if __name__ == "__main__":
+    benchmark_render()
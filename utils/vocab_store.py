@@ -0,0 +1,358 @@
+"""
+Process-wide vocabulary store
+Loads each vocabulary source once, shares it read-only and reloads on mtime change
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from config.settings import VOCAB_CONFIG
+from utils.transliteration import kana_to_romaji, normalize_query
+from utils.vocab_fuzzy import FuzzyIndex
+from utils.vocab_groups import GroupIndex, filter_row_ids, part_of_speech
+from utils.vocab_index import VOCAB_FIELDS, VocabIndex
+from utils.vocab_mmap import MappedVocabulary, VocabRow
+
+# Columns with a GroupIndex, built on first use (Part of Speech is derived, see vocab_groups)
+GROUP_COLUMNS = ("Level", "Category", "Part of Speech")
+
+# Normalized column name -> source column names accepted for it
+COLUMN_ALIASES = {
+    "Kanji": ("Kanji", "kanji", "Japanese", "japanese", "Word"),
+    "Hiragana": ("Hiragana", "hiragana", "Reading", "Kana", "kana"),
+    "Romaji": ("Romaji", "romaji"),
+    "English": ("English", "english", "Meaning", "meaning"),
+    "Level": ("Level", "level", "JLPT"),
+    "Category": ("Category", "category", "Type"),
+}
+OPTIONAL_COLUMNS = ("Level", "Category")
+
+
+class Vocabulary:
+    """
+    Immutable snapshot of one vocabulary source.
+
+    Backed either by a memory-mapped binary file (utils.vocab_mmap) or by a
+    normalized DataFrame; callers work on row ids and decode only the rows
+    they show. ``frame`` (string columns Kanji, Hiragana, Romaji, English,
+    Level and, when the source has one, Category) is built on first access
+    for mapped sources. It is shared by every session: filter it, never
+    modify it in place.
+    Loading only opens the source; everything derived from the rows is
+    built on first use: ``index`` (the n-gram search index over the text
+    columns) on the first search(), the fuzzy (typo-tolerant) index on the
+    first fuzzy_search(), the GroupIndex of each of GROUP_COLUMNS on the
+    first filter or grouping by it, and ``neighbors`` (distractor
+    candidates per row) from its cache file, or built, on first access.
+    """
+
+    def __init__(self, source, mtime, frame=None, mapped=None):
+        self.source = source
+        self.mtime = mtime
+        self._frame = frame
+        self._mapped = mapped
+        self._columns = {}
+        self._index = None
+        self._groups = {}
+        self._fuzzy = None
+        self._neighbors = None
+        self._lock = threading.Lock()
+        self._has_category = bool(mapped.categories) if mapped is not None else "Category" in frame.columns
+
+    def __len__(self):
+        return len(self._mapped) if self._mapped is not None else len(self._frame)
+
+    @property
+    def frame(self):
+        """Normalized DataFrame of every row (materialized lazily for mapped sources)."""
+        with self._lock:
+            if self._frame is None:
+                self._frame = self._mapped.to_frame()
+            return self._frame
+
+    def column(self, name):
+        """All values of a column as a list of str (cached; do not modify)."""
+        values = self._columns.get(name)
+        if values is None:
+            if name == "Part of Speech":
+                values = [
+                    part_of_speech(kanji, hiragana, english) for kanji, hiragana, english in zip(
+                        self.column("Kanji"), self.column("Hiragana"), self.column("English"))
+                ]
+            elif self._mapped is not None:
+                values = self._mapped.column(name)
+            elif name in self._frame.columns:
+                values = self._frame[name].tolist()
+            else:
+                values = [""] * len(self._frame)
+            self._columns[name] = values
+        return values
+
+    def rows(self, row_ids):
+        """
+        Decode the given rows
+
+        Returns:
+            list: VocabRow tuples (Kanji, Hiragana, Romaji, English, Level, Category)
+        """
+        if self._mapped is not None:
+            return list(self._mapped.rows(row_ids))
+        columns = [self.column(name) for name in VocabRow._fields]
+        return [VocabRow(*(values[row_id] for values in columns)) for row_id in row_ids]
+
+    @property
+    def index(self):
+        """VocabIndex over the text columns (built on first access)."""
+        with self._lock:
+            if self._index is None:
+                self._index = VocabIndex(
+                    [self.column(field) for field in VOCAB_FIELDS], n=VOCAB_CONFIG["ngram_size"]
+                )
+            return self._index
+
+    def search(self, query, limit=None):
+        """Row ids matching query in any script (kanji, kana, romaji, English), best first (at most limit)."""
+        return self.index.search(*normalize_query(query), limit=limit)
+
+    def fuzzy_search(self, query):
+        """Row ids of the closest spellings of query (for searches with no exact hit), closest first."""
+        with self._lock:
+            if self._fuzzy is None:
+                self._fuzzy = FuzzyIndex(
+                    {field: self.column(field) for field in VOCAB_FIELDS},
+                    max_distance=VOCAB_CONFIG["fuzzy_max_distance"]
+                )
+        return self._fuzzy.search(*normalize_query(query), top_k=VOCAB_CONFIG["fuzzy_top_k"])
+
+    @property
+    def neighbors(self):
+        """NeighborIndex of plausible distractors (see utils.vocab_neighbors)."""
+        from utils.vocab_neighbors import load_or_build
+
+        with self._lock:
+            if self._neighbors is None:
+                self._neighbors = load_or_build(self)
+            return self._neighbors
+
+    def group_index(self, column):
+        """GroupIndex of one of GROUP_COLUMNS (built on first use), None if the source lacks it."""
+        if column not in GROUP_COLUMNS or (column == "Category" and not self._has_category):
+            return None
+        index = self._groups.get(column)
+        if index is None:
+            index = self._groups[column] = GroupIndex(self.column(column))
+        return index
+
+    def group_values(self, column):
+        """Distinct values of a grouped column (categories sorted, others in source order)."""
+        index = self.group_index(column)
+        values = index.values if index is not None else []
+        return sorted(values) if column == "Category" else values
+
+    def select(self, row_ids, selections):
+        """
+        Restrict row ids to the selected groups
+
+        Args:
+            row_ids (sequence): Candidate rows, e.g. range(len(vocab)) or search results
+            selections (dict): {group column: value}; "All" (or a missing value) is ignored
+
+        Returns:
+            sequence: row_ids in their original order that are in every selected group
+        """
+        chosen = [(self.group_index(column), value) for column, value in selections.items()
+                  if value != "All" and self.group_index(column) is not None]
+        return filter_row_ids(row_ids, chosen)
+
+    def group(self, row_ids, column):
+        """
+        Split row ids by a grouped column
+
+        Returns:
+            dict: {value: [row ids]} in group_values() order, empty groups omitted
+        """
+        index = self.group_index(column)
+        if isinstance(row_ids, range) and row_ids == range(len(self)):
+            groups = {value: index.ids(value) for value in self.group_values(column)}
+        else:
+            values = self.column(column)
+            buckets = {}
+            for row_id in row_ids:
+                buckets.setdefault(values[row_id], []).append(row_id)
+            groups = {value: buckets[value] for value in self.group_values(column) if value in buckets}
+        return groups
+
+    @property
+    def has_category(self):
+        return self._has_category
+
+    @property
+    def categories(self):
+        """Distinct categories, sorted ([] when the source has none)."""
+        return self.group_values("Category")
+
+    @property
+    def levels(self):
+        """JLPT levels present, in source order (easiest first)."""
+        return self.group_values("Level")
+
+
+def normalize_vocab_frame(raw, level=""):
+    """
+    Map a raw vocabulary table onto the normalized columns
+
+    Args:
+        raw (DataFrame): Table with any of the COLUMN_ALIASES headers
+        level (str): JLPT level for sources without a Level column
+
+    Returns:
+        DataFrame: Kanji, Hiragana, Romaji, English, Level (and Category) as
+                   clean strings; a missing Romaji is derived from Hiragana
+    """
+    import pandas as pd
+
+    columns = {}
+    for name, aliases in COLUMN_ALIASES.items():
+        source = next((alias for alias in aliases if alias in raw.columns), None)
+        if source is not None:
+            columns[name] = raw[source].fillna("").astype(str).str.strip()
+        elif name == "Romaji":
+            columns[name] = [kana_to_romaji(reading) for reading in columns["Hiragana"]]
+        elif name == "Level":
+            columns[name] = pd.Series(level, index=raw.index)
+        elif name not in OPTIONAL_COLUMNS:
+            columns[name] = pd.Series("", index=raw.index)
+
+    frame = pd.DataFrame(columns)
+    frame = frame[(frame["Kanji"] != "") | (frame["Hiragana"] != "")]
+    return frame.reset_index(drop=True)
+
+
+def _read_database(path, levels=None):
+    """Rows of the ingested vocabulary database, easiest level first."""
+    import pandas as pd
+
+    query = """
+        SELECT v.kanji AS Kanji, v.hiragana AS Hiragana, v.romaji AS Romaji,
+               v.english AS English, v.level AS Level
+        FROM vocab v JOIN levels l ON l.level = v.level
+    """
+    params = ()
+    if levels:
+        query += f" WHERE v.level IN ({', '.join('?' * len(levels))})"
+        params = tuple(levels)
+    query += " ORDER BY l.rank, v.position"
+
+    with sqlite3.connect(f"file:{path}?mode=ro", uri=True) as conn:
+        return pd.read_sql_query(query, conn, params=params, dtype=str)
+
+
+class VocabStore:
+    """
+    Shared, lazily loaded vocabulary sources.
+
+    Each source is read from disk once; afterwards its mtime is checked at
+    most every ``check_interval`` seconds, so repeated reads (every
+    Streamlit rerun) are served from memory.
+    """
+
+    def __init__(self, check_interval=2.0):
+        self.check_interval = check_interval
+        self.loads = 0
+        self._entries = {}
+        self._checked = {}
+        self._lock = threading.Lock()
+
+    def get(self, path=None, levels=None):
+        """
+        Get the vocabulary for path
+
+        Args:
+            path (str): CSV file, ingested SQLite database or binary export;
+                        defaults to the VOCAB_CONFIG binary file, then the
+                        database, then the CSV (whichever exists first)
+            levels (list): Only these JLPT levels (e.g. ["N5", "N4"])
+
+        Returns:
+            Vocabulary
+
+        Raises:
+            FileNotFoundError: when the source does not exist
+        """
+        now = time.monotonic()
+        key = (path, tuple(levels) if levels else None)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - self._checked[key] < self.check_interval:
+                return entry
+
+            source = path or self._default_path()
+            mtime = os.stat(source).st_mtime
+            self._checked[key] = now
+            if entry is None or entry.source != source or entry.mtime != mtime:
+                entry = self._entries[key] = self._load(source, mtime, key[1])
+            return entry
+
+    @staticmethod
+    def _default_path():
+        for key in ("mmap_path", "db_path"):
+            if os.path.exists(VOCAB_CONFIG[key]):
+                return VOCAB_CONFIG[key]
+        return VOCAB_CONFIG["csv_path"]
+
+    def _load(self, path, mtime, levels):
+        if path.endswith(".bin"):
+            mapped = MappedVocabulary(path)
+            self.loads += 1
+            if not levels or set(levels) >= set(mapped.levels):
+                print(f"📚 Mapped {len(mapped)} vocabulary words from {path}")
+                return Vocabulary(path, mtime, mapped=mapped)
+            frame = mapped.to_frame()
+            frame = frame[frame["Level"].isin(levels)].reset_index(drop=True)
+            print(f"📚 Loaded {len(frame)} vocabulary words from {path}")
+            return Vocabulary(path, mtime, frame=frame)
+
+        import pandas as pd
+
+        if path.endswith(".csv"):
+            frame = normalize_vocab_frame(
+                pd.read_csv(path, dtype=str, encoding="utf-8-sig"), level=VOCAB_CONFIG["csv_level"]
+            )
+            if levels:
+                frame = frame[frame["Level"].isin(levels)].reset_index(drop=True)
+        else:
+            frame = normalize_vocab_frame(_read_database(path, levels))
+        self.loads += 1
+        print(f"📚 Loaded {len(frame)} vocabulary words from {path}")
+        return Vocabulary(path, mtime, frame=frame)
+
+    def clear(self):
+        """Drop every loaded source."""
+        with self._lock:
+            self._entries.clear()
+            self._checked.clear()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_vocab_store():
+    """
+    Get the process-wide vocabulary store
+
+    Returns:
+        VocabStore
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = VocabStore(check_interval=VOCAB_CONFIG["mtime_check_interval"])
+        return _store
+
+
+def load_vocabulary(path=None, levels=None):
+    """Shortcut for get_vocab_store().get(path, levels)."""
+    return get_vocab_store().get(path, levels)